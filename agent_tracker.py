@@ -13,11 +13,16 @@ from typing import Dict, Any, Optional, List, Callable, Awaitable, Union
 import traceback
 import concurrent.futures
 
+from src.utils import json_utils
+
 # Configuração de logging
 logging.basicConfig(level=logging.INFO, 
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("agent_tracker")
 
+# Inícios de screenshot em base64: data URL, PNG ou JPEG
+SCREENSHOT_B64_PREFIXES = ("data:image", "iVBORw0KGgo", "/9j/")
+
 class EventCategorizador:
     """
     Classe que categoriza eventos para facilitar análise e filtragem.
@@ -562,8 +567,8 @@ class TimelineBuilderExtended(TimelineBuilder):
             # Garantir que o diretório existe
             os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
             
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(timeline_data, f, indent=2, ensure_ascii=False)
+            with open(filepath, "wb") as f:
+                f.write(json_utils.dumps(timeline_data, indent=True))
                 
             logger.info(f"Timeline salva em {filepath}")
             return filepath
@@ -1401,25 +1406,30 @@ class BrowserUseLogInterceptor(logging.Handler):
         try:
             while True:
                 await asyncio.sleep(30)  # Salvar a cada 30 segundos
-                if hasattr(self, 'unknown_messages') and self.unknown_messages and hasattr(self, 'unknown_messages_file'):
-                    try:
-                        with open(self.unknown_messages_file, 'w', encoding='utf-8') as f:
-                            json.dump(self.unknown_messages, f, indent=2, ensure_ascii=False)
-                        logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file}")
-                    except Exception as e:
-                        logger.error(f"Erro ao salvar mensagens desconhecidas: {e}")
+                self._salvar_mensagens_desconhecidas()
         except asyncio.CancelledError:
             # Tarefa cancelada, salvar uma última vez
-            if hasattr(self, 'unknown_messages') and self.unknown_messages and hasattr(self, 'unknown_messages_file'):
-                try:
-                    with open(self.unknown_messages_file, 'w', encoding='utf-8') as f:
-                        json.dump(self.unknown_messages, f, indent=2, ensure_ascii=False)
-                    logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file} (final)")
-                except Exception as e:
-                    logger.error(f"Erro ao salvar mensagens desconhecidas (final): {e}")
+            self._salvar_mensagens_desconhecidas(final=True)
         except Exception as e:
             logger.error(f"Erro em _save_unknown_messages_periodically: {e}")
     
+    def _salvar_mensagens_desconhecidas(self, final=False):
+        """
+        Grava as mensagens desconhecidas no arquivo JSON, se houver alguma.
+        
+        Args:
+            final (bool): Indica a gravação final (apenas para o log)
+        """
+        if not (getattr(self, 'unknown_messages', None) and hasattr(self, 'unknown_messages_file')):
+            return
+        sufixo = " (final)" if final else ""
+        try:
+            with open(self.unknown_messages_file, 'wb') as f:
+                f.write(json_utils.dumps(self.unknown_messages, indent=True))
+            logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file}{sufixo}")
+        except Exception as e:
+            logger.error(f"Erro ao salvar mensagens desconhecidas{sufixo}: {e}")
+    
     def get_resumo_execucao(self) -> Dict[str, Any]:
         """
         Gera um resumo da execução atual
@@ -1614,25 +1624,30 @@ class BrowserUseLogInterceptor(logging.Handler):
         try:
             while True:
                 await asyncio.sleep(30)  # Salvar a cada 30 segundos
-                if hasattr(self, 'unknown_messages') and self.unknown_messages and hasattr(self, 'unknown_messages_file'):
-                    try:
-                        with open(self.unknown_messages_file, 'w', encoding='utf-8') as f:
-                            json.dump(self.unknown_messages, f, indent=2, ensure_ascii=False)
-                        logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file}")
-                    except Exception as e:
-                        logger.error(f"Erro ao salvar mensagens desconhecidas: {e}")
+                self._salvar_mensagens_desconhecidas()
         except asyncio.CancelledError:
             # Tarefa cancelada, salvar uma última vez
-            if hasattr(self, 'unknown_messages') and self.unknown_messages and hasattr(self, 'unknown_messages_file'):
-                try:
-                    with open(self.unknown_messages_file, 'w', encoding='utf-8') as f:
-                        json.dump(self.unknown_messages, f, indent=2, ensure_ascii=False)
-                    logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file} (final)")
-                except Exception as e:
-                    logger.error(f"Erro ao salvar mensagens desconhecidas (final): {e}")
+            self._salvar_mensagens_desconhecidas(final=True)
         except Exception as e:
             logger.error(f"Erro em _save_unknown_messages_periodically: {e}")
     
+    def _salvar_mensagens_desconhecidas(self, final=False):
+        """
+        Grava as mensagens desconhecidas no arquivo JSON, se houver alguma.
+        
+        Args:
+            final (bool): Indica a gravação final (apenas para o log)
+        """
+        if not (getattr(self, 'unknown_messages', None) and hasattr(self, 'unknown_messages_file')):
+            return
+        sufixo = " (final)" if final else ""
+        try:
+            with open(self.unknown_messages_file, 'wb') as f:
+                f.write(json_utils.dumps(self.unknown_messages, indent=True))
+            logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file}{sufixo}")
+        except Exception as e:
+            logger.error(f"Erro ao salvar mensagens desconhecidas{sufixo}: {e}")
+    
     def get_resumo_execucao(self) -> Dict[str, Any]:
         """
         Gera um resumo da execução atual
@@ -1834,21 +1849,17 @@ class BrowserUseLogInterceptor(logging.Handler):
         logger.info("Finalizando tracking de logs do browser-use...")
         
         try:
-            # Salvar mensagens desconhecidas uma última vez
-            if hasattr(self, 'unknown_messages') and self.unknown_messages and hasattr(self, 'unknown_messages_file'):
-                try:
-                    with open(self.unknown_messages_file, 'w', encoding='utf-8') as f:
-                        json.dump(self.unknown_messages, f, indent=2, ensure_ascii=False)
-                    logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file} (final)")
-                except Exception as e:
-                    logger.error(f"Erro ao salvar mensagens desconhecidas (final): {e}")
-            
-            # Cancelar tarefa de salvamento periódico
-            if hasattr(self, '_save_unknown_messages_task'):
-                self._save_unknown_messages_task.cancel()
+            # Salvar mensagens desconhecidas uma última vez: a tarefa periódica faz
+            # essa gravação ao ser cancelada, então só grava aqui se ela não estiver ativa
+            save_task = getattr(self, '_save_unknown_messages_task', None)
+            if save_task is None or save_task.done():
+                self._salvar_mensagens_desconhecidas(final=True)
+            else:
+                # Cancelar tarefa de salvamento periódico
+                save_task.cancel()
                 try:
-                    # Aguardar a tarefa ser cancelada
-                    await asyncio.wait_for(asyncio.shield(self._save_unknown_messages_task), timeout=2.0)
+                    # Aguardar a tarefa ser cancelada (e concluir a gravação final)
+                    await asyncio.wait_for(asyncio.shield(save_task), timeout=2.0)
                 except (asyncio.CancelledError, asyncio.TimeoutError):
                     pass  # Esperado quando a tarefa é cancelada
             
@@ -2461,14 +2472,18 @@ class AgentTracker:
                     # Adicionar ao evento para facilitar visualização
                     event_data[f"{field}_present"] = True
         
-        # Processar screenshots se configurado
-        if self.include_screenshots and "screenshot" in event_data:
-            try:
-                screenshot_data = event_data["screenshot"]
-                # Se for uma string base64, salvar como arquivo
-                if isinstance(screenshot_data, str) and screenshot_data.startswith("data:image"):
-                    # Extrair o conteúdo base64
-                    content_type, base64_data = screenshot_data.split(",", 1)
+        # Screenshots em base64 nunca ficam embutidos no log: são gravados em
+        # arquivo (ou descartados, sem include_screenshots) e o evento guarda só o nome
+        screenshot_data = event_data.get("screenshot")
+        if isinstance(screenshot_data, str) and screenshot_data.startswith(SCREENSHOT_B64_PREFIXES):
+            event_data["screenshot"] = None
+            if self.include_screenshots:
+                try:
+                    # Extrair o conteúdo base64 (data URL ou base64 puro)
+                    if screenshot_data.startswith("data:image"):
+                        content_type, base64_data = screenshot_data.split(",", 1)
+                    else:
+                        base64_data = screenshot_data
                     
                     # Criar um nome de arquivo baseado no timestamp e contador
                     ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
@@ -2481,10 +2496,10 @@ class AgentTracker:
                     
                     # Substituir o dado base64 pelo nome do arquivo para economizar espaço
                     event_data["screenshot"] = screenshot_filename
-                    self.logger.debug(f"Screenshot salvo em: {screenshot_path}")
-            except Exception as e:
-                self.logger.error(f"Erro ao processar screenshot: {str(e)}")
-                # Manter o evento mesmo se falhar o processamento do screenshot
+                    self.logger.debug("Screenshot salvo em: %s", screenshot_path)
+                except Exception as e:
+                    # Manter o evento (sem o screenshot) mesmo se falhar o processamento
+                    self.logger.error("Erro ao processar screenshot: %s", e)
         
         # Adicionar categoria ao evento
         event_data["categoria"] = categoria
@@ -2830,25 +2845,30 @@ class AgentTracker:
         try:
             while True:
                 await asyncio.sleep(30)  # Salvar a cada 30 segundos
-                if hasattr(self, 'unknown_messages') and self.unknown_messages and hasattr(self, 'unknown_messages_file'):
-                    try:
-                        with open(self.unknown_messages_file, 'w', encoding='utf-8') as f:
-                            json.dump(self.unknown_messages, f, indent=2, ensure_ascii=False)
-                        logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file}")
-                    except Exception as e:
-                        logger.error(f"Erro ao salvar mensagens desconhecidas: {e}")
+                self._salvar_mensagens_desconhecidas()
         except asyncio.CancelledError:
             # Tarefa cancelada, salvar uma última vez
-            if hasattr(self, 'unknown_messages') and self.unknown_messages and hasattr(self, 'unknown_messages_file'):
-                try:
-                    with open(self.unknown_messages_file, 'w', encoding='utf-8') as f:
-                        json.dump(self.unknown_messages, f, indent=2, ensure_ascii=False)
-                    logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file} (final)")
-                except Exception as e:
-                    logger.error(f"Erro ao salvar mensagens desconhecidas (final): {e}")
+            self._salvar_mensagens_desconhecidas(final=True)
         except Exception as e:
             logger.error(f"Erro em _save_unknown_messages_periodically: {e}")
     
+    def _salvar_mensagens_desconhecidas(self, final=False):
+        """
+        Grava as mensagens desconhecidas no arquivo JSON, se houver alguma.
+        
+        Args:
+            final (bool): Indica a gravação final (apenas para o log)
+        """
+        if not (getattr(self, 'unknown_messages', None) and hasattr(self, 'unknown_messages_file')):
+            return
+        sufixo = " (final)" if final else ""
+        try:
+            with open(self.unknown_messages_file, 'wb') as f:
+                f.write(json_utils.dumps(self.unknown_messages, indent=True))
+            logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file}{sufixo}")
+        except Exception as e:
+            logger.error(f"Erro ao salvar mensagens desconhecidas{sufixo}: {e}")
+    
     def get_resumo_execucao(self) -> Dict[str, Any]:
         """
         Gera um resumo da execução atual
@@ -3050,21 +3070,17 @@ class AgentTracker:
         logger.info("Finalizando tracking de logs do browser-use...")
         
         try:
-            # Salvar mensagens desconhecidas uma última vez
-            if hasattr(self, 'unknown_messages') and self.unknown_messages and hasattr(self, 'unknown_messages_file'):
-                try:
-                    with open(self.unknown_messages_file, 'w', encoding='utf-8') as f:
-                        json.dump(self.unknown_messages, f, indent=2, ensure_ascii=False)
-                    logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file} (final)")
-                except Exception as e:
-                    logger.error(f"Erro ao salvar mensagens desconhecidas (final): {e}")
-            
-            # Cancelar tarefa de salvamento periódico
-            if hasattr(self, '_save_unknown_messages_task'):
-                self._save_unknown_messages_task.cancel()
+            # Salvar mensagens desconhecidas uma última vez: a tarefa periódica faz
+            # essa gravação ao ser cancelada, então só grava aqui se ela não estiver ativa
+            save_task = getattr(self, '_save_unknown_messages_task', None)
+            if save_task is None or save_task.done():
+                self._salvar_mensagens_desconhecidas(final=True)
+            else:
+                # Cancelar tarefa de salvamento periódico
+                save_task.cancel()
                 try:
-                    # Aguardar a tarefa ser cancelada
-                    await asyncio.wait_for(asyncio.shield(self._save_unknown_messages_task), timeout=2.0)
+                    # Aguardar a tarefa ser cancelada (e concluir a gravação final)
+                    await asyncio.wait_for(asyncio.shield(save_task), timeout=2.0)
                 except (asyncio.CancelledError, asyncio.TimeoutError):
                     pass  # Esperado quando a tarefa é cancelada
             
@@ -3842,14 +3858,18 @@ class AgentTracker:
                     # Adicionar ao evento para facilitar visualização
                     event_data[f"{field}_present"] = True
         
-        # Processar screenshots se configurado
-        if self.include_screenshots and "screenshot" in event_data:
-            try:
-                screenshot_data = event_data["screenshot"]
-                # Se for uma string base64, salvar como arquivo
-                if isinstance(screenshot_data, str) and screenshot_data.startswith("data:image"):
-                    # Extrair o conteúdo base64
-                    content_type, base64_data = screenshot_data.split(",", 1)
+        # Screenshots em base64 nunca ficam embutidos no log: são gravados em
+        # arquivo (ou descartados, sem include_screenshots) e o evento guarda só o nome
+        screenshot_data = event_data.get("screenshot")
+        if isinstance(screenshot_data, str) and screenshot_data.startswith(SCREENSHOT_B64_PREFIXES):
+            event_data["screenshot"] = None
+            if self.include_screenshots:
+                try:
+                    # Extrair o conteúdo base64 (data URL ou base64 puro)
+                    if screenshot_data.startswith("data:image"):
+                        content_type, base64_data = screenshot_data.split(",", 1)
+                    else:
+                        base64_data = screenshot_data
                     
                     # Criar um nome de arquivo baseado no timestamp e contador
                     ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
@@ -3862,10 +3882,10 @@ class AgentTracker:
                     
                     # Substituir o dado base64 pelo nome do arquivo para economizar espaço
                     event_data["screenshot"] = screenshot_filename
-                    self.logger.debug(f"Screenshot salvo em: {screenshot_path}")
-            except Exception as e:
-                self.logger.error(f"Erro ao processar screenshot: {str(e)}")
-                # Manter o evento mesmo se falhar o processamento do screenshot
+                    self.logger.debug("Screenshot salvo em: %s", screenshot_path)
+                except Exception as e:
+                    # Manter o evento (sem o screenshot) mesmo se falhar o processamento
+                    self.logger.error("Erro ao processar screenshot: %s", e)
         
         # Adicionar categoria ao evento
         event_data["categoria"] = categoria
@@ -4211,25 +4231,30 @@ class AgentTracker:
         try:
             while True:
                 await asyncio.sleep(30)  # Salvar a cada 30 segundos
-                if hasattr(self, 'unknown_messages') and self.unknown_messages and hasattr(self, 'unknown_messages_file'):
-                    try:
-                        with open(self.unknown_messages_file, 'w', encoding='utf-8') as f:
-                            json.dump(self.unknown_messages, f, indent=2, ensure_ascii=False)
-                        logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file}")
-                    except Exception as e:
-                        logger.error(f"Erro ao salvar mensagens desconhecidas: {e}")
+                self._salvar_mensagens_desconhecidas()
         except asyncio.CancelledError:
             # Tarefa cancelada, salvar uma última vez
-            if hasattr(self, 'unknown_messages') and self.unknown_messages and hasattr(self, 'unknown_messages_file'):
-                try:
-                    with open(self.unknown_messages_file, 'w', encoding='utf-8') as f:
-                        json.dump(self.unknown_messages, f, indent=2, ensure_ascii=False)
-                    logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file} (final)")
-                except Exception as e:
-                    logger.error(f"Erro ao salvar mensagens desconhecidas (final): {e}")
+            self._salvar_mensagens_desconhecidas(final=True)
         except Exception as e:
             logger.error(f"Erro em _save_unknown_messages_periodically: {e}")
     
+    def _salvar_mensagens_desconhecidas(self, final=False):
+        """
+        Grava as mensagens desconhecidas no arquivo JSON, se houver alguma.
+        
+        Args:
+            final (bool): Indica a gravação final (apenas para o log)
+        """
+        if not (getattr(self, 'unknown_messages', None) and hasattr(self, 'unknown_messages_file')):
+            return
+        sufixo = " (final)" if final else ""
+        try:
+            with open(self.unknown_messages_file, 'wb') as f:
+                f.write(json_utils.dumps(self.unknown_messages, indent=True))
+            logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file}{sufixo}")
+        except Exception as e:
+            logger.error(f"Erro ao salvar mensagens desconhecidas{sufixo}: {e}")
+    
     def get_resumo_execucao(self) -> Dict[str, Any]:
         """
         Gera um resumo da execução atual
@@ -4431,21 +4456,17 @@ class AgentTracker:
         logger.info("Finalizando tracking de logs do browser-use...")
         
         try:
-            # Salvar mensagens desconhecidas uma última vez
-            if hasattr(self, 'unknown_messages') and self.unknown_messages and hasattr(self, 'unknown_messages_file'):
-                try:
-                    with open(self.unknown_messages_file, 'w', encoding='utf-8') as f:
-                        json.dump(self.unknown_messages, f, indent=2, ensure_ascii=False)
-                    logger.debug(f"Mensagens desconhecidas salvas em {self.unknown_messages_file} (final)")
-                except Exception as e:
-                    logger.error(f"Erro ao salvar mensagens desconhecidas (final): {e}")
-            
-            # Cancelar tarefa de salvamento periódico
-            if hasattr(self, '_save_unknown_messages_task'):
-                self._save_unknown_messages_task.cancel()
+            # Salvar mensagens desconhecidas uma última vez: a tarefa periódica faz
+            # essa gravação ao ser cancelada, então só grava aqui se ela não estiver ativa
+            save_task = getattr(self, '_save_unknown_messages_task', None)
+            if save_task is None or save_task.done():
+                self._salvar_mensagens_desconhecidas(final=True)
+            else:
+                # Cancelar tarefa de salvamento periódico
+                save_task.cancel()
                 try:
-                    # Aguardar a tarefa ser cancelada
-                    await asyncio.wait_for(asyncio.shield(self._save_unknown_messages_task), timeout=2.0)
+                    # Aguardar a tarefa ser cancelada (e concluir a gravação final)
+                    await asyncio.wait_for(asyncio.shield(save_task), timeout=2.0)
                 except (asyncio.CancelledError, asyncio.TimeoutError):
                     pass  # Esperado quando a tarefa é cancelada
             
@@ -14,6 +14,7 @@ from typing import Dict, Any, Optional, List, Tuple
 from dotenv import load_dotenv
 from src.storage.storage_manager import StorageManager
 from src.api.rabbitmq.event_publisher import EventPublisher
+from src.utils.helpers import BrowserManager, find_free_port
 
 # Importar biblioteca browser-use com caminhos corretos
 from browser_use.browser.browser import Browser, BrowserConfig
@@ -113,6 +114,7 @@ class Agent:
         self.current_task = None
         self.result = None
         self.storage = None
+        self.chrome_manager = None
         self.llm_config = {
             "model_name": os.getenv("LLM_MODEL_NAME", "unknown"),
             "provider": os.getenv("LLM_PROVIDER", "unknown")
@@ -160,7 +162,7 @@ class Agent:
             self.logger.error(f"Erro ao inicializar agente Z2B: {str(e)}")
             traceback.print_exc()
     
-    async def create_browser_and_context(self, user_agent=None, proxy=None, viewport=None) -> Tuple[Any, Any]:
+    async def create_browser_and_context(self, user_agent=None, proxy=None, viewport=None, storage=None) -> Tuple[Any, Any]:
         """
         Cria uma instância do navegador e um contexto.
         
@@ -168,6 +170,8 @@ class Agent:
             user_agent (str, optional): O user agent a ser usado
             proxy (Dict, optional): Configuração de proxy
             viewport (Dict, optional): Configuração de viewport
+            storage (StorageManager, optional): Storage da tarefa; com
+                CHROME_PERSISTENT_SESSION, o Chrome usa o perfil do cliente
             
         Returns:
             Tuple[Any, Any]: Browser e BrowserContext
@@ -191,11 +195,28 @@ class Agent:
                 "--disable-features=IsolateOrigins,site-per-process"
             ]
             
-            browser_config = BrowserConfig(
-                headless=True,
-                disable_security=True,
-                extra_chromium_args=extra_chromium_args
-            )
+            if CHROME_PERSISTENT_SESSION and storage is not None:
+                # Chrome próprio da tarefa, em porta livre, com o perfil
+                # persistente do cliente (ou temporário, se o perfil estiver em uso)
+                self.chrome_manager = BrowserManager()
+                cdp_url = await asyncio.to_thread(
+                    self.chrome_manager.start_chrome_for_debugging,
+                    chrome_path=CHROME_PATH or None,
+                    port=find_free_port(),
+                    storage=storage
+                )
+                browser_config = BrowserConfig(
+                    headless=True,
+                    disable_security=True,
+                    cdp_url=cdp_url,
+                    extra_chromium_args=extra_chromium_args
+                )
+            else:
+                browser_config = BrowserConfig(
+                    headless=True,
+                    disable_security=True,
+                    extra_chromium_args=extra_chromium_args
+                )
             
             # Cria o browser
             self.logger.info("Criando instância do browser")
@@ -221,6 +242,10 @@ class Agent:
         except Exception as e:
             self.logger.error(f"Erro ao criar browser e contexto: {str(e)}")
             traceback.print_exc()
+            # Encerra o Chrome da tarefa e libera o perfil do cliente
+            if self.chrome_manager:
+                await asyncio.to_thread(self.chrome_manager.close)
+                self.chrome_manager = None
             raise
     
     async def create_browser(self, config: BrowserConfig):
@@ -236,7 +261,7 @@ class Agent:
         browser = Browser(config=config)
         return browser
     
-    async def execute_prompt_task(self, prompt, client_id=None, task_id=None, callback=None):
+    async def execute_prompt_task(self, prompt, client_id=None, task_id=None, callback=None, storage=None):
         """
         Executa um prompt no navegador.
         
@@ -245,11 +270,13 @@ class Agent:
             client_id (str, optional): ID do cliente
             task_id (str, optional): ID da tarefa
             callback (callable, optional): Função de callback para atualizações
+            storage (StorageManager, optional): Storage da tarefa
             
         Returns:
             Dict: Resultados da execução
         """
         self.logger.info(f"Executando prompt: {prompt}")
+        self.storage = storage
         
         # Verificar se devemos usar a implementação Z2B
         if AGENT_IMPLEMENTATION == 'z2b' and self.z2b_agent:
@@ -258,7 +285,7 @@ class Agent:
         # Continuar com a implementação legada
         if not self.browser_context:
             self.logger.info("Browser context não fornecido, criando um novo")
-            browser, browser_context = await self.create_browser_and_context()
+            browser, browser_context = await self.create_browser_and_context(storage=storage)
             self.browser = browser
             self.browser_context = browser_context
         
@@ -476,6 +503,12 @@ class Agent:
                 except Exception as e:
                     self.logger.error(f"Erro ao encerrar Chrome: {str(e)}")
             
+            # Chrome iniciado com o perfil persistente do cliente
+            if self.chrome_manager:
+                self.logger.info("Encerrando Chrome da tarefa")
+                await asyncio.to_thread(self.chrome_manager.close)
+                self.chrome_manager = None
+            
             self.logger.info("Limpeza concluída com sucesso")
         except Exception as e:
             self.logger.error(f"Erro durante limpeza: {str(e)}")
@@ -17,7 +17,6 @@ import json
 from dotenv import load_dotenv
 from src.api.routes import task_routes
 from src.api.models.task import TaskRequest, TaskResponse, TaskStatus, QueueInfo
-from src.api.services.task_service import TaskService
 from src.api.rabbitmq.consumer import TaskConsumer
 from src.api.websocket.rabbitmq_bridge import rabbitmq_bridge, get_rabbitmq_bridge, RabbitMQWebSocketBridge
 from src.api.routes.static_routes import router as static_router
@@ -41,12 +40,20 @@ async def lifespan(app: FastAPI):
     """
     logger.info("Inicializando aplicação...")
     
+    # Tarefas de automação em andamento (o limite de concorrência fica no TaskService)
+    running_tasks = set()
+    
     # Define o callback para o consumidor
     async def task_callback(data: Dict[str, Any]):
         task_id = data.get("task_id")
         if task_id:
             logger.info(f"Processando tarefa {task_id} em background")
-            asyncio.create_task(task_service.process_task(task_id))
+            task = asyncio.create_task(task_service.process_task(task_id, data.get("client_id")))
+            running_tasks.add(task)
+            task.add_done_callback(running_tasks.discard)
+    
+    # Inicia o publicador de eventos em lote
+    await task_service.event_publisher.start()
     
     # Inicia o consumidor RabbitMQ em background
     task_consumer = TaskConsumer(callback=task_callback)
@@ -68,11 +75,14 @@ async def lifespan(app: FastAPI):
     # Encerra o bridge WebSocket-RabbitMQ
     await rabbitmq_bridge.stop_rabbitmq_consumer()
     
-    # Cancela tarefas em background
-    for task in background_tasks:
+    # Cancela tarefas em background e tarefas de automação em andamento
+    for task in background_tasks + list(running_tasks):
         if not task.done():
             task.cancel()
     
+    # Publica eventos pendentes antes de encerrar
+    await task_service.event_publisher.stop()
+    
     logger.info("Aplicação encerrada com sucesso")
 
 # Cria a aplicação FastAPI com o novo lifespan
@@ -92,8 +102,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Cria o serviço de tarefas
-task_service = TaskService()
+# Compartilha o serviço de tarefas usado pelas rotas
+task_service = task_routes.task_service
 
 # Adiciona os roteadores
 app.include_router(task_routes.router, prefix="/api")
@@ -119,11 +129,11 @@ def main():
     """
     from hypercorn.config import Config
     from hypercorn.asyncio import serve
-    import asyncio
     
     config = Config()
     config.bind = [f"{os.getenv('API_HOST', '0.0.0.0')}:{int(os.getenv('API_PORT', '8000'))}"]
-    config.use_reloader = True  # Equivalente ao reload=True do uvicorn
+    # Reloader observa o sistema de arquivos; apenas para desenvolvimento (API_RELOAD=1)
+    config.use_reloader = os.getenv("API_RELOAD", "0") == "1"
     config.accesslog = "-"  # Log para stdout
     
     # Configuração adicional para melhor performance
@@ -134,18 +144,4 @@ def main():
     return asyncio.run(serve(app, config))
 
 if __name__ == "__main__":
-    from hypercorn.config import Config
-    from hypercorn.asyncio import serve
-    import asyncio
-    
-    config = Config()
-    config.bind = [f"{os.getenv('API_HOST', '0.0.0.0')}:{int(os.getenv('API_PORT', '8000'))}"]
-    config.use_reloader = True  # Equivalente ao reload=True do uvicorn
-    config.accesslog = "-"  # Log para stdout
-    
-    # Configuração adicional para melhor performance
-    config.workers = int(os.getenv("API_WORKERS", "1"))
-    config.keep_alive_timeout = 75  # segundos
-    
-    # Executar a aplicação com hypercorn
-    asyncio.run(serve(app, config))
\ No newline at end of file
+    main()
@@ -1,23 +1,174 @@
 import logging
-import json
 import base64
 from typing import Dict, Any, Optional, List
 import aio_pika
 import asyncio
-from datetime import datetime
+import time
+from functools import lru_cache
 
 from src.api.rabbitmq.connection import RabbitMQConnection
+from src.utils.json_utils import dumps as _dumps
 
 logger = logging.getLogger(__name__)
 
+# Prefixo "YYYY-MM-DDTHH:MM:SS" do segundo corrente, reaproveitado entre eventos
+_timestamp_second = None
+_timestamp_prefix = ""
+
+
+def _iso_timestamp() -> str:
+    """
+    Retorna o horário local no mesmo formato de datetime.now().isoformat(),
+    formatando a parte de data/hora apenas uma vez por segundo.
+    """
+    global _timestamp_second, _timestamp_prefix
+    
+    now = time.time()
+    second = int(now)
+    if second != _timestamp_second:
+        _timestamp_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second))
+        _timestamp_second = second
+    
+    return f"{_timestamp_prefix}.{int((now - second) * 1_000_000):06d}"
+
+
+@lru_cache(maxsize=1024)
+def _routing_key(task_id: str) -> str:
+    """Routing key dos eventos da tarefa, reaproveitada entre os eventos."""
+    return f"event.{task_id}"
+
+
+@lru_cache(maxsize=1024)
+def _event_header(event_type: str, task_id: str, client_id: str) -> bytes:
+    """
+    Cabeçalho JSON constante dos eventos de uma tarefa, sem o "}" final para
+    permitir a concatenação dos demais campos. O cache é limitado: tarefas
+    encerradas deixam de ocupar memória à medida que novas chegam.
+    """
+    return _dumps({
+        "event_type": event_type,
+        "task_id": task_id,
+        "client_id": client_id
+    })[:-1]
+
+
 class EventPublisher:
     """
     Classe para publicar eventos relacionados ao agente no RabbitMQ,
     incluindo planejamento de etapas, progresso da execução e screenshots.
     """
+    # Eventos de telemetria de alta frequência: não precisam sobreviver a um
+    # restart do broker, então são publicados sem persistência em disco
+    TRANSIENT_EVENT_TYPES = frozenset({"task.screenshot", "task.thinking", "task.action"})
+    TRANSIENT_EVENT_EXPIRATION = 60  # segundos
+
+    # Limites de agrupamento do publicador em background
+    BATCH_SIZE = 64
+    BATCH_INTERVAL = 0.02  # segundos
+    # Capacidade da fila de saída; cheia, screenshots são descartados e os
+    # demais eventos aguardam espaço
+    OUTBOX_SIZE = 1024
+
     def __init__(self):
         self.connection = RabbitMQConnection()
+        self._outbox: Optional[asyncio.Queue] = None
+        self._publisher_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """
+        Inicia o publicador em background que agrupa os eventos enfileirados
+        e os publica em lotes, amortizando o round-trip de confirmação.
+        """
+        if self._publisher_task and not self._publisher_task.done():
+            return
+        
+        self._outbox = asyncio.Queue(maxsize=self.OUTBOX_SIZE)
+        self._publisher_task = asyncio.create_task(self._publisher_loop())
+        logger.info("Publicador de eventos em lote iniciado")
+
+    async def stop(self) -> None:
+        """Publica os eventos pendentes e encerra o publicador em background"""
+        if not self._publisher_task:
+            return
+        
+        if not self._publisher_task.done():
+            await self._outbox.join()
+            self._publisher_task.cancel()
+            try:
+                await self._publisher_task
+            except asyncio.CancelledError:
+                pass
+        
+        self._publisher_task = None
+        self._outbox = None
+        logger.info("Publicador de eventos em lote encerrado")
+
+    async def _publisher_loop(self) -> None:
+        """Drena a fila de saída publicando até BATCH_SIZE mensagens por vez"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._outbox.get()]
+            deadline = loop.time() + self.BATCH_INTERVAL
+            
+            while len(batch) < self.BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._outbox.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                results = await asyncio.gather(
+                    *[exchange.publish(message, routing_key=routing_key) for exchange, routing_key, message in batch],
+                    return_exceptions=True
+                )
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error(f"Erro ao publicar evento em lote: {str(result)}")
+                logger.debug(f"Lote de {len(batch)} eventos publicado")
+            except Exception as e:
+                logger.error(f"Erro ao publicar lote de eventos: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._outbox.task_done()
+        
+    def _serialize_event(
+        self,
+        event_type: str,
+        task_id: str,
+        client_id: str,
+        timestamp: str,
+        data: Dict[str, Any],
+        optional_fields: Dict[str, Any]
+    ) -> bytes:
+        """
+        Serializa o evento reaproveitando o cabeçalho constante da tarefa.
+        
+        Os campos event_type, task_id e client_id são serializados uma única vez
+        por tarefa; a cada evento apenas os campos variáveis são convertidos.
+        
+        Args:
+            event_type: Tipo do evento
+            task_id: ID da tarefa
+            client_id: ID do cliente
+            timestamp: Horário do evento em formato ISO
+            data: Dados específicos do evento
+            optional_fields: Campos opcionais já filtrados (apenas valores presentes)
+            
+        Returns:
+            bytes: Corpo JSON da mensagem
+        """
+        parts = [_event_header(event_type, task_id, client_id), b',"timestamp":', _dumps(timestamp), b',"data":', _dumps(data)]
+        for key, value in optional_fields.items():
+            parts.append(b',"' + key.encode() + b'":')
+            parts.append(_dumps(value))
+        parts.append(b"}")
         
+        return b"".join(parts)
+
     async def publish_agent_event(
         self,
         event_type: str,
@@ -42,42 +193,62 @@ class EventPublisher:
             current_url: URL atual do navegador (opcional)
             model_info: Informações sobre o modelo LLM utilizado (opcional)
         """
-        exchange = await self.connection.get_exchange()
-        routing_key = f"event.{task_id}"
-        
-        timestamp = datetime.now().isoformat()
+        routing_key = _routing_key(task_id)
         
-        # Construir a mensagem de evento
-        event_data = {
-            "event_type": event_type,
-            "task_id": task_id,
-            "client_id": client_id,
-            "timestamp": timestamp,
-            "data": data
-        }
+        timestamp = _iso_timestamp()
         
         # Adiciona campos opcionais se fornecidos
+        optional_fields = {}
         if step_description:
-            event_data["step_description"] = step_description
+            optional_fields["step_description"] = step_description
             
         if screenshot_data:
-            event_data["screenshot"] = screenshot_data
+            optional_fields["screenshot"] = screenshot_data
             
         if current_url:
-            event_data["current_url"] = current_url
+            optional_fields["current_url"] = current_url
             
         if model_info:
-            event_data["model_info"] = model_info
+            optional_fields["model_info"] = model_info
+        
+        # Construir a mensagem de evento
+        body = self._serialize_event(event_type, task_id, client_id, timestamp, data, optional_fields)
+        
+        if event_type in self.TRANSIENT_EVENT_TYPES:
+            message = aio_pika.Message(
+                body=body,
+                delivery_mode=aio_pika.DeliveryMode.NOT_PERSISTENT,
+                expiration=self.TRANSIENT_EVENT_EXPIRATION
+            )
+        else:
+            message = aio_pika.Message(
+                body=body,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+            )
+        
+        if event_type == "task.screenshot":
+            exchange = await self.connection.get_screenshot_exchange()
+        elif event_type in self.TRANSIENT_EVENT_TYPES:
+            exchange = await self.connection.get_telemetry_exchange()
+        else:
+            exchange = await self.connection.get_exchange()
+        
+        # Com o publicador em background ativo, apenas enfileira o evento
+        if self._publisher_task and not self._publisher_task.done():
+            item = (exchange, routing_key, message)
+            try:
+                self._outbox.put_nowait(item)
+            except asyncio.QueueFull:
+                if event_type == "task.screenshot":
+                    logger.warning(f"Fila de eventos cheia, screenshot descartado: {task_id}")
+                    return
+                await self._outbox.put(item)
+            logger.debug(f"Evento {event_type} enfileirado para tarefa {task_id}")
+            return
         
         # Publica a mensagem
         logger.debug(f"Publicando evento {event_type} para tarefa {task_id}")
-        await exchange.publish(
-            aio_pika.Message(
-                body=json.dumps(event_data).encode(),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-            ),
-            routing_key=routing_key
-        )
+        await exchange.publish(message, routing_key=routing_key)
         logger.debug(f"Evento {event_type} publicado com sucesso")
     
     async def publish_task_plan(
@@ -207,7 +378,7 @@ class EventPublisher:
         step_description: Optional[str] = None
     ) -> None:
         """
-        Publica screenshot do navegador.
+        Publica screenshot do navegador no exchange dedicado a screenshots.
         
         Args:
             task_id: ID da tarefa
@@ -1,13 +1,19 @@
 import aio_pika
 from aio_pika.abc import AbstractQueue, AbstractChannel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple, List
+import asyncio
 import json
+import time
 from src.api.rabbitmq.connection import RabbitMQConnection
 
 class QueueManager:
+    # Tempo (segundos) em que as informações de uma fila são reaproveitadas
+    INFO_CACHE_TTL = 0.5
+
     def __init__(self):
         self.connection = RabbitMQConnection()
         self.queues: Dict[str, AbstractQueue] = {}
+        self._info_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
 
     async def declare_queue(self, queue_name: str, routing_key: str) -> AbstractQueue:
         """Declara uma nova fila e a vincula ao exchange"""
@@ -47,17 +53,75 @@ class QueueManager:
             ),
             routing_key=routing_key
         )
+        
+        # A próxima consulta deve refletir a nova posição na fila
+        self._info_cache.pop(queue_name, None)
+
+    async def publish_many(self, batch: List[Tuple[str, Dict[str, Any]]]) -> List[Optional[BaseException]]:
+        """
+        Publica um lote de tarefas, cada uma na sua fila.
+
+        As publicações do lote são disparadas juntas e as confirmações do
+        broker são aguardadas em conjunto, pagando um único round-trip por
+        lote em vez de um por tarefa.
+
+        Returns:
+            List[Optional[BaseException]]: Resultado de cada item do lote,
+            na mesma ordem (None em caso de sucesso)
+        """
+        exchange = await self.connection.get_exchange()
+
+        # Garante que as filas existem antes de publicar
+        for queue_name, _ in batch:
+            if queue_name not in self.queues:
+                await self.declare_queue(queue_name, f"task.{queue_name}")
+
+        results = await asyncio.gather(
+            *(
+                exchange.publish(
+                    aio_pika.Message(
+                        body=json.dumps(task_data).encode(),
+                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+                    ),
+                    routing_key=f"task.{queue_name}",
+                    mandatory=False
+                )
+                for queue_name, task_data in batch
+            ),
+            return_exceptions=True
+        )
+
+        # As próximas consultas devem refletir as novas posições nas filas
+        for queue_name, _ in batch:
+            self._info_cache.pop(queue_name, None)
 
-    async def get_queue_info(self, queue_name: str) -> Dict[str, Any]:
-        """Obtém informações sobre uma fila específica"""
+        return [r if isinstance(r, BaseException) else None for r in results]
+
+    async def get_queue_info(self, queue_name: str, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Obtém informações sobre uma fila específica
+
+        As informações ficam em cache por INFO_CACHE_TTL segundos, de modo que
+        consultas de status repetidas geram no máximo uma declaração passiva
+        por janela. Posição e tempo estimado já são aproximações, então essa
+        defasagem é aceitável. Use refresh=True para ignorar o cache.
+        """
+        cached = self._info_cache.get(queue_name)
+        if not refresh and cached and time.monotonic() - cached[0] < self.INFO_CACHE_TTL:
+            return cached[1]
+        
         channel = await self.connection.get_channel()
         queue = await channel.declare_queue(queue_name, passive=True)
+        if queue_name in self.queues:
+            self.queues[queue_name] = queue
         
-        return {
+        info = {
             "name": queue_name,
             "messages": queue.declaration_result.message_count,
             "consumers": queue.declaration_result.consumer_count
         }
+        self._info_cache[queue_name] = (time.monotonic(), info)
+        return info
 
     async def get_all_queues(self) -> Dict[str, Dict[str, Any]]:
         """Obtém informações sobre todas as filas"""
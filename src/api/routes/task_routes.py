@@ -23,4 +23,9 @@ async def get_queue_status():
 @router.get("/tasks/status")
 async def get_tasks_status():
     """Obtém o status de todas as tarefas"""
-    return task_service.tasks 
\ No newline at end of file
+    return dict(task_service.tasks.items()) 
+
+@router.get("/metrics")
+async def get_metrics():
+    """Obtém métricas de processamento (tarefas em execução e aguardando)"""
+    return task_service.get_metrics()
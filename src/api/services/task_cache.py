@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+from typing import Any, Iterator, List, Optional, Tuple
+
+
+class TaskCache:
+    """
+    Armazenamento em memória das tarefas com tamanho máximo (LRU) e expiração (TTL).
+    
+    Mantém a mesma interface de dicionário usada pelo TaskService (`in`, `[]`, `get`),
+    mas limita o conjunto residente: entradas mais antigas que `ttl` segundos expiram
+    e, ao exceder `maxsize`, a entrada menos usada recentemente é descartada.
+    Tarefas ainda ativas (status em ACTIVE_STATUSES) nunca são descartadas, pois
+    os workers dependem delas até a conclusão. O estado definitivo das tarefas
+    continua no StorageManager.
+    """
+    
+    ACTIVE_STATUSES = frozenset({"pending", "processing"})
+    
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600.0):
+        """
+        Args:
+            maxsize: Número máximo de tarefas mantidas em memória
+            ttl: Tempo de vida de cada entrada, em segundos
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self._data:
+            self._data.move_to_end(key)
+        self._data[key] = (time.monotonic(), value)
+        
+        # Descarta as menos usadas, passando as ativas para o fim da ordem; se
+        # todas estiverem ativas, o limite é excedido temporariamente
+        skipped = 0
+        while len(self._data) > self.maxsize and skipped < len(self._data):
+            oldest, (_, oldest_value) = next(iter(self._data.items()))
+            if self._is_active(oldest_value):
+                self._data.move_to_end(oldest)
+                skipped += 1
+            else:
+                del self._data[oldest]
+    
+    def _is_active(self, value: Any) -> bool:
+        return isinstance(value, dict) and value.get("status") in self.ACTIVE_STATUSES
+    
+    def _expired(self, created_at: float, value: Any, now: float) -> bool:
+        return now - created_at > self.ttl and not self._is_active(value)
+    
+    def __getitem__(self, key: str) -> Any:
+        created_at, value = self._data[key]
+        if self._expired(created_at, value, time.monotonic()):
+            del self._data[key]
+            raise KeyError(key)
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def __delitem__(self, key: str) -> None:
+        del self._data[key]
+    
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter([key for key, _ in self.items()])
+    
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def items(self) -> List[Tuple[str, Any]]:
+        """Retorna os pares (task_id, dados) ainda válidos, removendo os expirados"""
+        now = time.monotonic()
+        expired = [key for key, (created_at, value) in self._data.items()
+                   if self._expired(created_at, value, now)]
+        for key in expired:
+            del self._data[key]
+        return [(key, value) for key, (_, value) in self._data.items()]
@@ -1,4 +1,6 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Mapping
+from types import MappingProxyType
+import os
 import uuid
 from datetime import datetime
 import asyncio
@@ -9,13 +11,23 @@ import logging
 import traceback
 from src.storage.storage_manager import StorageManager
 from src.api.rabbitmq.event_publisher import EventPublisher
+from src.api.services.task_cache import TaskCache
 
 logger = logging.getLogger(__name__)
 
 class TaskService:
+    # Limites de agrupamento da publicação de tarefas
+    PUBLISH_QUEUE_SIZE = 4096
+    PUBLISH_BATCH_SIZE = 64
+    PUBLISH_BATCH_INTERVAL = 0.005  # segundos
+
     def __init__(self):
         """Inicializa o serviço de tarefas"""
-        self.tasks = {}
+        # Cópia em memória limitada; o estado definitivo fica no StorageManager
+        self.tasks = TaskCache(
+            maxsize=int(os.getenv("TASK_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("TASK_CACHE_TTL", "3600"))
+        )
         self.queue_manager = QueueManager()
         self.agents = {}
         # Configurações globais do LLM que podem ser modificadas via API
@@ -23,15 +35,131 @@ class TaskService:
             "api_url": None,
             "api_key": None
         }
+        # Visão somente leitura das configurações, sem cópia a cada consulta
+        self._settings_view = MappingProxyType(self.llm_settings)
         self.event_publisher = EventPublisher()
         self.logger = logger
+        # Fila de publicação de tarefas, enviada ao RabbitMQ em lotes
+        self._publish_q: Optional[asyncio.Queue] = None
+        self._publish_loop_task: Optional[asyncio.Task] = None
+        # Fila de tarefas a processar, consumida por um conjunto fixo de workers
+        self.agent_concurrency = int(os.getenv("AGENT_CONCURRENCY", "8"))
+        self._run_q: Optional[asyncio.Queue] = None
+        self._workers: list = []
+        # Limite global de agentes simultâneos, compartilhado pelos workers e
+        # pelo consumidor RabbitMQ
+        self._sem = asyncio.Semaphore(self.agent_concurrency)
+        self.in_flight = 0
+
+    def _ensure_publish_loop(self):
+        """Inicia a tarefa de publicação de tarefas se ainda não estiver ativa"""
+        if self._publish_loop_task is None or self._publish_loop_task.done():
+            self._publish_q = asyncio.Queue(maxsize=self.PUBLISH_QUEUE_SIZE)
+            self._publish_loop_task = asyncio.create_task(self._publish_loop())
+
+    async def _publish_loop(self):
+        """Publica as tarefas enfileiradas em lotes de até PUBLISH_BATCH_SIZE"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._publish_q.get()]
+            deadline = loop.time() + self.PUBLISH_BATCH_INTERVAL
+            
+            while len(batch) < self.PUBLISH_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._publish_q.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                errors = await self.queue_manager.publish_many(
+                    [(task_id, task_data) for task_id, task_data, _ in batch]
+                )
+            except Exception as e:
+                errors = [e] * len(batch)
+            
+            # Devolve o resultado de cada publicação a quem a solicitou
+            for (_, _, future), error in zip(batch, errors):
+                if not future.done():
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+                self._publish_q.task_done()
+
+    async def _publish_task(self, task_id: str, task_data: Dict[str, Any]):
+        """Enfileira a tarefa para publicação em lote e aguarda a confirmação"""
+        self._ensure_publish_loop()
+        future = asyncio.get_running_loop().create_future()
+        await self._publish_q.put((task_id, task_data, future))
+        await future
+
+    def _ensure_workers(self):
+        """Inicia os workers de processamento de tarefas se ainda não estiverem ativos"""
+        if self._run_q is None:
+            self._run_q = asyncio.Queue()
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.agent_concurrency:
+            self._workers.append(asyncio.create_task(self._worker_loop()))
+
+    async def _worker_loop(self):
+        """Processa tarefas da fila, uma por vez, durante toda a vida do serviço"""
+        while True:
+            task_id, client_id = await self._run_q.get()
+            try:
+                await self.process_task(task_id, client_id)
+            except Exception as e:
+                self.logger.error(f"Erro não tratado ao processar tarefa {task_id}: {str(e)}")
+                self.logger.error(traceback.format_exc())
+            finally:
+                self._run_q.task_done()
+
+    async def _publish_event(self, event_data: Dict[str, Any]):
+        """Publica um evento do agente no RabbitMQ usando o método correto"""
+        event_type = event_data.get("event_type", "")
+        
+        try:
+            if event_type == "task.completed":
+                await self.event_publisher.publish_task_completed(
+                    task_id=event_data["task_id"],
+                    client_id=event_data["client_id"],
+                    result=event_data.get("data", {})
+                )
+            elif event_type == "task.error":
+                await self.event_publisher.publish_task_error(
+                    task_id=event_data["task_id"],
+                    client_id=event_data["client_id"],
+                    error=event_data.get("data", {}).get("error", "Erro desconhecido")
+                )
+            elif event_type == "task.screenshot":
+                await self.event_publisher.publish_agent_event(
+                    event_type=event_type,
+                    task_id=event_data["task_id"],
+                    client_id=event_data["client_id"],
+                    data={},
+                    screenshot_data=event_data.get("screenshot"),
+                    current_url=event_data.get("current_url")
+                )
+            else:
+                # Para outros tipos de evento, usa o publish_agent_event genérico
+                await self.event_publisher.publish_agent_event(
+                    event_type=event_type,
+                    task_id=event_data["task_id"],
+                    client_id=event_data["client_id"],
+                    data=event_data.get("data", {})
+                )
+        except Exception as e:
+            self.logger.error(f"Erro ao publicar evento: {str(e)}")
 
     async def create_task(self, task_request: TaskRequest) -> TaskResponse:
         """
         Cria uma nova tarefa e a envia para processamento
         """
-        # Gera um ID único para a tarefa
-        task_id = f"task_{len(self.tasks) + 1}"
+        # Gera um ID único e opaco para a tarefa (não depende do estado do serviço)
+        task_id = uuid.uuid4().hex
         self.logger.info(f"Criando tarefa com ID: {task_id}")
         
         # Armazena a tarefa
@@ -53,7 +181,7 @@ class TaskService:
         
         # Cria a fila e publica a tarefa no RabbitMQ
         try:
-            await self.queue_manager.publish_task(task_id, self.tasks[task_id])
+            await self._publish_task(task_id, self.tasks[task_id])
             self.logger.info(f"Tarefa publicada no RabbitMQ: {task_id}")
         except Exception as e:
             self.logger.error(f"Erro ao publicar tarefa no RabbitMQ: {str(e)}")
@@ -75,10 +203,10 @@ class TaskService:
             self.logger.error(traceback.format_exc())
             queue_info = None
         
-        # Inicia o processamento da tarefa em background
+        # Enfileira a tarefa para os workers de processamento em background
         try:
-            self.logger.info(f"Iniciando processamento da tarefa em background: {task_id}")
-            asyncio.create_task(self.process_task(task_id))
+            self._ensure_workers()
+            self._run_q.put_nowait((task_id, task_request.client_id))
             self.logger.info(f"Tarefa enviada para processamento em background: {task_id}")
         except Exception as e:
             self.logger.error(f"Erro ao iniciar processamento em background: {str(e)}")
@@ -91,21 +219,38 @@ class TaskService:
             queue_info=queue_info
         )
 
-    async def process_task(self, task_id: str):
+    async def process_task(self, task_id: str, client_id: Optional[str] = None):
         """
         Processa uma tarefa com o ID fornecido.
         
+        No máximo AGENT_CONCURRENCY tarefas executam ao mesmo tempo; as
+        demais aguardam a liberação de uma vaga.
+        
         Args:
             task_id (str): ID da tarefa a ser processada
+            client_id (Optional[str]): Cliente da tarefa; se omitido, é obtido
+                da cópia em memória
         """
+        async with self._sem:
+            self.in_flight += 1
+            try:
+                await self._process_task(task_id, client_id)
+            finally:
+                self.in_flight -= 1
+
+    def _set_cached_status(self, task_id: str, status: str):
+        """Atualiza o status na cópia em memória (tarefas concluídas voltam a poder expirar)"""
+        cached = self.tasks.get(task_id)
+        if cached is not None:
+            cached["status"] = status
+
+    async def _process_task(self, task_id: str, client_id: Optional[str] = None):
+        """Executa o processamento de uma tarefa (já dentro do limite de concorrência)"""
         self.logger.info(f"Iniciando processamento da tarefa: {task_id}")
         
-        if task_id not in self.tasks:
-            self.logger.error(f"Tarefa não encontrada em memória: {task_id}")
-            return
-            
-        # Obtém o client_id da tarefa armazenada
-        client_id = self.tasks[task_id].get("client_id", "default")
+        if client_id is None:
+            cached = self.tasks.get(task_id)
+            client_id = cached.get("client_id", "default") if cached is not None else "default"
         
         # Inicializa o storage com client_id e task_id
         storage = StorageManager(client_id=client_id, task_id=task_id)
@@ -113,56 +258,27 @@ class TaskService:
         
         if not task:
             self.logger.error(f"Tarefa não encontrada no storage: {task_id}")
+            self._set_cached_status(task_id, "error")
             return
         
         # Atualiza status para processando
         task.status = "processing"
         await storage.update_task(task)
+        self._set_cached_status(task_id, task.status)
         
         # Callback para publicar eventos durante o processamento
         async def callback(event_data):
-            event_type = event_data.get("event_type", "")
-            
             # Adiciona ids necessários se não estiverem presentes
             if "task_id" not in event_data:
                 event_data["task_id"] = task_id
             if "client_id" not in event_data and task.client_id:
                 event_data["client_id"] = task.client_id
                 
-            # Publica o evento no RabbitMQ usando o método correto
-            try:
-                if event_type == "task.completed":
-                    await self.event_publisher.publish_task_completed(
-                        task_id=event_data["task_id"],
-                        client_id=event_data["client_id"],
-                        result=event_data.get("data", {})
-                    )
-                elif event_type == "task.error":
-                    await self.event_publisher.publish_task_error(
-                        task_id=event_data["task_id"],
-                        client_id=event_data["client_id"],
-                        error=event_data.get("data", {}).get("error", "Erro desconhecido")
-                    )
-                elif event_type == "task.screenshot":
-                    await self.event_publisher.publish_agent_event(
-                        event_type=event_type,
-                        task_id=event_data["task_id"],
-                        client_id=event_data["client_id"],
-                        data={},
-                        screenshot_data=event_data.get("screenshot"),
-                        current_url=event_data.get("current_url")
-                    )
-                else:
-                    # Para outros tipos de evento, usa o publish_agent_event genérico
-                    await self.event_publisher.publish_agent_event(
-                        event_type=event_type,
-                        task_id=event_data["task_id"],
-                        client_id=event_data["client_id"],
-                        data=event_data.get("data", {})
-                    )
-            except Exception as e:
-                self.logger.error(f"Erro ao publicar evento: {str(e)}")
+            # O EventPublisher apenas enfileira o evento na sua fila de saída,
+            # publicada em lotes em background
+            await self._publish_event(event_data)
         
+        agent = None
         try:
             # Cria agent com nova implementação simplificada
             agent = Agent()
@@ -176,7 +292,8 @@ class TaskService:
                     prompt=prompt,
                     client_id=task.client_id,
                     task_id=task_id,
-                    callback=callback
+                    callback=callback,
+                    storage=storage
                 )
             elif task.type == "plan":
                 plan = task.data.get("plan", {})
@@ -190,9 +307,6 @@ class TaskService:
                     "error": f"Tipo de tarefa não suportado: {task.type}"
                 }
             
-            # Limpa o agente após a execução
-            await agent.cleanup()
-            
             # Atualiza o status da tarefa
             if result:
                 if result.get("status") == "error":
@@ -203,6 +317,7 @@ class TaskService:
                     task.result = result
                     
                 await storage.update_task(task)
+                self._set_cached_status(task_id, task.status)
                 self.logger.info(f"Tarefa {task_id} concluída com status: {task.status}")
             
         except Exception as e:
@@ -212,14 +327,19 @@ class TaskService:
             task.status = "error"
             task.error = str(e)
             await storage.update_task(task)
+            self._set_cached_status(task_id, task.status)
             
             # Publica evento de erro
             await callback({
                 "event_type": "task.error",
                 "data": {"error": str(e)}
             })
+        finally:
+            # Limpa o agente após a execução, com sucesso ou erro
+            if agent is not None:
+                await agent.cleanup()
 
-    async def update_llm_settings(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+    async def update_llm_settings(self, settings: Dict[str, Any]) -> Mapping[str, Any]:
         """
         Atualiza as configurações globais do LLM
         
@@ -227,36 +347,46 @@ class TaskService:
             settings: Dicionário com as configurações a serem atualizadas
             
         Returns:
-            Dict[str, Any]: Configurações atuais
+            Mapping[str, Any]: Visão somente leitura das configurações atuais
         """
         for key, value in settings.items():
             if key in self.llm_settings:
                 self.llm_settings[key] = value
                 self.logger.info(f"Configuração global de LLM atualizada: {key}={value}")
         
-        return self.llm_settings.copy()
+        return self._settings_view
     
-    async def get_llm_settings(self) -> Dict[str, Any]:
+    async def get_llm_settings(self) -> Mapping[str, Any]:
         """
         Retorna as configurações globais do LLM
         
         Returns:
-            Dict[str, Any]: Configurações atuais
+            Mapping[str, Any]: Visão somente leitura das configurações atuais
+            (use dict(...) se precisar de uma cópia mutável)
         """
-        return self.llm_settings.copy()
+        return self._settings_view
 
     async def get_task_status(self, task_id: str) -> TaskResponse:
         """
         Obtém o status de uma tarefa específica
         """
-        if task_id not in self.tasks:
+        task = self.tasks.get(task_id)
+        if task is None:
+            # Tarefa removida da memória: consulta o estado persistido
+            stored_task = await StorageManager.find_task(task_id)
+            if stored_task is None:
+                return TaskResponse(
+                    task_id=task_id,
+                    status="not_found",
+                    message="Tarefa não encontrada"
+                )
+            
             return TaskResponse(
                 task_id=task_id,
-                status="not_found",
-                message="Tarefa não encontrada"
+                status=stored_task.status,
+                message=f"Status da tarefa: {stored_task.status}"
             )
         
-        task = self.tasks[task_id]
         queue_data = await self.queue_manager.get_queue_info(task_id)
         
         # Mapeia os campos do RabbitMQ para nosso modelo QueueInfo
@@ -273,6 +403,19 @@ class TaskService:
             queue_info=queue_info
         )
 
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Retorna métricas de processamento de tarefas
+        
+        Returns:
+            Dict[str, Any]: Tarefas em execução, aguardando e o limite configurado
+        """
+        return {
+            "in_flight": self.in_flight,
+            "queued": self._run_q.qsize() if self._run_q is not None else 0,
+            "concurrency": self.agent_concurrency
+        }
+
     async def get_queue_status(self) -> dict:
         """
         Obtém o status de todas as filas
@@ -197,9 +197,13 @@ class RabbitmqClient {
 
         return new Promise((resolve, reject) => {
             try {
-                const routingKey = `/exchange/task_exchange/event.${queueName}`;
+                const destinations = [
+                    `/exchange/task_exchange/event.${queueName}`,
+                    // Screenshots são publicados em um exchange separado
+                    `/exchange/screenshot_exchange/event.${queueName}`
+                ];
                 
-                const subscription = this.client.subscribe(routingKey, (message) => {
+                const onMessage = (message) => {
                     try {
                         const body = JSON.parse(message.body);
                         callback(body);
@@ -212,7 +216,14 @@ class RabbitmqClient {
                     } catch (error) {
                         console.error("Erro ao processar mensagem:", error);
                     }
-                }, { ack: "auto" });
+                };
+
+                const subscriptions = destinations.map(destination =>
+                    this.client.subscribe(destination, onMessage, { ack: "auto" })
+                );
+                const subscription = {
+                    unsubscribe: () => subscriptions.forEach(sub => sub.unsubscribe())
+                };
 
                 this.subscriptions.set(queueName, subscription);
                 resolve(subscription);
@@ -29,6 +29,9 @@ class TestWebSocket {
         try {
             this.log(`Conectando ao bridge RabbitMQ em ${wsUrl}...`);
             this.webSocket = new WebSocket(wsUrl);
+            // Eventos do RabbitMQ chegam como frames binários (JSON em UTF-8)
+            this.webSocket.binaryType = 'arraybuffer';
+            const decoder = new TextDecoder('utf-8');
             
             this.webSocket.onopen = () => {
                 this.connected = true;
@@ -38,7 +41,8 @@ class TestWebSocket {
             
             this.webSocket.onmessage = (event) => {
                 try {
-                    const data = JSON.parse(event.data);
+                    const text = typeof event.data === 'string' ? event.data : decoder.decode(event.data);
+                    const data = JSON.parse(text);
                     
                     // Se for uma mensagem do sistema, apenas exibe no log
                     if (data.type === 'system') {
@@ -5,9 +5,9 @@ Este pacote contém ferramentas para criação, gerenciamento,
 renderização e versionamento de prompts para diferentes situações.
 """
 
-from .prompt_manager import PromptManager
+from .prompt_manager import PromptManager, PromptSegments
 from .prompt_library import PromptLibrary
 from .prompt_renderer import PromptRenderer
 
 # Exportar as classes principais
-__all__ = ['PromptManager', 'PromptLibrary', 'PromptRenderer'] 
\ No newline at end of file
+__all__ = ['PromptManager', 'PromptSegments', 'PromptLibrary', 'PromptRenderer'] 
\ No newline at end of file
@@ -8,53 +8,24 @@ que podem ser carregados de arquivos ou definidos programaticamente.
 import os
 import json
 import logging
-from typing import Dict, Any, Optional, List, Union
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Union, Mapping
 from pathlib import Path
 
+from .prompt_renderer import CompiledTemplate, compile_cached
+
 
 logger = logging.getLogger(__name__)
 
 
-class PromptLibrary:
-    """
-    Mantém uma biblioteca de templates de prompts para diferentes situações.
-    
-    Esta classe é responsável por:
-    1. Carregar templates de prompts de arquivos
-    2. Armazenar templates em memória
-    3. Fornecer acesso aos templates por nome ou categoria
-    4. Manter versionamento de templates
-    """
-    
-    def __init__(
-        self, 
-        library_path: Optional[str] = None,
-        custom_library: Optional[Dict[str, Any]] = None
-    ):
-        """
-        Inicializa a biblioteca de prompts.
-        
-        Args:
-            library_path: Caminho para o diretório contendo templates de prompts
-            custom_library: Biblioteca personalizada de prompts fornecida diretamente
-        """
-        self.library_path = library_path or os.path.join(os.path.dirname(__file__), "templates")
-        self.templates = custom_library or {}
-        self.logger = logging.getLogger(self.__class__.__name__)
-        
-        # Carregar templates padrão
-        self._load_default_templates()
-        
-        # Carregar templates do disco se o caminho existir
-        if os.path.exists(self.library_path):
-            self.load_from_directory(self.library_path)
-    
-    def _load_default_templates(self) -> None:
-        """
-        Carrega templates padrão embutidos.
-        """
-        # Template de sistema padrão
-        self.templates["system_default"] = """
+# Templates padrão embutidos, construídos uma única vez na importação do módulo.
+# O texto fixo vem antes das variáveis para que o início do prompt seja
+# idêntico entre chamadas (aproveitando o cache de prefixo dos provedores de LLM).
+_DEFAULTS: Mapping[str, str] = MappingProxyType({
+    # Template de sistema padrão
+    "system_default": """
         Você é um agente de automação web especializado em executar tarefas em navegadores. 
         Você deve analisar páginas web, interagir com elementos e extrair informações conforme solicitado.
         
@@ -66,10 +37,10 @@ class PromptLibrary:
         5. Extraia e formate os dados conforme solicitado
         
         Utilize as ferramentas disponíveis para interagir com o navegador e execute a tarefa da forma mais eficiente possível.
-        """
-        
-        # Template de navegação
-        self.templates["task_navigation"] = """
+        """,
+    
+    # Template de navegação
+    "task_navigation": """
         Navegue para a URL: {{url}}
         
         Depois de carregar a página:
@@ -78,10 +49,10 @@ class PromptLibrary:
         3. Identifique os elementos de navegação principais
         
         {{additional_instructions}}
-        """
-        
-        # Template de extração
-        self.templates["task_extraction"] = """
+        """,
+    
+    # Template de extração
+    "task_extraction": """
         Extraia as seguintes informações da página atual:
         
         {% for field in fields %}
@@ -91,10 +62,10 @@ class PromptLibrary:
         Retorne os dados extraídos em formato JSON.
         
         {{additional_instructions}}
-        """
-        
-        # Template de preenchimento de formulário
-        self.templates["task_form"] = """
+        """,
+    
+    # Template de preenchimento de formulário
+    "task_form": """
         Preencha o formulário na página atual com os seguintes dados:
         
         {% for field in form_data %}
@@ -104,29 +75,115 @@ class PromptLibrary:
         Após preencher todos os campos, {{submission_action}}.
         
         {{additional_instructions}}
-        """
-        
-        # Template de melhoria geral
-        self.templates["enhance_general"] = """
-        {{base_prompt}}
-        
+        """,
+    
+    # Template de melhoria geral
+    "enhance_general": """
         Instruções adicionais:
         * Documento cada passo da sua execução
         * Se encontrar erros, tente abordagens alternativas
         * Registre quaisquer problemas ou limitações encontrados
-        """
         
-        # Template de melhoria detalhada
-        self.templates["enhance_detail"] = """
+        Tarefa:
         {{base_prompt}}
-        
-        Execute esta tarefa com atenção especial aos detalhes:
+        """,
+    
+    # Template de melhoria detalhada
+    "enhance_detail": """
+        Execute a tarefa abaixo com atenção especial aos detalhes:
         1. Documente o estado inicial da página
         2. Para cada ação, verifique se foi bem-sucedida antes de prosseguir
         3. Captura screenshots em pontos críticos da operação
         4. Valide os dados antes de submeter qualquer formulário
         5. Registre o estado final e o resultado da operação
+        
+        Tarefa:
+        {{base_prompt}}
+        """,
+})
+
+
+def _read_template_file(path: str) -> str:
+    """Lê o conteúdo de um arquivo de template."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class PromptLibrary:
+    """
+    Mantém uma biblioteca de templates de prompts para diferentes situações.
+    
+    Esta classe é responsável por:
+    1. Carregar templates de prompts de arquivos
+    2. Armazenar templates em memória
+    3. Fornecer acesso aos templates por nome ou categoria
+    4. Manter versionamento de templates
+    """
+    
+    def __init__(
+        self, 
+        library_path: Optional[str] = None,
+        custom_library: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Inicializa a biblioteca de prompts.
+        
+        Args:
+            library_path: Caminho para o diretório contendo templates de prompts
+            custom_library: Biblioteca personalizada de prompts fornecida diretamente
+        """
+        self.library_path = library_path or os.path.join(os.path.dirname(__file__), "templates")
+        self.templates = dict(custom_library) if custom_library else {}
+        self.templates.update(_DEFAULTS)
+        # Templates pré-processados, mantidos em paralelo a self.templates
+        self._compiled: Dict[str, CompiledTemplate] = {}
+        # Índice categoria -> {nome: template}, mantido junto com self.templates
+        self._by_category: Dict[str, Dict[str, str]] = defaultdict(dict)
+        # Código gerado dos templates pode ser persistido entre execuções
+        # (opcional, pois grava dentro do diretório da biblioteca)
+        self._compiled_dir = (
+            os.path.join(self.library_path, "__compiled__")
+            if os.getenv("PROMPT_PERSIST_COMPILED", "0") == "1" else None
+        )
+        
+        # Compilar e indexar os templates padrão e os fornecidos diretamente
+        for name, template in self.templates.items():
+            self._index_template(name, template)
+        
+        # Carregar templates do disco se o caminho existir
+        if os.path.exists(self.library_path):
+            self.load_from_directory(self.library_path)
+    
+    def _compile(self, name: str, template: str) -> CompiledTemplate:
+        """
+        Compila um template, reaproveitando o código gerado persistido em
+        disco quando a persistência está habilitada.
+        
+        Args:
+            name: Nome do template
+            template: Conteúdo do template
+            
+        Returns:
+            CompiledTemplate: Template compilado
+        """
+        return compile_cached(template, name, self._compiled_dir)
+    
+    def _index_template(self, name: str, template: str,
+                        compiled: Optional[CompiledTemplate] = None) -> None:
+        """
+        Atualiza as estruturas derivadas (compilado e índice de categoria) de um template.
+        
+        Args:
+            name: Nome do template
+            template: Conteúdo do template
+            compiled: Template já compilado, se disponível
         """
+        if compiled is None:
+            compiled = self._compile(name, template)
+        self._compiled[name] = compiled
+        category, sep, _ = name.partition('_')
+        if sep:
+            self._by_category[category][name] = template
     
     def get_template(self, name: str) -> Optional[str]:
         """
@@ -140,6 +197,18 @@ class PromptLibrary:
         """
         return self.templates.get(name)
     
+    def get_compiled(self, name: str) -> Optional[CompiledTemplate]:
+        """
+        Obtém a versão pré-processada de um template pelo nome.
+        
+        Args:
+            name: Nome do template
+            
+        Returns:
+            CompiledTemplate: Template compilado ou None se não encontrado
+        """
+        return self._compiled.get(name)
+    
     def get_templates_by_category(self, category: str) -> Dict[str, str]:
         """
         Obtém todos os templates de uma categoria específica.
@@ -150,7 +219,7 @@ class PromptLibrary:
         Returns:
             Dict[str, str]: Dicionário de templates da categoria
         """
-        return {k: v for k, v in self.templates.items() if k.startswith(f"{category}_")}
+        return dict(self._by_category.get(category, {}))
     
     def register_template(self, name: str, template: str) -> bool:
         """
@@ -162,12 +231,18 @@ class PromptLibrary:
             
         Returns:
             bool: True se o registro foi bem-sucedido, False caso contrário
+            (inclusive quando o template tem estrutura inválida)
         """
         try:
+            compiled = self._compile(name, template)
+            if compiled.error is not None:
+                logger.error(f"Template '{name}' rejeitado: {str(compiled.error)}")
+                return False
+            self._index_template(name, template, compiled)
             self.templates[name] = template
             return True
         except Exception as e:
-            self.logger.error(f"Erro ao registrar template '{name}': {str(e)}")
+            logger.error(f"Erro ao registrar template '{name}': {str(e)}")
             return False
     
     def save_template(self, name: str, template: str, version: str = "latest") -> bool:
@@ -202,7 +277,7 @@ class PromptLibrary:
             
             return True
         except Exception as e:
-            self.logger.error(f"Erro ao salvar template '{name}': {str(e)}")
+            logger.error(f"Erro ao salvar template '{name}': {str(e)}")
             return False
     
     def load_from_directory(self, directory: str) -> int:
@@ -217,31 +292,45 @@ class PromptLibrary:
         """
         count = 0
         try:
-            # Percorrer diretório e carregar arquivos
-            for root, _, files in os.walk(directory):
-                for file in files:
-                    if file.endswith('.txt') or file.endswith('.json'):
-                        file_path = os.path.join(root, file)
+            # Varredura iterativa com os.scandir: cada DirEntry já traz o tipo,
+            # evitando um stat extra por arquivo
+            found = []
+            pending = [directory]
+            while pending:
+                root = pending.pop()
+                template_type = os.path.basename(root)
+                with os.scandir(root) as entries:
+                    for entry in entries:
+                        # Ignorar arquivos ocultos (swap de editores, .DS_Store etc.)
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                            continue
+                        if not entry.name.endswith(('.txt', '.json')):
+                            continue
                         
                         # Extrair nome do template do nome do arquivo
-                        name_parts = file.split('_')
+                        name_parts = entry.name.split('_')
                         if len(name_parts) >= 2:
                             # Remover extensão e versão
-                            template_type = os.path.basename(root)
-                            template_name = name_parts[0]
-                            name = f"{template_type}_{template_name}"
-                            
-                            # Carregar conteúdo
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                template = f.read()
-                            
-                            # Registrar template
-                            self.register_template(name, template)
-                            count += 1
+                            found.append((f"{template_type}_{name_parts[0]}", entry.path))
+            
+            if not found:
+                return count
+            
+            # Ler os arquivos em paralelo para sobrepor a latência de disco
+            with ThreadPoolExecutor(max_workers=min(8, len(found))) as executor:
+                contents = list(executor.map(_read_template_file, (path for _, path in found)))
+            
+            # Registrar templates na ordem da varredura
+            for (name, _), template in zip(found, contents):
+                self.register_template(name, template)
+                count += 1
             
             return count
         except Exception as e:
-            self.logger.error(f"Erro ao carregar templates do diretório '{directory}': {str(e)}")
+            logger.error(f"Erro ao carregar templates do diretório '{directory}': {str(e)}")
             return count
     
     def reload(self) -> int:
@@ -252,12 +341,11 @@ class PromptLibrary:
             int: Número de templates carregados
         """
         # Limpar templates existentes, mas manter os padrão
-        default_templates = {k: v for k, v in self.templates.items() if k in [
-            "system_default", "task_navigation", "task_extraction", 
-            "task_form", "enhance_general", "enhance_detail"
-        ]}
-        
-        self.templates = default_templates.copy()
+        self.templates = dict(_DEFAULTS)
+        self._compiled = {}
+        self._by_category = defaultdict(dict)
+        for name, template in self.templates.items():
+            self._index_template(name, template)
         
         # Recarregar do disco
         return self.load_from_directory(self.library_path) 
\ No newline at end of file
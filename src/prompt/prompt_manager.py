@@ -8,15 +8,80 @@ de prompts apropriados para diferentes situações e contextos.
 import os
 import json
 import logging
-from typing import Dict, Any, Optional, List, Union
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Union, Hashable
 from pathlib import Path
 
 from .prompt_library import PromptLibrary
-from .prompt_renderer import PromptRenderer
+from .prompt_renderer import PromptRenderer, CompiledTemplate
 
 
 logger = logging.getLogger(__name__)
 
+# Contexto vazio compartilhado (somente leitura), evitando um dict novo por chamada
+_EMPTY = MappingProxyType({})
+
+# Prompt usado quando nem o template de sistema padrão está disponível
+_FALLBACK_SYSTEM_PROMPT = "Você é um agente de automação web. Ajude o usuário a navegar e interagir com páginas web."
+
+
+def _freeze(value: Any) -> Hashable:
+    """
+    Converte um valor de contexto em uma representação hashable.
+    
+    Raises:
+        TypeError: Se o valor (ou algum item dele) não puder ser convertido
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float, type(None))):
+        # O tipo entra na chave: True == 1 == 1.0, mas renderizam diferente
+        return (type(value), value)
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(v) for v in value))
+    if isinstance(value, dict):
+        return ("dict", tuple(sorted((k, _freeze(v)) for k, v in value.items())))
+    hash(value)
+    return value
+
+
+class PromptSegments(str):
+    """
+    Prompt renderizado dividido em prefixo estático e sufixo dinâmico.
+    
+    Continua sendo uma str com o prompt completo; os atributos permitem ao
+    adaptador do LLM marcar o prefixo estático para cache (por exemplo,
+    cache_control no Anthropic) ou mantê-lo no início das mensagens para o
+    cache automático de prefixo da OpenAI.
+    """
+    
+    def __new__(cls, static: str, dynamic: str = ""):
+        segments = super().__new__(cls, static + dynamic)
+        segments.static = static
+        segments.dynamic = dynamic
+        return segments
+
+
+class _ContextKey:
+    """
+    Chave de cache de um contexto: compara pelos valores congelados, mas
+    carrega o contexto original para a renderização em caso de miss.
+    """
+    
+    __slots__ = ("key", "context", "_hash")
+    
+    def __init__(self, context: Dict[str, Any]):
+        self.key = tuple(sorted((k, _freeze(v)) for k, v in context.items()))
+        self.context = context
+        self._hash = hash(self.key)
+    
+    def __hash__(self) -> int:
+        return self._hash
+    
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, _ContextKey) and self.key == other.key
+
 
 class PromptManager:
     """
@@ -43,10 +108,70 @@ class PromptManager:
         """
         self.library = PromptLibrary(library_path, custom_library)
         self.renderer = PromptRenderer()
-        self.logger = logging.getLogger(self.__class__.__name__)
         
-        # Cache de prompts renderizados
-        self._cache = {}
+        # Cache de prompts renderizados por (template compilado, contexto);
+        # um template registrado novamente gera um novo objeto e, portanto, outra chave
+        self._render_cached = lru_cache(maxsize=256)(self._render_uncached)
+        
+        # Tabelas tipo -> template compilado, montadas uma vez por (re)carga
+        self._build_lookup()
+    
+    def _build_lookup(self) -> None:
+        """
+        Monta as tabelas de templates compilados por categoria, evitando
+        montar a chave e consultar a biblioteca a cada chamada.
+        """
+        tables: Dict[str, Dict[str, CompiledTemplate]] = {}
+        for category in ("system", "task", "enhance"):
+            prefix_length = len(category) + 1
+            tables[category] = {
+                name[prefix_length:]: self.library.get_compiled(name)
+                for name in self.library.get_templates_by_category(category)
+            }
+        
+        self._system_templates = tables["system"]
+        self._task_templates = tables["task"]
+        self._enhance_templates = tables["enhance"]
+        self._system_default = self._system_templates.get("default")
+    
+    def _render_uncached(self, template: CompiledTemplate, context_key: _ContextKey) -> PromptSegments:
+        """Renderiza um template (função envolvida pelo cache LRU)."""
+        return self._render_segments(template, context_key.context)
+    
+    def _render_segments(self, template: CompiledTemplate, context: Dict[str, Any]) -> PromptSegments:
+        """
+        Renderiza um template separando o prefixo estático do restante.
+        
+        Args:
+            template: Template compilado
+            context: Dados contextuais
+            
+        Returns:
+            PromptSegments: Prompt renderizado
+        """
+        rendered = self.renderer.render(template, context)
+        prefix = template.static_prefix
+        if prefix and rendered.startswith(prefix):
+            return PromptSegments(prefix, rendered[len(prefix):])
+        return PromptSegments("", rendered)
+    
+    def _render(self, template: CompiledTemplate, context: Dict[str, Any]) -> PromptSegments:
+        """
+        Renderiza um template usando o cache quando o contexto é hashable.
+        
+        Args:
+            template: Template compilado
+            context: Dados contextuais
+            
+        Returns:
+            PromptSegments: Prompt renderizado
+        """
+        try:
+            context_key = _ContextKey(context)
+        except TypeError:
+            # Contexto com valores não hashable: renderiza sem cache
+            return self._render_segments(template, context)
+        return self._render_cached(template, context_key)
     
     def get_system_prompt(self, 
                           agent_type: str = "default", 
@@ -63,24 +188,22 @@ class PromptManager:
         """
         try:
             # Obter template do sistema apropriado
-            template_key = f"system_{agent_type}"
-            template = self.library.get_template(template_key)
+            template = self._system_templates.get(agent_type)
             
             if not template:
-                self.logger.warning(f"Template de sistema '{template_key}' não encontrado, usando default")
-                template = self.library.get_template("system_default")
+                logger.warning(f"Template de sistema 'system_{agent_type}' não encontrado, usando default")
+                template = self._system_default
                 
                 if not template:
-                    self.logger.error("Template de sistema default não encontrado")
-                    return "Você é um agente de automação web. Ajude o usuário a navegar e interagir com páginas web."
+                    logger.error("Template de sistema default não encontrado")
+                    return _FALLBACK_SYSTEM_PROMPT
             
             # Renderizar o prompt com o contexto fornecido
-            context = context or {}
-            return self.renderer.render(template, context)
+            return self._render(template, context or _EMPTY)
             
         except Exception as e:
-            self.logger.error(f"Erro ao obter prompt de sistema: {str(e)}")
-            return "Você é um agente de automação web. Ajude o usuário a navegar e interagir com páginas web."
+            logger.error(f"Erro ao obter prompt de sistema: {str(e)}")
+            return _FALLBACK_SYSTEM_PROMPT
     
     def get_task_prompt(self, 
                         task_type: str, 
@@ -97,18 +220,17 @@ class PromptManager:
         """
         try:
             # Obter template de tarefa apropriado
-            template_key = f"task_{task_type}"
-            template = self.library.get_template(template_key)
+            template = self._task_templates.get(task_type)
             
             if not template:
-                self.logger.warning(f"Template de tarefa '{template_key}' não encontrado")
+                logger.warning(f"Template de tarefa 'task_{task_type}' não encontrado")
                 return context.get("prompt", "")
             
             # Renderizar o prompt com o contexto fornecido
-            return self.renderer.render(template, context)
+            return self._render(template, context)
             
         except Exception as e:
-            self.logger.error(f"Erro ao obter prompt de tarefa: {str(e)}")
+            logger.error(f"Erro ao obter prompt de tarefa: {str(e)}")
             return context.get("prompt", "")
     
     def get_enhanced_prompt(self, 
@@ -128,11 +250,10 @@ class PromptManager:
         """
         try:
             # Obter template de melhoria apropriado
-            template_key = f"enhance_{enhancement_type}"
-            template = self.library.get_template(template_key)
+            template = self._enhance_templates.get(enhancement_type)
             
             if not template:
-                self.logger.debug(f"Template de melhoria '{template_key}' não encontrado, retornando prompt original")
+                logger.debug(f"Template de melhoria 'enhance_{enhancement_type}' não encontrado, retornando prompt original")
                 return base_prompt
             
             # Configurar contexto com o prompt base
@@ -140,10 +261,10 @@ class PromptManager:
             context["base_prompt"] = base_prompt
             
             # Renderizar o prompt com o contexto fornecido
-            return self.renderer.render(template, context)
+            return self._render(template, context)
             
         except Exception as e:
-            self.logger.error(f"Erro ao melhorar prompt: {str(e)}")
+            logger.error(f"Erro ao melhorar prompt: {str(e)}")
             return base_prompt
     
     def register_custom_template(self, name: str, template: str) -> bool:
@@ -158,9 +279,12 @@ class PromptManager:
             bool: True se o registro foi bem-sucedido, False caso contrário
         """
         try:
-            return self.library.register_template(name, template)
+            registered = self.library.register_template(name, template)
+            self._build_lookup()
+            self._render_cached.cache_clear()
+            return registered
         except Exception as e:
-            self.logger.error(f"Erro ao registrar template personalizado: {str(e)}")
+            logger.error(f"Erro ao registrar template personalizado: {str(e)}")
             return False
     
     def reload_library(self) -> bool:
@@ -172,8 +296,9 @@ class PromptManager:
         """
         try:
             self.library.reload()
-            self._cache = {}  # Limpar cache após recarregar
+            self._build_lookup()
+            self._render_cached.cache_clear()  # Limpar cache após recarregar
             return True
         except Exception as e:
-            self.logger.error(f"Erro ao recarregar biblioteca: {str(e)}")
+            logger.error(f"Erro ao recarregar biblioteca: {str(e)}")
             return False 
\ No newline at end of file
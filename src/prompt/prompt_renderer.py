@@ -5,14 +5,618 @@ Este módulo é responsável por renderizar templates de prompts
 substituindo variáveis por valores de contexto específicos.
 """
 
+import os
 import re
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List, Union, Callable
+import itertools
+from functools import lru_cache, partial
+from sys import intern
+from typing import Dict, Any, Optional, List, Union, Callable, Sequence
 from string import Template
 
 
 logger = logging.getLogger(__name__)
 
+# Padrões usados a cada renderização, compilados uma única vez
+_VAR_RE = re.compile(r'\{\{\s*([^|{}]+?)\s*\}\}')
+_FILTER_RE = re.compile(r'\{\{\s*([^{}]+?)\s*\}\}')
+_LOOP_MARKER_RE = re.compile(r'{%\s*(?:for\s+(\w+)\s+in\s+(\w+)|(endfor))\s*%}')
+_COND_RE = re.compile(r'{%\s*if\s+(.+?)\s*%}(.*?)(?:{%\s*else\s*%}(.*?))?{%\s*endif\s*%}', re.DOTALL)
+_BLANK_RE = re.compile(r'\n{3,}')
+_SIMPLE_VAR_RE = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+_EXISTS_RE = re.compile(r'(\w+)\s+exists')
+
+
+# Marcadores de bloco ({% ... %}) e variáveis ({{ ... }}) em uma única varredura
+_TOKEN_RE = re.compile(
+    r'(?P<block>{%\s*(?P<tag>\w+)(?P<args>.*?)\s*%})|(?P<var>\{\{\s*(?P<expr>[^{}]+?)\s*\}\})',
+    re.DOTALL
+)
+_FOR_ARGS_RE = re.compile(r'(\w+)\s+in\s+([\w.]+)')
+
+# Tipos de operação do template compilado
+_LITERAL = 0  # (_LITERAL, texto)
+_VAR = 1      # (_VAR, nome, filtros, texto_original)
+_IF = 2       # (_IF, [(condição ou None para else, ops), ...])
+_FOR = 3      # (_FOR, variável, coleção, ops)
+
+# Versão do gerador de código; entra na chave do código persistido em disco
+CODEGEN_VERSION = "5"
+
+# Filtros nativos implementados diretamente por métodos de str; o valor é
+# convertido para str antes da chamada
+_STR_FILTERS = frozenset({str.upper, str.lower, str.strip})
+
+# Marca variáveis ausentes do contexto (None é um valor válido)
+_MISSING = object()
+
+
+class PreRendered(str):
+    """
+    Texto que já é o resultado final da renderização (sem variáveis, blocos
+    ou linhas vazias a remover); o renderizador o devolve sem processar.
+    """
+    
+    __slots__ = ()
+    
+    is_static = True
+
+
+class TemplateSyntaxError(ValueError):
+    """Erro de estrutura em um template (bloco {% %} inválido ou sem par)."""
+
+
+def _parse(source: str) -> List[tuple]:
+    """
+    Converte o texto de um template em uma lista de operações.
+    
+    Percorre o template uma única vez, usando uma pilha para casar os
+    blocos {% for %}/{% if %} com seus respectivos {% endfor %}/{% endif %}.
+    Nomes de variáveis e filtros são internados (sys.intern), de modo que as
+    buscas no contexto comparem as chaves por identidade.
+    
+    Args:
+        source: Texto do template
+        
+    Returns:
+        List[tuple]: Operações do template
+        
+    Raises:
+        TemplateSyntaxError: Se algum bloco estiver malformado ou sem par
+    """
+    root: List[tuple] = []
+    ops = root
+    # Cada item da pilha: (tag, nó do bloco, lista de operações do nível acima)
+    stack: List[tuple] = []
+    pos = 0
+    
+    for match in _TOKEN_RE.finditer(source):
+        if match.start() > pos:
+            ops.append((_LITERAL, source[pos:match.start()]))
+        pos = match.end()
+        
+        if match.group('var') is not None:
+            parts = match.group('expr').split('|')
+            filters = tuple(intern(part.strip()) for part in parts[1:])
+            ops.append((_VAR, intern(parts[0].strip()), filters, match.group(0)))
+            continue
+        
+        tag = match.group('tag')
+        args = match.group('args').strip()
+        
+        if tag == 'for':
+            for_match = _FOR_ARGS_RE.fullmatch(args)
+            if not for_match:
+                raise TemplateSyntaxError(f"Loop inválido: {match.group(0)}")
+            body: List[tuple] = []
+            node = (_FOR, intern(for_match.group(1)), intern(for_match.group(2)), body)
+            ops.append(node)
+            stack.append(('for', node, ops))
+            ops = body
+        elif tag == 'if':
+            if not args:
+                raise TemplateSyntaxError(f"Condição vazia: {match.group(0)}")
+            body = []
+            branches = [(args, body)]
+            ops.append((_IF, branches))
+            stack.append(('if', branches, ops))
+            ops = body
+        elif tag in ('elif', 'else'):
+            if not stack or stack[-1][0] != 'if' or stack[-1][1][-1][0] is None:
+                raise TemplateSyntaxError(f"'{tag}' fora de um bloco if: {match.group(0)}")
+            if tag == 'elif' and not args:
+                raise TemplateSyntaxError(f"Condição vazia: {match.group(0)}")
+            body = []
+            stack[-1][1].append((args if tag == 'elif' else None, body))
+            ops = body
+        elif tag in ('endfor', 'endif'):
+            if not stack or stack[-1][0] != tag[3:]:
+                raise TemplateSyntaxError(f"'{tag}' sem bloco correspondente: {match.group(0)}")
+            ops = stack.pop()[2]
+        else:
+            raise TemplateSyntaxError(f"Bloco desconhecido: {match.group(0)}")
+    
+    if stack:
+        raise TemplateSyntaxError(f"Bloco '{stack[-1][0]}' não foi fechado")
+    
+    if pos < len(source):
+        ops.append((_LITERAL, source[pos:]))
+    
+    return root
+
+
+def _get_path(value: Any, keys: Sequence[str]) -> Any:
+    """Percorre chaves de dicionários aninhados; retorna _MISSING se alguma faltar."""
+    for key in keys:
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
+
+
+def _ctx_get(context: Dict[str, Any], name: str) -> Any:
+    """
+    Obtém uma variável do contexto; nomes com ponto (a.b) acessam
+    dicionários aninhados quando não existem como chave literal.
+    """
+    value = context.get(name, _MISSING)
+    if value is _MISSING and '.' in name:
+        head, _, path = name.partition('.')
+        value = _get_path(context.get(head, _MISSING), path.split('.'))
+    return value
+
+
+def _parse_condition(condition: str) -> tuple:
+    """
+    Interpreta o texto de uma condição {% if %} uma única vez.
+    
+    Returns:
+        tuple: (tipo, esquerda, direita, direita_literal), com tipo em
+        'exists', '==', '!=' ou 'bool'. Aspas de literais à direita já são
+        removidas aqui, e não a cada avaliação.
+    """
+    if 'exists' in condition:
+        match = _EXISTS_RE.search(condition)
+        if match:
+            return ('exists', intern(match.group(1)), None, False)
+    
+    for operator in ('==', '!='):
+        if operator in condition:
+            parts = condition.split(operator)
+            left = intern(parts[0].strip())
+            right = parts[1].strip()
+            if right.startswith('"') and right.endswith('"'):
+                return (operator, left, right[1:-1], True)
+            return (operator, left, intern(right), False)
+    
+    return ('bool', intern(condition.strip()), None, False)
+
+
+@lru_cache(maxsize=1024)
+def _compile_condition(condition: str) -> Callable[[Dict[str, Any]], bool]:
+    """Converte o texto de uma condição em um predicado sobre o contexto."""
+    kind, left, right, literal = _parse_condition(condition)
+    
+    if kind == 'exists':
+        return lambda context: left in context
+    if kind == 'bool':
+        return lambda context: bool(context.get(left, False))
+    
+    if literal:
+        if kind == '==':
+            return lambda context: context.get(left, left) == right
+        return lambda context: context.get(left, left) != right
+    
+    if kind == '==':
+        return lambda context: context.get(left, left) == context.get(right, right)
+    return lambda context: context.get(left, left) != context.get(right, right)
+
+
+# Nomes disponíveis para o código gerado dos templates
+_CODEGEN_GLOBALS = {
+    "_MISSING": _MISSING,
+    "_ctx_get": _ctx_get,
+    "_get_path": _get_path,
+    "_STR_FILTERS": _STR_FILTERS,
+}
+
+
+class _FormatContext:
+    """
+    Mapeamento usado por str.format_map no caminho rápido: variáveis None
+    viram texto vazio e variáveis ausentes mantêm o placeholder original.
+    """
+    
+    __slots__ = ("context", "placeholders")
+    
+    def __init__(self, context: Dict[str, Any], placeholders: Dict[str, str]):
+        self.context = context
+        self.placeholders = placeholders
+    
+    def __getitem__(self, name: str) -> Any:
+        value = self.context.get(name, _MISSING)
+        if value is _MISSING:
+            return self.placeholders[name]
+        return "" if value is None else value
+
+
+def _build_fast_template(ops: List[tuple]) -> Optional[tuple]:
+    """
+    Converte templates que usam apenas {{var}} simples (sem blocos, filtros
+    ou nomes com ponto) para o formato de str.format_map.
+    
+    Returns:
+        Optional[tuple]: (texto para format_map, placeholders originais por
+        nome) ou None se o template não for simples
+    """
+    parts = []
+    placeholders: Dict[str, str] = {}
+    
+    for op in ops:
+        if op[0] == _LITERAL:
+            parts.append(op[1].replace('{', '{{').replace('}', '}}'))
+        elif op[0] == _VAR:
+            _, name, filters, raw = op
+            if filters or not name.isidentifier() or placeholders.get(name, raw) != raw:
+                return None
+            placeholders[name] = raw
+            parts.append(f"{{{name}}}")
+        else:
+            return None
+    
+    return "".join(parts), placeholders
+
+
+def _count_context_vars(ops: List[tuple], scope: frozenset, counts: Dict[str, int],
+                        weight: int = 1) -> Dict[str, int]:
+    """
+    Conta as referências {{var}} sem filtros que leem do contexto (e não de
+    variáveis de loop). Referências dentro de loops pesam 2, pois podem ser
+    executadas várias vezes.
+    """
+    for op in ops:
+        kind = op[0]
+        if kind == _VAR:
+            _, name, filters, _ = op
+            if not filters and name not in scope and name.partition('.')[0] not in scope:
+                counts[name] = counts.get(name, 0) + weight
+        elif kind == _IF:
+            for _, body in op[1]:
+                _count_context_vars(body, scope, counts, weight)
+        elif kind == _FOR:
+            _count_context_vars(op[3], scope | {op[1]}, counts, 2)
+    return counts
+
+
+def _generate_source(ops: List[tuple]) -> str:
+    """
+    Gera o código Python de uma função _render(ctx, _filters) que
+    produz o texto do template, no estilo da compilação de templates do Jinja.
+    
+    Variáveis de loop viram variáveis locais da função; o restante é lido
+    do contexto em tempo de execução. Condições viram expressões Python
+    embutidas no código, sem reinterpretar o texto a cada renderização.
+    Variáveis do contexto usadas mais de uma vez são convertidas para texto
+    uma única vez, no início da função.
+    
+    Args:
+        ops: Operações do template
+        
+    Returns:
+        str: Código-fonte da função
+    """
+    lines = [
+        "def _render(ctx, _filters):",
+        "    _parts = []",
+        "    _out = _parts.append",
+    ]
+    counter = itertools.count()
+    
+    # Texto já convertido das variáveis repetidas: nome -> variável local
+    # (_MISSING se ausente do contexto)
+    cached: Dict[str, str] = {}
+    repeated = (name for name, count in _count_context_vars(ops, frozenset(), {}).items() if count > 1)
+    for index, name in enumerate(repeated):
+        local = f"_s{index}"
+        cached[name] = local
+        lines.append(f"    {local} = _ctx_get(ctx, {name!r})")
+        lines.append(f"    if {local} is not _MISSING:")
+        lines.append(f"        {local} = '' if {local} is None else str({local})")
+    
+    def lookup(name: str, scope: Dict[str, str]) -> str:
+        if name in scope:
+            return scope[name]
+        head, sep, path = name.partition('.')
+        if sep and head in scope:
+            local = scope[head]
+            keys = tuple(path.split('.'))
+            if len(keys) == 1:
+                # {{item.attr}}: acesso direto ao dicionário do item, sem
+                # chamar _get_path a cada iteração
+                return (f"({local}.get({keys[0]!r}, _MISSING) if {local}.__class__ is dict "
+                        f"else _get_path({local}, {keys!r}))")
+            return f"_get_path({local}, {keys!r})"
+        return f"_ctx_get(ctx, {name!r})"
+    
+    def operand(name: str, default: str, scope: Dict[str, str]) -> str:
+        if name in scope:
+            return scope[name]
+        return f"ctx.get({name!r}, {default})"
+    
+    def condition_expr(condition: str, scope: Dict[str, str]) -> str:
+        kind, left, right, literal = _parse_condition(condition)
+        if kind == 'exists':
+            return "True" if left in scope else f"{left!r} in ctx"
+        if kind == 'bool':
+            return operand(left, "False", scope)
+        right_expr = repr(right) if literal else operand(right, repr(right), scope)
+        return f"{operand(left, repr(left), scope)} {kind} {right_expr}"
+    
+    def emit(ops: List[tuple], indent: int, scope: Dict[str, str]) -> None:
+        pad = "    " * indent
+        start = len(lines)
+        
+        for op in ops:
+            kind = op[0]
+            
+            if kind == _LITERAL:
+                lines.append(f"{pad}_out({op[1]!r})")
+            
+            elif kind == _VAR:
+                _, name, filters, raw = op
+                if not filters and name in cached and name not in scope and name.partition('.')[0] not in scope:
+                    local = cached[name]
+                    lines.append(f"{pad}_out({raw!r} if {local} is _MISSING else {local})")
+                    continue
+                lines.append(f"{pad}_v = {lookup(name, scope)}")
+                lines.append(f"{pad}if _v is _MISSING:")
+                lines.append(f"{pad}    _out({raw!r})")
+                lines.append(f"{pad}else:")
+                for filter_name in filters:
+                    # Filtros desconhecidos são ignorados
+                    lines.append(f"{pad}    _f = _filters.get({filter_name!r})")
+                    lines.append(f"{pad}    if _f is not None:")
+                    lines.append(f"{pad}        if _f in _STR_FILTERS and not isinstance(_v, str):")
+                    lines.append(f"{pad}            _v = str(_v)")
+                    lines.append(f"{pad}        _v = _f(_v)")
+                lines.append(f"{pad}    _out('' if _v is None else str(_v))")
+            
+            elif kind == _IF:
+                keyword = "if"
+                for condition, body in op[1]:
+                    if condition is None:
+                        lines.append(f"{pad}else:")
+                    else:
+                        lines.append(f"{pad}{keyword} {condition_expr(condition, scope)}:")
+                    emit(body, indent + 1, scope)
+                    keyword = "elif"
+            
+            else:  # _FOR
+                _, loop_var, collection_var, body = op
+                index = next(counter)
+                collection = f"_c{index}"
+                local = f"_l{index}"
+                lines.append(f"{pad}{collection} = {lookup(collection_var, scope)}")
+                lines.append(f"{pad}if isinstance({collection}, dict):")
+                lines.append(f"{pad}    {collection} = [{{'key': _k, 'value': _x}} for _k, _x in {collection}.items()]")
+                lines.append(f"{pad}elif not isinstance({collection}, (list, tuple)):")
+                lines.append(f"{pad}    {collection} = ()")
+                lines.append(f"{pad}for {local} in {collection}:")
+                emit(body, indent + 1, {**scope, loop_var: local})
+        
+        if len(lines) == start:
+            lines.append(f"{pad}pass")
+    
+    emit(ops, 1, {})
+    lines.append("    return ''.join(_parts)")
+    return "\n".join(lines) + "\n"
+
+
+def _compile_source(code: str, name: str) -> Callable:
+    """Compila o código gerado de um template e retorna a função _render."""
+    namespace = dict(_CODEGEN_GLOBALS)
+    exec(compile(code, f"<tmpl:{name}>", "exec"), namespace)
+    return namespace["_render"]
+
+
+# Callbacks de re.sub do caminho legado; o contexto é fixado com partial,
+# sem criar uma função aninhada a cada passada
+
+def _replace_var_cb(context: Dict[str, Any], match: re.Match) -> str:
+    """Substitui um {{var}} pelo valor do contexto."""
+    value = context.get(match.group(1).strip(), _MISSING)
+    if value is _MISSING:
+        return match.group(0)  # Manter original se não encontrado
+    return str(value) if value is not None else ""
+
+
+def _apply_filter_cb(filters: Dict[str, Callable], context: Dict[str, Any], match: re.Match) -> str:
+    """Substitui um {{var|filtro}} aplicando os filtros em sequência."""
+    var_parts = match.group(1).split('|')
+    value = context.get(var_parts[0].strip(), _MISSING)
+    if value is _MISSING:
+        return match.group(0)  # Manter original se variável não encontrada
+    
+    # Aplicar filtros em sequência
+    for i in range(1, len(var_parts)):
+        filter_name = var_parts[i].strip()
+        filter_func = filters.get(filter_name)
+        if filter_func is not None:
+            if filter_func in _STR_FILTERS and not isinstance(value, str):
+                value = str(value)
+            value = filter_func(value)
+    
+    return str(value) if value is not None else ""
+
+
+def _replace_attr_cb(item: Dict[str, Any], match: re.Match) -> str:
+    """Substitui um {{item.atributo}} pelo valor do item do loop."""
+    value = item.get(match.group(1), _MISSING)
+    if value is _MISSING:
+        return match.group(0)
+    return str(value) if value is not None else ""
+
+
+def _process_conditional_cb(evaluate: Callable[[str, Dict[str, Any]], bool],
+                            context: Dict[str, Any], match: re.Match) -> str:
+    """Substitui um bloco {% if %} pelo conteúdo do ramo escolhido."""
+    condition = match.group(1).strip()
+    if_content = match.group(2)
+    else_content = match.group(3)
+    
+    # Avaliar condição
+    if evaluate(condition, context):
+        return if_content
+    elif else_content:
+        return else_content
+    else:
+        return ""
+
+
+class CompiledTemplate:
+    """
+    Template pré-processado uma única vez, no momento do registro.
+    
+    O texto é convertido em uma lista de operações (texto literal, variável,
+    condicional e loop) e, a partir dela, em uma função Python compilada
+    que apenas executa contra o contexto, sem reprocessar o template a cada
+    chamada. Templates com erro de estrutura mantêm ops=None e o erro em
+    error; só são renderizados se o caminho legado for habilitado.
+    """
+    
+    __slots__ = (
+        "source", "has_blocks", "has_variables", "ops", "error", "code", "render_fn",
+        "is_simple", "fast_template", "placeholders", "is_static", "static_text",
+        "static_prefix"
+    )
+    
+    def __init__(self, source: str, name: str = "template", code: Optional[str] = None):
+        """
+        Args:
+            source: Texto do template
+            name: Nome usado no código compilado (aparece em tracebacks)
+            code: Código já gerado anteriormente para este texto, se houver
+        """
+        self.source = source
+        # Loops e condicionais sempre começam com {%
+        self.has_blocks = "{%" in source
+        # Variáveis e filtros sempre começam com {{
+        self.has_variables = "{{" in source
+        # Templates sem interpolação têm o resultado final calculado aqui
+        self.is_static = not self.has_blocks and not self.has_variables
+        self.static_text = _BLANK_RE.sub('\n\n', source) if self.is_static else None
+        self.static_prefix = self.static_text or ""
+        self.code = None
+        self.render_fn = None
+        self.is_simple = False
+        self.fast_template = None
+        self.placeholders = None
+        
+        try:
+            self.ops = _parse(source)
+            self.error = None
+        except TemplateSyntaxError as e:
+            logger.warning(f"Template com estrutura inválida: {str(e)}")
+            self.ops = None
+            self.error = e
+            return
+        
+        if self.is_static:
+            return
+        
+        # Texto fixo que antecede a primeira parte dinâmica do template
+        prefix = []
+        for op in self.ops:
+            if op[0] != _LITERAL:
+                break
+            prefix.append(op[1])
+        self.static_prefix = _BLANK_RE.sub('\n\n', "".join(prefix))
+        
+        self.code = code or _generate_source(self.ops)
+        self.render_fn = _compile_source(self.code, name)
+        
+        # Templates só com {{var}} simples são renderizados por str.format_map
+        fast = _build_fast_template(self.ops)
+        if fast is not None:
+            self.is_simple = True
+            self.fast_template, self.placeholders = fast
+    
+    def __bool__(self) -> bool:
+        # Template vazio continua sendo tratado como ausente pelos chamadores
+        return bool(self.source)
+
+
+@lru_cache(maxsize=512)
+def _compile_text(source: str) -> CompiledTemplate:
+    # Templates montados em tempo de execução costumam se repetir entre chamadas;
+    # o CompiledTemplate não guarda estado de renderização e pode ser compartilhado
+    return CompiledTemplate(source)
+
+
+def _is_private_dir(path: str) -> bool:
+    """
+    Cria (com modo 0o700) e valida o diretório do código persistido.
+    
+    O código lido dali é executado, então só é aceito um diretório do próprio
+    usuário e sem permissão de escrita para grupo ou outros.
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.stat(path)
+    except OSError as e:
+        logger.debug(f"Diretório de templates compilados indisponível '{path}': {str(e)}")
+        return False
+    
+    if hasattr(os, "getuid") and (st.st_uid != os.getuid() or st.st_mode & 0o022):
+        logger.warning(
+            f"Ignorando o diretório de templates compilados '{path}': "
+            f"pertence a outro usuário ou permite escrita por terceiros"
+        )
+        return False
+    return True
+
+
+def compile_cached(source: str, name: str = "template", cache_dir: Optional[str] = None) -> CompiledTemplate:
+    """
+    Compila um template reaproveitando o código gerado persistido em disco.
+    
+    O arquivo é identificado pelo hash do texto do template e da versão do
+    gerador de código, e gravado de forma atômica na primeira compilação.
+    
+    Args:
+        source: Texto do template
+        name: Nome usado no código compilado
+        cache_dir: Diretório do código persistido (None desabilita a persistência)
+        
+    Returns:
+        CompiledTemplate: Template compilado
+    """
+    if not cache_dir or not _is_private_dir(cache_dir):
+        return CompiledTemplate(source, name)
+    
+    digest = hashlib.sha1(f"{CODEGEN_VERSION}:{source}".encode('utf-8')).hexdigest()
+    code_path = os.path.join(cache_dir, f"{digest}.py")
+    
+    try:
+        with open(code_path, 'r', encoding='utf-8') as f:
+            code = f.read()
+    except OSError:
+        code = None
+    
+    compiled = CompiledTemplate(source, name, code)
+    
+    if code is None and compiled.code is not None:
+        try:
+            tmp_path = f"{code_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(compiled.code)
+            os.replace(tmp_path, code_path)
+        except OSError as e:
+            logger.debug(f"Não foi possível persistir o template compilado '{name}': {str(e)}")
+    
+    return compiled
+
 
 class PromptRenderer:
     """
@@ -24,51 +628,128 @@ class PromptRenderer:
     3. Formatar o prompt final para uso em diferentes LLMs
     """
     
-    def __init__(self):
+    def __init__(self, legacy_fallback: bool = False):
         """
         Inicializa o renderizador de prompts.
+        
+        Args:
+            legacy_fallback: Renderiza templates com estrutura inválida pelas
+                passadas de regex (e, em caso de erro, por string.Template)
+                em vez de levantar TemplateSyntaxError
         """
-        self.logger = logging.getLogger(self.__class__.__name__)
+        self.legacy_fallback = legacy_fallback
         self.filters = {
             "json": self._filter_json,
-            "uppercase": self._filter_uppercase,
-            "lowercase": self._filter_lowercase,
-            "trim": self._filter_trim,
-            "strip": self._filter_trim  # Alias para trim
+            "uppercase": str.upper,
+            "lowercase": str.lower,
+            "trim": str.strip,
+            "strip": str.strip  # Alias para trim
         }
     
-    def render(self, template: str, context: Dict[str, Any]) -> str:
+    def compile(self, template: str) -> CompiledTemplate:
+        """
+        Pré-processa um template para renderizações repetidas.
+        
+        O resultado é guardado em um cache LRU pelo texto do template, então
+        textos repetidos passados a render() não são reprocessados.
+        
+        Args:
+            template: Texto do template
+            
+        Returns:
+            CompiledTemplate: Template pré-processado
+        """
+        return _compile_text(template)
+    
+    def render(self, template: Union[str, CompiledTemplate], context: Dict[str, Any]) -> str:
         """
         Renderiza um template com dados contextuais.
         
         Args:
-            template: Template a ser renderizado
+            template: Template a ser renderizado (texto ou já compilado)
             context: Dados contextuais para substituição
             
+        Returns:
+            str: Prompt renderizado
+            
+        Raises:
+            TemplateSyntaxError: Se o template tiver estrutura inválida e o
+                caminho legado não estiver habilitado
+        """
+        if isinstance(template, PreRendered):
+            return template
+        if isinstance(template, CompiledTemplate):
+            if template.is_static:
+                return template.static_text
+            compiled = template
+        elif '{{' not in template and '{%' not in template:
+            # Template estático: nada a interpolar, apenas a limpeza final
+            return self._clean_output(template)
+        else:
+            compiled = self.compile(template)
+        
+        if compiled.ops is None:
+            if not self.legacy_fallback:
+                raise compiled.error
+            return self._render_legacy(compiled, context)
+        
+        if compiled.is_simple:
+            rendered = compiled.fast_template.format_map(
+                _FormatContext(context, compiled.placeholders)
+            )
+        else:
+            rendered = compiled.render_fn(context, self.filters)
+        
+        # Limpeza final (remover linhas vazias extras)
+        return self._clean_output(rendered)
+    
+    def _render_legacy(self, compiled: CompiledTemplate, context: Dict[str, Any]) -> str:
+        """
+        Caminho legado (opcional) para templates que não puderam ser compilados.
+        
+        Args:
+            compiled: Template compilado (sem operações)
+            context: Dados contextuais
+            
         Returns:
             str: Prompt renderizado
         """
         try:
+            return self._clean_output(self._render_passes(compiled, context))
+        except Exception as e:
+            logger.error(f"Erro ao renderizar template: {str(e)}")
+            # Fallback para substituição básica
+            return self._simple_replace(compiled.source, context)
+    
+    def _render_passes(self, compiled: CompiledTemplate, context: Dict[str, Any]) -> str:
+        """
+        Renderização legada por passadas de regex, usada para templates
+        cuja estrutura não pôde ser compilada.
+        
+        Args:
+            compiled: Template compilado (sem operações)
+            context: Dados contextuais
+            
+        Returns:
+            str: Template renderizado (sem a limpeza final)
+        """
+        rendered = compiled.source
+        
+        if compiled.has_blocks:
             # Processar loops
-            rendered = self._process_loops(template, context)
+            rendered = self._process_loops(rendered, context)
             
             # Processar condicionais
             rendered = self._process_conditionals(rendered, context)
-            
+        
+        if compiled.has_variables:
             # Substituir variáveis simples (estilo {{var}})
             rendered = self._replace_variables(rendered, context)
             
             # Aplicar filtros (estilo {{var|filter}})
             rendered = self._apply_filters(rendered, context)
-            
-            # Limpeza final (remover linhas vazias extras)
-            rendered = self._clean_output(rendered)
-            
-            return rendered
-        except Exception as e:
-            self.logger.error(f"Erro ao renderizar template: {str(e)}")
-            # Fallback para substituição básica
-            return self._simple_replace(template, context)
+        
+        return rendered
     
     def _simple_replace(self, template: str, context: Dict[str, Any]) -> str:
         """
@@ -83,13 +764,13 @@ class PromptRenderer:
         """
         try:
             # Converter {{var}} para ${var} para usar com string.Template
-            template_str = re.sub(r'\{\{\s*(\w+)\s*\}\}', r'${\1}', template)
+            template_str = _SIMPLE_VAR_RE.sub(r'${\1}', template)
             
             # Criar Template e substituir
             t = Template(template_str)
             return t.safe_substitute(context)
         except Exception as e:
-            self.logger.error(f"Erro na substituição simples: {str(e)}")
+            logger.error(f"Erro na substituição simples: {str(e)}")
             return template
     
     def _replace_variables(self, template: str, context: Dict[str, Any]) -> str:
@@ -103,14 +784,7 @@ class PromptRenderer:
         Returns:
             str: Template com variáveis substituídas
         """
-        def replace_var(match):
-            var_name = match.group(1).strip()
-            if var_name in context:
-                value = context[var_name]
-                return str(value) if value is not None else ""
-            return match.group(0)  # Manter original se não encontrado
-        
-        return re.sub(r'\{\{\s*([^|{}]+?)\s*\}\}', replace_var, template)
+        return _VAR_RE.sub(partial(_replace_var_cb, context), template)
     
     def _apply_filters(self, template: str, context: Dict[str, Any]) -> str:
         """
@@ -123,29 +797,16 @@ class PromptRenderer:
         Returns:
             str: Template com filtros aplicados
         """
-        def apply_filter(match):
-            var_parts = match.group(1).split('|')
-            var_name = var_parts[0].strip()
-            
-            if var_name not in context:
-                return match.group(0)  # Manter original se variável não encontrada
-            
-            value = context[var_name]
-            
-            # Aplicar filtros em sequência
-            for i in range(1, len(var_parts)):
-                filter_name = var_parts[i].strip()
-                if filter_name in self.filters:
-                    value = self.filters[filter_name](value)
-            
-            return str(value) if value is not None else ""
-        
-        return re.sub(r'\{\{\s*([^{}]+?)\s*\}\}', apply_filter, template)
+        return _FILTER_RE.sub(partial(_apply_filter_cb, self.filters, context), template)
     
     def _process_loops(self, template: str, context: Dict[str, Any]) -> str:
         """
         Processa loops no formato {% for item in items %} ... {% endfor %}.
         
+        Percorre o template uma única vez, casando cada {% for %} com seu
+        {% endfor %} por meio de uma pilha, o que também trata loops aninhados.
+        Marcadores sem par são mantidos como texto.
+        
         Args:
             template: Template a ser processado
             context: Dados contextuais
@@ -153,69 +814,71 @@ class PromptRenderer:
         Returns:
             str: Template com loops processados
         """
-        # Encontrar todos os loops no template usando regex
-        loop_pattern = r'{%\s*for\s+(\w+)\s+in\s+(\w+)\s*%}(.*?){%\s*endfor\s*%}'
-        
-        # Função para processar cada loop encontrado
-        def process_loop(match):
-            loop_var = match.group(1).strip()  # item
-            collection_var = match.group(2).strip()  # items
-            loop_content = match.group(3)
-            
-            # Verificar se a coleção existe no contexto
-            if collection_var not in context:
-                return ""  # Remover loop se coleção não existir
-            
-            collection = context[collection_var]
-            if not isinstance(collection, (list, tuple, dict)):
-                return ""  # Remover loop se não for uma coleção
+        parts = []
+        pos = 0
+        stack = []
+        
+        for match in _LOOP_MARKER_RE.finditer(template):
+            if not match.group(3):
+                stack.append(match)
+            elif stack:
+                start = stack.pop()
+                # Apenas o loop mais externo é expandido aqui; os internos são
+                # processados recursivamente a partir do corpo expandido
+                if not stack:
+                    parts.append(template[pos:start.start()])
+                    parts.append(self._expand_loop(
+                        start.group(1), start.group(2),
+                        template[start.end():match.start()], context
+                    ))
+                    pos = match.end()
+        
+        if pos == 0:
+            return template
+        
+        parts.append(template[pos:])
+        return "".join(parts)
+    
+    def _expand_loop(self, loop_var: str, collection_var: str, loop_content: str,
+                     context: Dict[str, Any]) -> str:
+        """
+        Expande o corpo de um loop para cada item da coleção.
+        
+        Args:
+            loop_var: Nome da variável do loop (item)
+            collection_var: Nome da coleção no contexto (items)
+            loop_content: Corpo do loop
+            context: Dados contextuais
             
-            # Construir resultado do loop
-            result = []
+        Returns:
+            str: Corpo repetido para cada item
+        """
+        # Verificar se a coleção existe no contexto
+        collection = context.get(collection_var)
+        if isinstance(collection, dict):
+            # Cada entrada expõe {{item.key}} e {{item.value}}
+            items = [{"key": key, "value": value} for key, value in collection.items()]
+        elif isinstance(collection, (list, tuple)):
+            items = collection
+        else:
+            return ""  # Remover loop se a coleção não existir ou não for uma coleção
+        
+        # Um único padrão por loop para os placeholders {{item.atributo}}
+        attr_re = re.compile(rf'\{{\{{\s*{re.escape(loop_var)}\.(\w+)\s*\}}\}}')
+        
+        result = []
+        for item in items:
+            item_content = loop_content
             
-            if isinstance(collection, (list, tuple)):
-                for item in collection:
-                    # Criar novo conteúdo para este item
-                    item_content = loop_content
-                    
-                    # Substituir as variáveis no formato {{item.name}} ou {{item.value}}
-                    # Lidando especificamente com dicionários
-                    if isinstance(item, dict):
-                        for key, value in item.items():
-                            placeholder = f"{{{{\\s*{loop_var}\\.{key}\\s*}}}}"
-                            replacement = str(value) if value is not None else ""
-                            item_content = re.sub(placeholder, replacement, item_content)
-                    
-                    result.append(item_content)
-            else:  # dict
-                for key, value in collection.items():
-                    # Criar novo conteúdo para este item
-                    item_content = loop_content
-                    
-                    # Substituir {{item.key}} pelo valor da chave
-                    item_content = re.sub(
-                        f"{{{{\\s*{loop_var}\\.key\\s*}}}}",
-                        str(key),
-                        item_content
-                    )
-                    
-                    # Substituir {{item.value}} pelo valor
-                    item_content = re.sub(
-                        f"{{{{\\s*{loop_var}\\.value\\s*}}}}",
-                        str(value) if value is not None else "",
-                        item_content
-                    )
-                    
-                    result.append(item_content)
+            # Substituir as variáveis no formato {{item.name}} ou {{item.value}}
+            # Lidando especificamente com dicionários
+            if isinstance(item, dict):
+                item_content = attr_re.sub(partial(_replace_attr_cb, item), item_content)
             
-            return "".join(result)
-        
-        # Processar todos os loops encontrados
-        result = template
-        while re.search(loop_pattern, result, re.DOTALL):
-            result = re.sub(loop_pattern, process_loop, result, flags=re.DOTALL)
+            # Loops aninhados no corpo
+            result.append(self._process_loops(item_content, context))
         
-        return result
+        return "".join(result)
     
     def _process_conditionals(self, template: str, context: Dict[str, Any]) -> str:
         """
@@ -228,24 +891,8 @@ class PromptRenderer:
         Returns:
             str: Template com condicionais processados
         """
-        def process_conditional(match):
-            condition = match.group(1).strip()
-            if_content = match.group(2)
-            else_content = match.group(4) if match.group(3) else None
-            
-            # Avaliar condição
-            condition_met = self._evaluate_condition(condition, context)
-            
-            if condition_met:
-                return if_content
-            elif else_content:
-                return else_content
-            else:
-                return ""
-        
         # Processar condicionais if/else
-        pattern = r'{%\s*if\s+(.+?)\s*%}(.*?)(?:{%\s*else\s*%}(.*?))?{%\s*endif\s*%}'
-        return re.sub(pattern, process_conditional, template, flags=re.DOTALL)
+        return _COND_RE.sub(partial(_process_conditional_cb, self._evaluate_condition, context), template)
     
     def _evaluate_condition(self, condition: str, context: Dict[str, Any]) -> bool:
         """
@@ -259,49 +906,9 @@ class PromptRenderer:
             bool: Resultado da avaliação
         """
         try:
-            # Suporte para verificação de existência
-            if 'exists' in condition:
-                var_name = re.search(r'(\w+)\s+exists', condition)
-                if var_name:
-                    return var_name.group(1) in context
-            
-            # Verificação de igualdade
-            if '==' in condition:
-                parts = condition.split('==')
-                left = parts[0].strip()
-                right = parts[1].strip()
-                
-                left_val = context.get(left, left)
-                right_val = context.get(right, right)
-                
-                # Remover aspas se forem strings literais
-                if isinstance(right_val, str) and right_val.startswith('"') and right_val.endswith('"'):
-                    right_val = right_val[1:-1]
-                
-                return left_val == right_val
-            
-            # Verificação de desigualdade
-            if '!=' in condition:
-                parts = condition.split('!=')
-                left = parts[0].strip()
-                right = parts[1].strip()
-                
-                left_val = context.get(left, left)
-                right_val = context.get(right, right)
-                
-                # Remover aspas se forem strings literais
-                if isinstance(right_val, str) and right_val.startswith('"') and right_val.endswith('"'):
-                    right_val = right_val[1:-1]
-                
-                return left_val != right_val
-            
-            # Verificação de valor booleano
-            var_name = condition.strip()
-            var_value = context.get(var_name, False)
-            return bool(var_value)
-            
+            return _compile_condition(condition)(context)
         except Exception as e:
-            self.logger.error(f"Erro ao avaliar condição '{condition}': {str(e)}")
+            logger.error(f"Erro ao avaliar condição '{condition}': {str(e)}")
             return False
     
     def _clean_output(self, text: str) -> str:
@@ -314,8 +921,10 @@ class PromptRenderer:
         Returns:
             str: Texto limpo
         """
-        # Remover linhas vazias consecutivas
-        return re.sub(r'\n{3,}', '\n\n', text)
+        # Remover linhas vazias consecutivas (a regex só roda se houver o que remover)
+        if '\n\n\n' not in text:
+            return text
+        return _BLANK_RE.sub('\n\n', text)
     
     # Implementação de filtros
     
@@ -325,31 +934,7 @@ class PromptRenderer:
         try:
             return json.dumps(value, ensure_ascii=False)
         except Exception as e:
-            self.logger.error(f"Erro ao converter para JSON: {str(e)}")
-            return str(value)
-    
-    def _filter_uppercase(self, value: Any) -> str:
-        """Converte valor para maiúsculas."""
-        try:
-            return str(value).upper()
-        except Exception as e:
-            self.logger.error(f"Erro ao converter para maiúsculas: {str(e)}")
-            return str(value)
-    
-    def _filter_lowercase(self, value: Any) -> str:
-        """Converte valor para minúsculas."""
-        try:
-            return str(value).lower()
-        except Exception as e:
-            self.logger.error(f"Erro ao converter para minúsculas: {str(e)}")
-            return str(value)
-    
-    def _filter_trim(self, value: Any) -> str:
-        """Remove espaços extras no início e fim."""
-        try:
-            return str(value).strip()
-        except Exception as e:
-            self.logger.error(f"Erro ao remover espaços: {str(e)}")
+            logger.error(f"Erro ao converter para JSON: {str(e)}")
             return str(value)
     
     def register_filter(self, name: str, filter_func: Callable) -> None:
@@ -3,10 +3,48 @@ Templates de prompts para diferentes situações.
 
 Este módulo contém os templates de prompts utilizados pelo sistema,
 incluindo prompts de sistema e prompts específicos para tarefas.
-"""
 
-from .system_prompts import SYSTEM_PROMPTS
-from .task_prompts import TASK_TEMPLATES
+Os submódulos só são importados no primeiro acesso a cada dicionário
+(PEP 562), para que quem usa apenas um dos conjuntos não carregue o outro.
+"""
 
 # Exportar os dicionários de templates
-__all__ = ['SYSTEM_PROMPTS', 'TASK_TEMPLATES'] 
\ No newline at end of file
+__all__ = ['SYSTEM_PROMPTS', 'TASK_TEMPLATES', 'COMPILED_TASK_TEMPLATES', 'render_task']
+
+
+def _load_system_prompts():
+    from ..prompt_renderer import PreRendered
+    from .system_prompts import SYSTEM_PROMPTS
+
+    # Prompts de sistema não têm sintaxe de template: são marcados como já
+    # renderizados para que o renderizador os devolva diretamente
+    for name, prompt in SYSTEM_PROMPTS.items():
+        SYSTEM_PROMPTS[name] = PreRendered(prompt)
+    return SYSTEM_PROMPTS
+
+
+def _load_task_attribute(name):
+    from . import task_prompts
+    return getattr(task_prompts, name)
+
+
+_LOADERS = {
+    'SYSTEM_PROMPTS': _load_system_prompts,
+    'TASK_TEMPLATES': lambda: _load_task_attribute('TASK_TEMPLATES'),
+    'COMPILED_TASK_TEMPLATES': lambda: _load_task_attribute('COMPILED_TASK_TEMPLATES'),
+    'render_task': lambda: _load_task_attribute('render_task'),
+}
+
+
+def __getattr__(name):
+    loader = _LOADERS.get(name)
+    if loader is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = loader()
+    # Guardar no módulo: acessos seguintes não passam mais por __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,41 @@
+"""
+Ambiente compartilhado de templates.
+
+Concentra, em um único lugar do processo, o renderizador e o cache de
+templates compilados, para que todos os módulos de templates reutilizem as
+mesmas estruturas.
+"""
+
+import threading
+from typing import Dict
+
+from ..prompt_renderer import CompiledTemplate, PromptRenderer
+
+# Renderizador compartilhado pelos módulos de templates
+RENDERER = PromptRenderer()
+
+# Templates compilados por texto: o mesmo texto registrado por módulos
+# diferentes é compilado uma única vez
+_templates: Dict[str, CompiledTemplate] = {}
+_lock = threading.Lock()
+
+
+def get_template(source: str, name: str = "template") -> CompiledTemplate:
+    """
+    Obtém a versão compilada de um template, compilando-o no primeiro uso.
+    
+    Args:
+        source: Texto do template
+        name: Nome usado no código compilado
+        
+    Returns:
+        CompiledTemplate: Template compilado
+    """
+    compiled = _templates.get(source)
+    if compiled is None:
+        with _lock:
+            compiled = _templates.get(source)
+            if compiled is None:
+                compiled = CompiledTemplate(source, name)
+                _templates[source] = compiled
+    return compiled
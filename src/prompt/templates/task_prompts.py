@@ -6,6 +6,11 @@ que os agentes podem executar, como navegação, extração de dados,
 preenchimento de formulários, etc.
 """
 
+from types import MappingProxyType
+from typing import Any
+
+from ._env import RENDERER, get_template
+
 # Template para tarefa de navegação
 NAVIGATION_TASK_TEMPLATE = """
 Navegue para a URL: {{url}}
@@ -165,12 +170,35 @@ Instruções adicionais:
 {% endif %}
 """
 
-# Dicionário mapeando tipos de tarefas para seus templates
-TASK_TEMPLATES = {
+# Dicionário (somente leitura) mapeando tipos de tarefas para seus templates
+TASK_TEMPLATES = MappingProxyType({
     "navigation": NAVIGATION_TASK_TEMPLATE,
     "extraction": EXTRACTION_TASK_TEMPLATE,
     "form": FORM_TASK_TEMPLATE,
     "login": LOGIN_TASK_TEMPLATE,
     "search": SEARCH_TASK_TEMPLATE,
     "screenshot": SCREENSHOT_TASK_TEMPLATE,
-} 
\ No newline at end of file
+})
+
+# Templates pré-compilados uma única vez, na importação do módulo
+COMPILED_TASK_TEMPLATES = MappingProxyType({
+    kind: get_template(template, f"task_{kind}")
+    for kind, template in TASK_TEMPLATES.items()
+})
+
+
+def render_task(kind: str, **context: Any) -> str:
+    """
+    Renderiza o template de um tipo de tarefa já compilado.
+    
+    Args:
+        kind: Tipo de tarefa (navigation, extraction, form, etc)
+        **context: Dados contextuais para renderização
+        
+    Returns:
+        str: Prompt de tarefa renderizado
+        
+    Raises:
+        KeyError: Se não houver template para o tipo de tarefa
+    """
+    return RENDERER.render(COMPILED_TASK_TEMPLATES[kind], context)
@@ -1,22 +1,31 @@
+from dataclasses import dataclass, field
 from pathlib import Path
-import json
-import uuid
-from datetime import datetime
+import asyncio
+import shutil
+import time
 from typing import Optional, Dict, Any
 
+from src.utils import json_utils
+
+@dataclass(slots=True)
 class Task:
     """Representa uma tarefa armazenada."""
-    def __init__(self, task_id: str, client_id: str, status: str, type: str, data: Dict[str, Any], result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
-        self.id = task_id
-        self.client_id = client_id
-        self.status = status
-        self.type = type
-        self.data = data
-        self.result = result
-        self.error = error
+    id: str
+    client_id: str
+    status: str = "pending"
+    type: str = "prompt"
+    data: Dict[str, Any] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    
+    @property
+    def task_id(self) -> str:
+        """Alias de id, nome usado pelo StorageManager."""
+        return self.id
         
     def to_dict(self) -> Dict[str, Any]:
         """Converte a tarefa para um dicionário."""
+        # Cópia rasa: dataclasses.asdict copiaria recursivamente data e result
         return {
             "id": self.id,
             "client_id": self.client_id,
@@ -31,7 +40,7 @@ class Task:
     def from_dict(cls, data: Dict[str, Any]) -> 'Task':
         """Cria uma tarefa a partir de um dicionário."""
         return cls(
-            task_id=data.get("id"),
+            id=data.get("id"),
             client_id=data.get("client_id"),
             status=data.get("status", "pending"),
             type=data.get("type", "prompt"),
@@ -62,6 +71,11 @@ class StorageManager:
         self.base_path = Path("data/clients")
         self.client_path = self.base_path / self.client_id
         self.task_path = self.client_path / self.task_id
+        # Evita refazer as chamadas de mkdir a cada gravação da tarefa
+        self._initialized = False
+        # Última tarefa lida/gravada e o mtime do task.json correspondente
+        self._task_cache: Optional[Task] = None
+        self._task_mtime: Optional[int] = None
         
     def init_storage(self) -> None:
         """
@@ -73,7 +87,16 @@ class StorageManager:
         - videos/
         - traces/
         - tmp/
+        
+        A estrutura é criada apenas na primeira chamada de cada instância.
         """
+        if self._initialized:
+            return
+        
+        # O diretório da tarefa (e seus ancestrais) é criado uma única vez;
+        # os subdiretórios então precisam de um único mkdir cada
+        self.task_path.mkdir(parents=True, exist_ok=True)
+        
         directories = [
             self.get_logs_path(),
             self.get_screenshots_path(),
@@ -83,7 +106,9 @@ class StorageManager:
         ]
         
         for directory in directories:
-            directory.mkdir(parents=True, exist_ok=True)
+            directory.mkdir(exist_ok=True)
+        
+        self._initialized = True
             
     def get_task_path(self) -> Path:
         """
@@ -139,32 +164,88 @@ class StorageManager:
         """
         return self.task_path / "tmp"
     
+    def get_chrome_profile_path(self) -> Path:
+        """
+        Retorna o caminho do perfil do Chrome reutilizado entre execuções do cliente.
+        
+        Returns:
+            Path: Caminho para o diretório do perfil do Chrome
+        """
+        return self.client_path / "chrome_profile"
+    
+    def purge_chrome_profile(self) -> bool:
+        """
+        Remove o perfil persistente do Chrome do cliente (cache, cookies etc).
+        
+        Returns:
+            bool: True se o perfil existia e foi removido, False caso contrário
+        """
+        profile_path = self.get_chrome_profile_path()
+        if not profile_path.exists():
+            return False
+        shutil.rmtree(profile_path, ignore_errors=True)
+        return True
+    
+    def _read_task_sync(self) -> Task:
+        """
+        Lê o task.json da tarefa (bloqueante; executado fora do event loop).
+        
+        Reaproveita a última tarefa lida ou gravada enquanto o arquivo não
+        for modificado.
+        
+        Raises:
+            FileNotFoundError: Se o arquivo da tarefa não existir
+        """
+        task_file = self.task_path / "task.json"
+        mtime = task_file.stat().st_mtime_ns
+        if self._task_cache is not None and mtime == self._task_mtime:
+            return self._task_cache
+        
+        task = Task.from_dict(json_utils.loads(task_file.read_bytes()))
+        self._task_cache = task
+        self._task_mtime = mtime
+        return task
+    
+    def _write_task_sync(self, task: Task) -> None:
+        """
+        Grava o task.json da tarefa (bloqueante; executado fora do event loop).
+        
+        Args:
+            task (Task): Objeto Task a ser gravado
+        """
+        task_file = self.task_path / "task.json"
+        
+        # Garante que o diretório exista
+        if not self._initialized:
+            self.init_storage()
+        
+        # Grava em um arquivo temporário e renomeia: leitores nunca veem
+        # um task.json parcialmente escrito
+        tmp_file = task_file.with_suffix(".json.tmp")
+        # JSON compacto: a versão indentada fica para export_readable()
+        tmp_file.write_bytes(json_utils.dumps(task.to_dict()))
+        tmp_file.replace(task_file)
+        
+        self._task_cache = task
+        self._task_mtime = task_file.stat().st_mtime_ns
+    
     async def get_task(self) -> Optional[Task]:
         """
         Recupera os dados da tarefa do armazenamento.
         
+        A leitura do disco é feita em uma thread, sem bloquear o event loop.
+        
         Returns:
             Optional[Task]: Objeto Task com os dados da tarefa ou None se não existir
         """
-        task_file = self.task_path / "task.json"
-        if not task_file.exists():
+        try:
+            return await asyncio.to_thread(self._read_task_sync)
+        except FileNotFoundError:
             # Se o arquivo não existir, cria uma tarefa com valores padrão
-            task = Task(
-                task_id=self.task_id,
-                client_id=self.client_id,
-                status="pending",
-                type="prompt",
-                data={}
-            )
+            task = Task(id=self.task_id, client_id=self.client_id)
             # Inicializa o armazenamento e salva a tarefa
-            self.init_storage()
             await self.update_task(task)
             return task
-            
-        try:
-            with open(task_file, "r", encoding="utf-8") as f:
-                task_data = json.load(f)
-                return Task.from_dict(task_data)
         except Exception as e:
             print(f"Erro ao ler arquivo de tarefa: {e}")
             return None
@@ -173,25 +254,56 @@ class StorageManager:
         """
         Atualiza os dados da tarefa no armazenamento.
         
+        A gravação em disco é feita em uma thread, sem bloquear o event loop.
+        
         Args:
             task (Task): Objeto Task com os dados atualizados
             
         Returns:
             bool: True se a atualização foi bem-sucedida, False caso contrário
         """
-        task_file = self.task_path / "task.json"
-        
-        # Garante que o diretório exista
-        self.init_storage()
-        
         try:
-            with open(task_file, "w", encoding="utf-8") as f:
-                json.dump(task.to_dict(), f, indent=2, ensure_ascii=False)
+            await asyncio.to_thread(self._write_task_sync, task)
             return True
         except Exception as e:
             print(f"Erro ao atualizar arquivo de tarefa: {e}")
             return False
     
+    async def export_readable(self) -> Optional[str]:
+        """
+        Retorna os dados da tarefa como JSON indentado, para leitura humana.
+        
+        Returns:
+            Optional[str]: JSON formatado ou None se a tarefa não puder ser lida
+        """
+        task = await self.get_task()
+        if task is None:
+            return None
+        return json_utils.dumps(task.to_dict(), indent=True).decode("utf-8")
+    
+    @classmethod
+    async def find_task(cls, task_id: str, base_path: str = "data/clients") -> Optional[Task]:
+        """
+        Localiza uma tarefa persistida apenas pelo seu ID, sem conhecer o cliente.
+        
+        Args:
+            task_id (str): Identificador da tarefa
+            base_path (str): Diretório base dos clientes
+            
+        Returns:
+            Optional[Task]: Tarefa encontrada ou None se não existir
+        """
+        # Rejeita IDs que escapariam do diretório ou seriam interpretados pelo glob
+        if not task_id or task_id in (".", "..") or any(c in task_id for c in "/\\*?[]"):
+            return None
+        
+        task_file = next(Path(base_path).glob(f"*/{task_id}/task.json"), None)
+        if task_file is None:
+            return None
+        
+        storage = cls(client_id=task_file.parent.parent.name, task_id=task_id)
+        return await storage.get_task()
+    
     @staticmethod
     def generate_task_id() -> str:
         """
@@ -204,6 +316,8 @@ class StorageManager:
         Returns:
             str: ID único da tarefa no formato YYYYMMDD_HHMMSS_UUID
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_id = str(uuid.uuid4())[:8]
+        import uuid  # Só necessário aqui; evita o custo na importação do módulo
+        
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        unique_id = uuid.uuid4().hex[:8]
         return f"{timestamp}_{unique_id}" 
\ No newline at end of file
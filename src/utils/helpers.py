@@ -1,3 +1,4 @@
+import atexit
 import base64
 import asyncio
 import logging
@@ -6,32 +7,205 @@ import sys
 import subprocess
 import tempfile
 import shutil
+import signal
+import socket
+import threading
 import time
+import weakref
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Locais típicos do executável do Chrome por plataforma
+# (%LOCALAPPDATA% não é expandido pelo pathlib, só por expandvars)
+if sys.platform == 'win32':
+    _CHROME_CANDIDATES = (
+        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+        r"%LOCALAPPDATA%\Google\Chrome\Application\chrome.exe",
+    )
+elif sys.platform == 'darwin':  # macOS
+    _CHROME_CANDIDATES = (
+        "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+        "~/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    )
+else:  # Linux
+    _CHROME_CANDIDATES = (
+        "/usr/bin/google-chrome",
+        "/usr/bin/google-chrome-stable",
+        "/usr/bin/chromium",
+        "/usr/bin/chromium-browser",
+    )
+
+
+@lru_cache(maxsize=1)
+def find_chrome_path() -> Optional[Path]:
+    """
+    Procura o executável do Chrome nas localizações típicas da plataforma.
+    
+    O resultado é guardado em cache: a localização não muda durante a
+    execução do processo.
+    
+    Returns:
+        Optional[Path]: Caminho do executável ou None se não encontrado
+    """
+    for candidate in _CHROME_CANDIDATES:
+        path = Path(os.path.expandvars(candidate)).expanduser()
+        if path.exists():
+            return path
+    return None
+
+
+@lru_cache(maxsize=1)
+def _running_in_container() -> bool:
+    """
+    Indica se o processo roda em um container Linux (Docker/Kubernetes), onde
+    o /dev/shm costuma ser pequeno (64 MB por padrão no Docker).
+    """
+    if not sys.platform.startswith('linux'):
+        return False
+    if Path('/.dockerenv').exists():
+        return True
+    try:
+        cgroup = Path('/proc/1/cgroup').read_text()
+    except OSError:
+        return False
+    return any(marker in cgroup for marker in ('docker', 'kubepods', 'containerd'))
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, timeout: float = 5.0) -> bool:
+    """
+    Aguarda a porta de depuração do Chrome aceitar conexões.
+    
+    Args:
+        port: Porta de depuração
+        process: Processo do Chrome, verificado a cada tentativa
+        timeout: Tempo máximo de espera em segundos
+        
+    Returns:
+        bool: True se a porta aceitou conexão; False se o processo terminou
+        ou o tempo se esgotou
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(("localhost", port), timeout=0.1):
+                return True
+        except OSError:
+            time.sleep(0.025)
+    return False
+
+
+def find_free_port() -> int:
+    """
+    Retorna uma porta TCP livre em localhost para a depuração remota.
+    
+    Returns:
+        int: Número da porta
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def chrome_profile_in_use(profile_path) -> bool:
+    """
+    Verifica se outro Chrome está usando o perfil.
+    
+    O Chrome cria SingletonLock (symlink "<host>-<pid>", Linux/macOS) ou
+    lockfile (Windows) no perfil aberto; um segundo Chrome no mesmo perfil
+    falha ou repassa a abertura para a instância existente. Um SingletonLock
+    deste host cujo processo já terminou é considerado abandonado.
+    
+    Args:
+        profile_path: Diretório do perfil do Chrome
+        
+    Returns:
+        bool: True se o perfil estiver bloqueado por outro Chrome
+    """
+    profile_path = Path(profile_path)
+    lock = profile_path / "SingletonLock"
+    if os.path.islink(lock):
+        host, _, pid = os.readlink(lock).rpartition("-")
+        if host == socket.gethostname() and pid.isdigit():
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return False
+            except OSError:
+                pass
+        return True
+    return os.path.lexists(lock) or (profile_path / "lockfile").exists()
+
+
+# BrowserManagers com Chrome possivelmente ativo, encerrados no atexit/SIGTERM
+_live_managers = weakref.WeakSet()
+
+
+def _cleanup_live_managers():
+    """Encerra o Chrome de todos os BrowserManagers ainda ativos"""
+    for manager in list(_live_managers):
+        manager.cleanup()
+
+
+# Garante que o Chrome e o diretório temporário não fiquem para trás se o
+# processo terminar sem chamar cleanup()
+atexit.register(_cleanup_live_managers)
+
+
+def _install_sigterm_handler():
+    """
+    Converte SIGTERM em saída normal (executando os handlers do atexit),
+    apenas se ninguém mais tiver registrado um handler para o sinal.
+    SIGINT já vira KeyboardInterrupt e passa pelo atexit.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    try:
+        if signal.getsignal(signal.SIGTERM) is not signal.SIG_DFL:
+            return
+        
+        def handle_sigterm(signum, frame):
+            _cleanup_live_managers()
+            raise SystemExit(128 + signum)
+        
+        signal.signal(signal.SIGTERM, handle_sigterm)
+    except (ValueError, OSError) as e:
+        logger.debug(f"[CHROME] Não foi possível registrar handler de SIGTERM: {str(e)}")
+
+
 class BrowserManager:
     """
     Gerencia a inicialização e configuração do navegador
     para contornar limitações do asyncio no Windows
-    """
-    _instance = None
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(BrowserManager, cls).__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
+    Cada instância controla o seu próprio processo do Chrome, de modo que
+    tarefas concorrentes não compartilham navegador nem perfil.
+    """
+    # Perfis persistentes em uso por instâncias deste processo
+    _claimed_profiles = set()
+    _claim_lock = threading.Lock()
     
     def __init__(self):
-        if not self._initialized:
-            self.chrome_process = None
-            self.chrome_user_data_dir = None
-            self.is_temp_user_data = False
-            self.cdp_url = None
-            self._initialized = True
+        self.chrome_process = None
+        self.chrome_user_data_dir = None
+        self.is_temp_user_data = False
+        self.cdp_url = None
+        
+        _live_managers.add(self)
+        _install_sigterm_handler()
     
-    def start_chrome_for_debugging(self, chrome_path=None, port=9222, user_data_dir=None):
+    def start_chrome_for_debugging(self, chrome_path=None, port=9222, user_data_dir=None, storage=None):
         """
         Inicia o Chrome com o modo de depuração remota
         
@@ -39,6 +213,9 @@ class BrowserManager:
             chrome_path: Caminho para o executável do Chrome
             port: Porta para o modo de depuração
             user_data_dir: Diretório de dados do usuário (opcional)
+            storage: StorageManager da tarefa (opcional); sem user_data_dir,
+                usa o perfil persistente do cliente em vez de um diretório temporário,
+                a menos que o perfil já esteja aberto por outro Chrome
             
         Returns:
             URL de depuração
@@ -51,31 +228,17 @@ class BrowserManager:
         self.cleanup()
         
         if not chrome_path:
-            # Procura o Chrome nas localizações típicas
-            possible_paths = [
-                r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-                r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
-                r"%LOCALAPPDATA%\Google\Chrome\Application\chrome.exe"
-            ]
-            
-            for path in possible_paths:
-                expanded_path = os.path.expandvars(path)
-                if os.path.exists(expanded_path):
-                    chrome_path = expanded_path
-                    break
+            # Procura o Chrome nas localizações típicas (resultado em cache)
+            chrome_path = find_chrome_path()
         
-        if not chrome_path or not os.path.exists(chrome_path):
+        if not chrome_path or not Path(chrome_path).exists():
             raise ValueError(f"Chrome não encontrado. Por favor, especifique o caminho manualmente.")
         
-        # Criar diretório temporário para o usuário, se não especificado
-        temp_user_data = False
-        if not user_data_dir:
-            user_data_dir = tempfile.mkdtemp(prefix="chrome_user_data_")
-            temp_user_data = True
+        user_data_dir, temp_user_data = self._resolve_user_data_dir(user_data_dir, storage)
         
         # Argumentos para o Chrome
         args = [
-            chrome_path,
+            str(chrome_path),
             f"--remote-debugging-port={port}",
             f"--user-data-dir={user_data_dir}",
             "--no-first-run",
@@ -84,7 +247,6 @@ class BrowserManager:
             "--disable-background-timer-throttling",
             "--disable-client-side-phishing-detection",
             "--disable-default-apps",
-            "--disable-dev-shm-usage",
             "--disable-extensions",
             "--disable-hang-monitor",
             "--disable-popup-blocking",
@@ -99,25 +261,36 @@ class BrowserManager:
             "--headless=new"  # Modo headless novo
         ]
         
+        # Fora de containers o /dev/shm (em memória) é grande o bastante; usar
+        # /tmp no lugar dele só é necessário quando o /dev/shm é limitado
+        if _running_in_container():
+            args.append("--disable-dev-shm-usage")
+        
         logger.info(f"[CHROME] Iniciando Chrome em: {chrome_path}")
         logger.info(f"[CHROME] Porta de depuração: {port}")
         logger.info(f"[CHROME] Diretório de dados: {user_data_dir}")
         
-        process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # stdout é descartado; stderr só é lido se o Chrome falhar ao iniciar e
+        # é fechado em seguida, para que um pipe não drenado nunca bloqueie o Chrome
+        process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
         
-        # Espera um pouco para o Chrome iniciar
-        time.sleep(2)
+        # Esperar o Chrome abrir a porta de depuração (ou terminar)
+        if not _wait_for_port(port, process) and process.poll() is None:
+            logger.warning(f"[CHROME] Porta de depuração {port} ainda não responde, continuando")
         
         # Verificar se o processo está rodando
         if process.poll() is not None:
-            stdout, stderr = process.communicate()
+            _, stderr = process.communicate()
             logger.error(f"[CHROME] Falha ao iniciar Chrome: returncode={process.returncode}")
-            logger.error(f"[CHROME] stdout: {stdout.decode('utf-8', errors='ignore')}")
             logger.error(f"[CHROME] stderr: {stderr.decode('utf-8', errors='ignore')}")
             if temp_user_data:
                 shutil.rmtree(user_data_dir, ignore_errors=True)
+            else:
+                self._release_profile(user_data_dir)
             raise RuntimeError(f"Falha ao iniciar Chrome: {stderr.decode('utf-8', errors='ignore')}")
         
+        process.stderr.close()
+        
         # URL de depuração para o Playwright se conectar
         debug_url = f"http://localhost:{port}"
         
@@ -129,6 +302,42 @@ class BrowserManager:
         
         return debug_url
     
+    def _resolve_user_data_dir(self, user_data_dir=None, storage=None):
+        """
+        Escolhe o diretório de dados do Chrome.
+        
+        O perfil persistente do cliente não é apagado no cleanup: o Chrome
+        reaproveita o cache em disco na próxima execução. Se o perfil já
+        estiver em uso (outra tarefa do mesmo cliente), usa um diretório
+        temporário.
+        
+        Returns:
+            Tuple[Path, bool]: Diretório e se ele é temporário
+        """
+        if user_data_dir:
+            return Path(user_data_dir), False
+        
+        if storage is not None:
+            profile_path = Path(storage.get_chrome_profile_path())
+            with self._claim_lock:
+                if profile_path not in self._claimed_profiles and not chrome_profile_in_use(profile_path):
+                    profile_path.mkdir(parents=True, exist_ok=True)
+                    self._claimed_profiles.add(profile_path)
+                    return profile_path, False
+            logger.info(f"[CHROME] Perfil em uso, usando diretório temporário: {profile_path}")
+        
+        return Path(tempfile.mkdtemp(prefix="chrome_user_data_")), True
+    
+    def _release_profile(self, user_data_dir):
+        """Libera o perfil persistente para outras instâncias"""
+        with self._claim_lock:
+            self._claimed_profiles.discard(Path(user_data_dir))
+    
+    def close(self):
+        """Encerra o Chrome e deixa de acompanhar a instância no atexit/SIGTERM"""
+        self.cleanup()
+        _live_managers.discard(self)
+    
     def cleanup(self):
         """Limpa o processo do Chrome se estiver rodando"""
         if self.chrome_process:
@@ -136,7 +345,15 @@ class BrowserManager:
                 if self.chrome_process.poll() is None:  # Ainda está rodando
                     logger.debug("[CHROME] Matando processo do Chrome")
                     self.chrome_process.terminate()
-                    self.chrome_process.wait(timeout=3)  # Espera até 3 segundos para terminar
+                    # Saídas cooperativas terminam em poucos ms: verificar por até 300 ms
+                    for _ in range(30):
+                        if self.chrome_process.poll() is not None:
+                            break
+                        time.sleep(0.01)
+                    else:
+                        logger.debug("[CHROME] Chrome não respondeu ao terminate, forçando kill")
+                        self.chrome_process.kill()
+                        self.chrome_process.wait(timeout=1)
             except Exception as e:
                 logger.error(f"[CHROME] Erro ao matar processo do Chrome: {str(e)}")
             
@@ -147,6 +364,8 @@ class BrowserManager:
                     shutil.rmtree(self.chrome_user_data_dir, ignore_errors=True)
                 except Exception as e:
                     logger.error(f"[CHROME] Erro ao remover diretório de dados: {str(e)}")
+            elif self.chrome_user_data_dir:
+                self._release_profile(self.chrome_user_data_dir)
             
             self.chrome_process = None
             self.chrome_user_data_dir = None
@@ -174,10 +393,8 @@ async def capture_screenshot(browser_context):
         
         # Use an existing page or create a new one if none exist
         if pages:
-            active_page = pages[0]
-            for page in pages:
-                if page.url != "about:blank":
-                    active_page = page
+            # Primeira página com conteúdo, ou a primeira aba se todas estiverem em branco
+            active_page = next((page for page in pages if page.url != "about:blank"), pages[0])
         else:
             return None
         
@@ -187,8 +404,10 @@ async def capture_screenshot(browser_context):
             quality=75,
             scale="css"
         )
-        encoded = base64.b64encode(screenshot).decode('utf-8')
-        return encoded
+        # pybase64 (SIMD) já devolve str, sem o .decode intermediário
+        if PYBASE64_AVAILABLE:
+            return pybase64.b64encode_as_string(screenshot)
+        return base64.b64encode(screenshot).decode('ascii')
     except Exception as e:
         logger.error(f"Erro ao capturar screenshot: {str(e)}")
         return None
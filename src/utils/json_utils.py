@@ -0,0 +1,56 @@
+"""
+Serialização JSON rápida usando orjson quando disponível,
+com fallback para o módulo json da biblioteca padrão.
+"""
+
+import json
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# orjson.JSONDecodeError é subclasse de json.JSONDecodeError
+JSONDecodeError = json.JSONDecodeError
+
+
+def dumps(obj: Any, indent: bool = False, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    Serializa um objeto em JSON codificado em UTF-8.
+    
+    Args:
+        obj: Objeto a ser serializado
+        indent: Se True, formata a saída com indentação de 2 espaços
+        default: Função chamada para objetos não serializáveis (opcional)
+        
+    Returns:
+        bytes: JSON em UTF-8 (compacto, a menos que indent=True)
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option)
+    
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=default).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=default).encode("utf-8")
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """
+    Desserializa um documento JSON a partir de bytes ou str.
+    
+    Args:
+        data: Documento JSON
+        
+    Returns:
+        Any: Objeto Python correspondente
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
@@ -1,7 +1,8 @@
 import subprocess
-import os
-import sys
 import time
+from pathlib import Path
+
+from src.utils.helpers import find_chrome_path
 
 print("=" * 70)
 print("Inicializador Manual do Chrome para Z2B Browser API")
@@ -14,23 +15,19 @@ print("=" * 70)
 print("\n")
 
 # Configuração
-CHROME_PATH = r"C:\Program Files\Google\Chrome\Application\chrome.exe"  # Ajuste conforme o caminho no seu sistema
-if not os.path.exists(CHROME_PATH) and sys.platform == 'win32':
-    CHROME_PATH = r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe"
-elif sys.platform == 'darwin':  # macOS
-    CHROME_PATH = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
-elif sys.platform == 'linux':  # Linux
-    CHROME_PATH = "/usr/bin/google-chrome"
+# Mesma busca por plataforma usada pelo BrowserManager; ajuste o caminho
+# manualmente se o Chrome estiver instalado em outro local
+CHROME_PATH = find_chrome_path() or Path(r"C:\Program Files\Google\Chrome\Application\chrome.exe")
 
 DEBUGGING_PORT = 9222
-USER_DATA_DIR = os.path.join(os.getcwd(), "chrome_data")
+USER_DATA_DIR = Path.cwd() / "chrome_data"
 
 # Criar diretório de dados se não existir
-os.makedirs(USER_DATA_DIR, exist_ok=True)
+USER_DATA_DIR.mkdir(exist_ok=True)
 
 # Comando para iniciar o Chrome com depuração remota
 chrome_cmd = [
-    CHROME_PATH,
+    str(CHROME_PATH),
     f"--remote-debugging-port={DEBUGGING_PORT}",
     f"--user-data-dir={USER_DATA_DIR}",
     "--no-first-run",
@@ -12,7 +12,6 @@ import os
 import sys
 import asyncio
 import logging
-import json
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -2,14 +2,26 @@
 # -*- coding: utf-8 -*-
 
 import asyncio
+import html
 import logging
 import os
+import sys
 import json
 import base64
+import hashlib
 import time
 from datetime import datetime
+from functools import lru_cache
 from dotenv import load_dotenv
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
+
+# uvloop reduz o custo por await nos callbacks; opcional e indisponível no Windows
+if sys.platform != 'win32':
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
 
 # Configurar logging básico
 logging.basicConfig(level=logging.INFO, 
@@ -21,78 +33,244 @@ load_dotenv()
 
 # Importar a classe Agent do arquivo certo
 from src.agent.agent import Agent
+from src.utils import json_utils
+
+# Compressão opcional dos artefatos de texto das etapas
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Diretórios já garantidos nesta execução (evita um stat/mkdir por evento)
+_diretorios_criados: set = set()
+
+
+def _garantir_diretorio(path: str) -> None:
+    """Cria o diretório apenas na primeira vez em que ele é usado"""
+    if path not in _diretorios_criados:
+        os.makedirs(path, exist_ok=True)
+        _diretorios_criados.add(path)
+
+
+def _escrever_bytes(path: str, data: bytes, comprimir: bool = False) -> str:
+    """
+    Grava bytes em um arquivo, criando o diretório se necessário
+    
+    Com comprimir=True o conteúdo é gravado com zstd em path + ".zst".
+    Retorna o caminho efetivamente gravado.
+    """
+    if comprimir:
+        path += ".zst"
+        data = zstd.ZstdCompressor(level=3).compress(data)
+    _garantir_diretorio(os.path.dirname(path))
+    # Escrita direta no descritor, sem a cópia extra do buffer do objeto arquivo
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        mv = memoryview(data)
+        while mv:
+            mv = mv[os.write(fd, mv):]
+    finally:
+        os.close(fd)
+    return path
+
+
+def _ler_bytes(path: str) -> bytes:
+    """Lê um artefato gravado por _escrever_bytes, descomprimindo se for .zst"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".zst"):
+        data = zstd.ZstdDecompressor().decompress(data)
+    return data
+
+
+def _escrever_texto(path: str, texto: str, comprimir: bool = False) -> str:
+    """Grava texto UTF-8 em um arquivo"""
+    return _escrever_bytes(path, texto.encode("utf-8"), comprimir)
+
+
+def _escrever_json(path: str, obj: Any, comprimir: bool = False) -> str:
+    """Grava um objeto como JSON indentado (orjson quando disponível)"""
+    return _escrever_bytes(path, json_utils.dumps(obj, indent=True, default=str), comprimir)
+
+
+def _escrever_screenshot(path: str, screenshot: Union[str, bytes, bytearray]) -> None:
+    """Grava um screenshot, decodificando o base64 apenas quando necessário"""
+    if isinstance(screenshot, (bytes, bytearray)):
+        # Screenshot já em bytes crus (PNG)
+        _escrever_bytes(path, screenshot)
+    else:
+        _escrever_bytes(path, base64.b64decode(screenshot))
+
+
+@lru_cache(maxsize=512)
+def _escape_pre(texto: str) -> str:
+    """html.escape memoizado: prompts se repetem muito entre as etapas"""
+    return html.escape(texto)
+
+def _esc(valor: Any) -> str:
+    """Escapa um valor dinâmico para inclusão no relatório HTML"""
+    return _escape_pre(valor if isinstance(valor, str) else str(valor))
+
+def _formatar_data(iso: Optional[str]) -> str:
+    """Formata um timestamp ISO para exibição, sem frações de segundo"""
+    return iso.replace('T', ' ').split('.')[0] if iso else 'N/A'
+
+# Trecho estático do relatório HTML, montado uma única vez no carregamento do módulo
+_RELATORIO_CSS = """
+                body { font-family: Arial, sans-serif; line-height: 1.6; padding: 20px; max-width: 1200px; margin: 0 auto; }
+                h1, h2, h3 { color: #333; }
+                .container { border: 1px solid #ddd; padding: 15px; margin-bottom: 20px; border-radius: 5px; }
+                .etapa { border: 1px solid #ccc; padding: 10px; margin: 10px 0; border-radius: 5px; }
+                .screenshot { max-width: 100%; border: 1px solid #ddd; margin: 10px 0; }
+                pre { background-color: #f5f5f5; padding: 10px; border-radius: 3px; overflow-x: auto; }
+                .info { color: #333; }
+                .success { color: green; }
+                .error { color: red; }
+                .metadata { font-size: 0.9em; color: #666; }
+                .plano { background-color: #f0f8ff; padding: 10px; border-left: 3px solid #4682b4; }
+"""
 
 class AgentRastreador:
     """
     Classe para rastrear a execução detalhada do agente
     """
-    def __init__(self, prompt_original: str):
+    def __init__(self, prompt_original: str, compression_enabled: bool = False):
         # Salvar o prompt original do usuário
         self.prompt_original = prompt_original
         
+        # Artefatos de texto das etapas (JSON, prompt, resposta) comprimidos com zstd;
+        # screenshots PNG já são comprimidos e ficam como estão
+        if compression_enabled and not ZSTD_AVAILABLE:
+            logger.warning("zstandard não instalado: artefatos serão gravados sem compressão")
+        self.compression_enabled = compression_enabled and ZSTD_AVAILABLE
+        
+        # Instante de início: relógio monotônico para a duração, parede para exibição
+        self._t0_monotonic = time.monotonic()
+        self._t0_wall = datetime.now()
+        self.timestamp = self._t0_wall.strftime("%Y%m%d_%H%M%S")
         # Criar diretório para logs e screenshots
-        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.log_dir = os.path.join("agent_logs", f"execucao_{self.timestamp}")
-        os.makedirs(self.log_dir, exist_ok=True)
+        _garantir_diretorio(self.log_dir)
         
         # Arquivo de log principal
         self.log_file = os.path.join(self.log_dir, "execucao_log.json")
         
+        # Registro incremental: uma linha JSON por evento, sem reescrever o histórico
+        self._events_fp = open(os.path.join(self.log_dir, "events.jsonl"), "ab", buffering=1 << 16)
+        
         # Inicializar estrutura de dados do log
         self.log_data = {
             "prompt_original": prompt_original,
             "prompt_efetivo": None,  # Será preenchido depois
             "plano_acoes": None,     # Será preenchido se disponível
             "etapas": [],            # Lista de etapas executadas
-            "timestamp_inicio": datetime.now().isoformat(),
+            "timestamp_inicio": self._t0_wall.isoformat(),
             "timestamp_fim": None,
             "duracao_segundos": None,
             "status": "iniciado"
         }
         
+        # Gravações do log são agrupadas: eventos só marcam o log como
+        # alterado e uma tarefa em segundo plano grava a cada intervalo
+        self._dirty = False
+        self._flush_interval = 2.0
+        
         # Salvar log inicial
         self._salvar_log()
         
         # Contador de etapas
         self.contador_etapas = 0
         
+        # O callback apenas enfileira o evento; uma tarefa consumidora faz a
+        # serialização e o I/O sem atrasar o agente
+        self._fila: asyncio.Queue = asyncio.Queue(maxsize=1024)
+        
+        # Prompts deduplicados entre etapas: hash do conteúdo -> arquivo em prompts/
+        self._prompt_store: Dict[str, str] = {}
+        self._writer_task: Optional[asyncio.Task] = None
+        
         logger.info(f"Rastreador inicializado. Logs serão salvos em: {self.log_dir}")
     
     async def _callback_rastreador(self, event_data: Dict[str, Any]):
         """
-        Callback que processa eventos do agente e registra no log
+        Callback do agente: enfileira o evento com o instante em que ocorreu
         """
+        item = (datetime.now(), event_data)
+        try:
+            self._fila.put_nowait(item)
+        except asyncio.QueueFull:
+            # Fila cheia: descarta o evento mais antigo em vez de bloquear o agente
+            descartado = self._fila.get_nowait()
+            self._fila.task_done()
+            logger.warning("Fila de eventos cheia; evento descartado: %s", descartado[1].get('event_type'))
+            self._fila.put_nowait(item)
+    
+    async def _writer_loop(self):
+        """Consome a fila de eventos e processa cada um em ordem"""
+        while True:
+            now, event_data = await self._fila.get()
+            try:
+                await self._processar_evento(event_data, now)
+            except Exception as e:
+                logger.error("Erro ao processar evento: %s", e)
+            finally:
+                self._fila.task_done()
+    
+    async def _processar_evento(self, event_data: Dict[str, Any], now: datetime):
+        """
+        Processa um evento do agente e registra no log
+        """
+        # Atributos usados em quase todos os eventos, ligados a variáveis locais
+        log_dir = self.log_dir
+        log_data = self.log_data
+        comprimir = self.compression_enabled
+        log = logger.info
+        
         # Extrair tipo de evento
         event_type = event_data.get("event_type", "desconhecido")
-        logger.info(f"Evento recebido: {event_type}")
+        log("Evento recebido: %s", event_type)
+        
+        # Um único instante por evento, reutilizado em timestamps e nomes de arquivo
+        now_iso = now.isoformat()
+        now_epoch = int(now.timestamp())
+        self._registrar_evento(event_data, now_iso)
         
         # Processar evento conforme seu tipo
         if event_type == "agent.plan":
             # Plano de ação do agente
             plano = event_data.get("plan", [])
-            self.log_data["plano_acoes"] = plano
+            log_data["plano_acoes"] = plano
             
             # Salvar plano separadamente para fácil acesso
-            plano_file = os.path.join(self.log_dir, "plano_acoes.json")
-            with open(plano_file, "w", encoding="utf-8") as f:
-                json.dump(plano, f, indent=2, ensure_ascii=False)
+            plano_file = os.path.join(log_dir, "plano_acoes.json")
+            await asyncio.to_thread(_escrever_json, plano_file, plano)
             
-            logger.info(f"Plano com {len(plano)} ações registrado")
+            log("Plano com %s ações registrado", len(plano))
             
         elif event_type == "agent.step":
             # Etapa do agente sendo executada
             self.contador_etapas += 1
+            numero = self.contador_etapas
+            
+            # Diretório para esta etapa (criado junto com o primeiro arquivo)
+            etapa_dir = os.path.join(log_dir, f"etapa_{numero}")
             
-            # Criar diretório para esta etapa
-            etapa_dir = os.path.join(self.log_dir, f"etapa_{self.contador_etapas}")
-            os.makedirs(etapa_dir, exist_ok=True)
+            # O prompt (que se repete quase inteiro entre etapas) é gravado uma
+            # única vez em prompts/ e a etapa guarda só a referência ao hash
+            prompt_llm = event_data.get("prompt")
+            prompt_ref = None
+            if isinstance(prompt_llm, str) and prompt_llm:
+                prompt_ref = await self._armazenar_prompt(prompt_llm)
+                prompt_llm = None
             
             # Extrair informações da etapa
             etapa_info = {
-                "numero": self.contador_etapas,
-                "timestamp": datetime.now().isoformat(),
+                "numero": numero,
+                "timestamp": now_iso,
                 "action": event_data.get("action"),
-                "prompt_llm": event_data.get("prompt"),
+                "prompt_llm": prompt_llm,
+                "prompt_llm_ref": prompt_ref,
                 "browser_state": {},
                 "resposta_llm": event_data.get("response"),
                 "screenshot_path": None,
@@ -101,137 +279,164 @@ class AgentRastreador:
             
             # Salvar informações detalhadas da etapa
             etapa_file = os.path.join(etapa_dir, "etapa_info.json")
-            with open(etapa_file, "w", encoding="utf-8") as f:
-                # Criar cópia para salvar, removendo dados binários grandes
-                etapa_info_save = dict(etapa_info)
-                if "browser_state" in etapa_info_save and "screenshot" in etapa_info_save["browser_state"]:
-                    etapa_info_save["browser_state"]["screenshot"] = "[DADOS BINÁRIOS]"
-                    
-                json.dump(etapa_info_save, f, indent=2, ensure_ascii=False)
+            # Criar cópia para salvar, removendo dados binários grandes
+            etapa_info_save = dict(etapa_info)
+            if "browser_state" in etapa_info_save and "screenshot" in etapa_info_save["browser_state"]:
+                etapa_info_save["browser_state"]["screenshot"] = "[DADOS BINÁRIOS]"
             
-            # Adicionar à lista de etapas no log principal
-            self.log_data["etapas"].append(etapa_info)
-            self._salvar_log()
+            etapa_file = await asyncio.to_thread(
+                _escrever_json, etapa_file, etapa_info_save, comprimir
+            )
             
-            logger.info(f"Etapa {self.contador_etapas} registrada em {etapa_dir}")
+            # O log principal guarda só um resumo com a referência ao arquivo da
+            # etapa; ação, prompt e resposta ficam apenas no etapa_info.json
+            log_data["etapas"].append({
+                "numero": etapa_info["numero"],
+                "timestamp": etapa_info["timestamp"],
+                "info_path": etapa_file,
+                "screenshot_path": None,
+                "error": etapa_info["error"]
+            })
+            self._dirty = True
+            
+            log("Etapa %s registrada em %s", numero, etapa_dir)
             
         elif event_type == "llm.prompt":
             # Prompt enviado ao LLM
             prompt_info = {
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now_iso,
                 "prompt": event_data.get("prompt"),
                 "model": event_data.get("model")
             }
             
             # Salvar prompt em arquivo separado
-            prompt_file = os.path.join(self.log_dir, f"prompt_llm_{int(time.time())}.txt")
-            with open(prompt_file, "w", encoding="utf-8") as f:
-                f.write(str(prompt_info.get("prompt", "")))
+            prompt_file = os.path.join(log_dir, f"prompt_llm_{now_epoch}.txt")
+            prompt_file = await asyncio.to_thread(
+                _escrever_texto, prompt_file, str(prompt_info.get("prompt", "")), comprimir
+            )
             
-            logger.info(f"Prompt para LLM registrado em {prompt_file}")
+            log("Prompt para LLM registrado em %s", prompt_file)
             
         elif event_type == "llm.response":
             # Resposta recebida do LLM
             response_info = {
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now_iso,
                 "response": event_data.get("response"),
                 "model": event_data.get("model")
             }
             
             # Salvar resposta em arquivo separado
-            response_file = os.path.join(self.log_dir, f"resposta_llm_{int(time.time())}.txt")
-            with open(response_file, "w", encoding="utf-8") as f:
-                f.write(str(response_info.get("response", "")))
+            response_file = os.path.join(log_dir, f"resposta_llm_{now_epoch}.txt")
+            response_file = await asyncio.to_thread(
+                _escrever_texto, response_file, str(response_info.get("response", "")), comprimir
+            )
             
-            logger.info(f"Resposta do LLM registrada em {response_file}")
+            log("Resposta do LLM registrada em %s", response_file)
             
         elif event_type == "task.screenshot" or "screenshot" in event_data:
             # Screenshot capturado
-            if "screenshot" in event_data:
-                screenshot_data = event_data["screenshot"]
-                etapa_atual = f"etapa_{self.contador_etapas}"
+            screenshot_data = event_data.get("screenshot")
+            numero = self.contador_etapas
+            if screenshot_data and numero == 0:
+                # Sem etapa ainda: não há onde associar o screenshot, evita decodificá-lo
+                logger.debug("Screenshot recebido antes da primeira etapa; ignorado")
+            elif screenshot_data:
+                etapa_atual = f"etapa_{numero}"
                 
-                # Verificar se o diretório da etapa existe
-                etapa_dir = os.path.join(self.log_dir, etapa_atual)
-                os.makedirs(etapa_dir, exist_ok=True)
+                # Diretório da etapa (criado junto com o arquivo, se necessário)
+                etapa_dir = os.path.join(log_dir, etapa_atual)
                 
                 # Salvar screenshot
                 screenshot_path = os.path.join(
                     etapa_dir, 
-                    f"screenshot_{int(time.time())}.png"
+                    f"screenshot_{now_epoch}.png"
                 )
                 
                 try:
-                    with open(screenshot_path, "wb") as f:
-                        f.write(base64.b64decode(screenshot_data))
+                    # A decodificação do base64 também sai do event loop
+                    await asyncio.to_thread(_escrever_screenshot, screenshot_path, screenshot_data)
                     
                     # Atualizar o caminho do screenshot na etapa atual
-                    if self.log_data["etapas"] and len(self.log_data["etapas"]) >= self.contador_etapas:
-                        self.log_data["etapas"][self.contador_etapas-1]["screenshot_path"] = screenshot_path
-                        self._salvar_log()
+                    etapas = log_data["etapas"]
+                    if etapas and len(etapas) >= numero:
+                        etapas[numero - 1]["screenshot_path"] = screenshot_path
+                        self._dirty = True
                     
-                    logger.info(f"Screenshot salvo em: {screenshot_path}")
+                    log("Screenshot salvo em: %s", screenshot_path)
                 except Exception as e:
-                    logger.error(f"Erro ao salvar screenshot: {str(e)}")
+                    logger.error("Erro ao salvar screenshot: %s", e)
             
         elif event_type == "task.result":
             # Resultado final da tarefa
-            self.log_data["status"] = "concluído"
-            self.log_data["resultado"] = event_data.get("result")
-            self.log_data["timestamp_fim"] = datetime.now().isoformat()
-            
-            # Calcular duração
-            inicio = datetime.fromisoformat(self.log_data["timestamp_inicio"])
-            fim = datetime.fromisoformat(self.log_data["timestamp_fim"])
-            self.log_data["duracao_segundos"] = (fim - inicio).total_seconds()
+            self._finalize("concluído", now_iso, resultado=event_data.get("result"))
             
             # Salvar resultado em arquivo separado
-            result_file = os.path.join(self.log_dir, "resultado_final.json")
-            with open(result_file, "w", encoding="utf-8") as f:
-                json.dump(event_data.get("result", {}), f, indent=2, ensure_ascii=False)
-            
-            # Atualizar log principal
-            self._salvar_log()
+            result_file = os.path.join(log_dir, "resultado_final.json")
+            await asyncio.to_thread(_escrever_json, result_file, event_data.get("result", {}))
             
-            logger.info(f"Tarefa concluída. Duração: {self.log_data['duracao_segundos']:.2f} segundos")
+            log("Tarefa concluída. Duração: %.2f segundos", log_data['duracao_segundos'])
             
         elif event_type == "task.error":
             # Erro na execução da tarefa
-            self.log_data["status"] = "erro"
-            self.log_data["erro"] = event_data.get("error")
-            self.log_data["timestamp_fim"] = datetime.now().isoformat()
-            
-            # Calcular duração
-            inicio = datetime.fromisoformat(self.log_data["timestamp_inicio"])
-            fim = datetime.fromisoformat(self.log_data["timestamp_fim"])
-            self.log_data["duracao_segundos"] = (fim - inicio).total_seconds()
+            self._finalize("erro", now_iso, erro=event_data.get("error"))
             
             # Salvar informações de erro
-            error_file = os.path.join(self.log_dir, "erro.txt")
-            with open(error_file, "w", encoding="utf-8") as f:
-                f.write(str(event_data.get("error", "")))
-            
-            # Atualizar log principal
-            self._salvar_log()
+            error_file = os.path.join(log_dir, "erro.txt")
+            await asyncio.to_thread(_escrever_texto, error_file, str(event_data.get("error", "")))
             
-            logger.error(f"Erro na tarefa: {self.log_data['erro']}")
+            logger.error("Erro na tarefa: %s", log_data['erro'])
         
         # Se o evento tiver prompt efetivo
         if "prompt_efetivo" in event_data:
-            self.log_data["prompt_efetivo"] = event_data["prompt_efetivo"]
-            self._salvar_log()
+            log_data["prompt_efetivo"] = event_data["prompt_efetivo"]
+            self._dirty = True
+    
+    async def _armazenar_prompt(self, prompt: str) -> str:
+        """Grava o prompt em prompts/<hash> na primeira ocorrência e devolve o hash"""
+        data = prompt.encode("utf-8")
+        ref = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if ref not in self._prompt_store:
+            path = os.path.join(self.log_dir, "prompts", f"{ref}.txt")
+            self._prompt_store[ref] = await asyncio.to_thread(
+                _escrever_bytes, path, data, self.compression_enabled
+            )
+        return ref
+    
+    def _finalize(self, status: str, timestamp_fim: Optional[str] = None, **extra):
+        """Registra o status final, o horário de término e a duração da execução"""
+        self.log_data["status"] = status
+        self.log_data.update(extra)
+        self.log_data["timestamp_fim"] = timestamp_fim or datetime.now().isoformat()
+        self.log_data["duracao_segundos"] = time.monotonic() - self._t0_monotonic
+        self._dirty = True
+    
+    def _registrar_evento(self, event_data: Dict[str, Any], timestamp: str):
+        """Acrescenta o evento ao events.jsonl (screenshots ficam em arquivos próprios)"""
+        if self._events_fp.closed:
+            return
+        registro = {k: v for k, v in event_data.items() if k != "screenshot"}
+        registro["timestamp"] = timestamp
+        try:
+            self._events_fp.write(json_utils.dumps(registro, default=str) + b"\n")
+        except Exception as e:
+            logger.error("Erro ao registrar evento: %s", e)
     
     def _salvar_log(self):
         """Salva o log atual no arquivo JSON"""
+        self._dirty = False
         try:
-            # Criar cópia para salvar, removendo dados binários grandes
-            log_data_save = dict(self.log_data)
-            
-            with open(self.log_file, "w", encoding="utf-8") as f:
-                json.dump(log_data_save, f, indent=2, ensure_ascii=False)
+            # Screenshots nunca entram em log_data (só o caminho): serializa direto
+            _escrever_json(self.log_file, self.log_data)
         except Exception as e:
             logger.error(f"Erro ao salvar log: {str(e)}")
     
+    async def _flush_periodicamente(self):
+        """Grava o log a cada intervalo, apenas se houve alteração"""
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            if self._dirty:
+                self._salvar_log()
+    
     async def executar_agente(self, prompt: Optional[str] = None):
         """
         Executa o agente com rastreamento detalhado
@@ -248,6 +453,9 @@ class AgentRastreador:
         # Criar agente
         agent = Agent(prompt=prompt_execucao)
         
+        flush_task = asyncio.create_task(self._flush_periodicamente())
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        
         try:
             # Executar o agente com nosso callback de rastreamento
             result = await agent.execute_prompt_task(
@@ -255,169 +463,175 @@ class AgentRastreador:
                 callback=self._callback_rastreador
             )
             
+            # Processar os eventos pendentes antes de verificar o status final
+            await self._fila.join()
+            
             # Registrar conclusão bem-sucedida (caso o evento task.result não tenha sido capturado)
             if self.log_data["status"] == "iniciado":
-                self.log_data["status"] = "concluído"
-                self.log_data["resultado"] = result
-                self.log_data["timestamp_fim"] = datetime.now().isoformat()
-                
-                # Calcular duração
-                inicio = datetime.fromisoformat(self.log_data["timestamp_inicio"])
-                fim = datetime.fromisoformat(self.log_data["timestamp_fim"])
-                self.log_data["duracao_segundos"] = (fim - inicio).total_seconds()
-                
-                # Atualizar log principal
-                self._salvar_log()
+                # Log principal gravado no finally
+                self._finalize("concluído", resultado=result)
             
             return result
             
         except Exception as e:
+            await self._fila.join()
+            
             # Registrar erro (caso o evento task.error não tenha sido capturado)
             if self.log_data["status"] == "iniciado":
-                self.log_data["status"] = "erro"
-                self.log_data["erro"] = str(e)
-                self.log_data["timestamp_fim"] = datetime.now().isoformat()
-                
-                # Calcular duração
-                inicio = datetime.fromisoformat(self.log_data["timestamp_inicio"])
-                fim = datetime.fromisoformat(self.log_data["timestamp_fim"])
-                self.log_data["duracao_segundos"] = (fim - inicio).total_seconds()
-                
-                # Atualizar log principal
-                self._salvar_log()
+                # Log principal gravado no finally
+                self._finalize("erro", erro=str(e))
             
             logger.error(f"Erro ao executar agente: {str(e)}")
             raise
+        finally:
+            self._writer_task.cancel()
+            flush_task.cancel()
+            for task in (self._writer_task, flush_task):
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+            # Gravação final com o estado completo
+            self._salvar_log()
+            self._events_fp.close()
+    
+    def _carregar_etapa(self, resumo: Dict[str, Any]) -> Dict[str, Any]:
+        """Combina o resumo da etapa com os detalhes gravados em etapa_info.json"""
+        info_path = resumo.get("info_path")
+        if not info_path:
+            return resumo
+        try:
+            detalhes = json_utils.loads(_ler_bytes(info_path))
+            prompt_ref = detalhes.get("prompt_llm_ref")
+            if prompt_ref and prompt_ref in self._prompt_store:
+                detalhes["prompt_llm"] = _ler_bytes(self._prompt_store[prompt_ref]).decode("utf-8")
+        except Exception as e:
+            logger.error(f"Erro ao ler detalhes da etapa: {str(e)}")
+            return resumo
+        # Screenshot e erro podem ter sido atualizados depois da gravação do arquivo
+        detalhes.update({k: v for k, v in resumo.items() if v is not None})
+        return detalhes
+    
+    def _render_etapa_html(self, resumo: Dict[str, Any]) -> str:
+        """Renderiza o bloco HTML de uma etapa"""
+        # Detalhes da etapa lidos do disco apenas na geração do relatório
+        etapa = self._carregar_etapa(resumo)
+        etapa_num = _esc(etapa.get('numero', 'N/A'))
+        screenshot_path = etapa.get('screenshot_path', '')
+        
+        partes = [f"""
+                <div class="etapa">
+                    <h3>Etapa {etapa_num}</h3>
+                    <p class="metadata">Timestamp: {_esc(_formatar_data(etapa.get('timestamp')))}</p>
+                    
+                    <h4>Ação:</h4>
+                    <pre>{_esc(etapa.get('action', 'N/A'))}</pre>
+                    
+                    <h4>Prompt para LLM:</h4>
+                    <pre>{_esc(etapa.get('prompt_llm', 'N/A'))}</pre>
+                    
+                    <h4>Resposta do LLM:</h4>
+                    <pre>{_esc(etapa.get('resposta_llm', 'N/A'))}</pre>
+            """]
+        
+        # Adicionar screenshot se disponível
+        if screenshot_path and os.path.exists(screenshot_path):
+            # Obter caminho relativo para o HTML
+            rel_path = os.path.relpath(screenshot_path, self.log_dir)
+            partes.append(f"""
+                    <h4>Screenshot:</h4>
+                    <img src="{_esc(rel_path)}" class="screenshot" alt="Screenshot da etapa {etapa_num}">
+                """)
+        
+        # Adicionar erro se houver
+        if etapa.get('error'):
+            partes.append(f"""
+                    <h4>Erro:</h4>
+                    <pre class="error">{_esc(etapa.get('error'))}</pre>
+                """)
+        
+        partes.append("""
+                </div>
+            """)
+        return "".join(partes)
     
     def gerar_relatorio_html(self):
         """
         Gera um relatório HTML com os logs capturados
+        
+        O relatório é escrito no arquivo por seções, sem montar o documento
+        inteiro em memória.
         """
         # Criar arquivo HTML
         html_path = os.path.join(self.log_dir, "relatorio.html")
+        status = self.log_data['status']
+        duracao = self.log_data.get('duracao_segundos')
         
-        html_content = f"""
+        with open(html_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+            f.write(f"""
         <!DOCTYPE html>
         <html>
         <head>
             <meta charset="UTF-8">
-            <title>Relatório de Execução do Agente - {self.timestamp}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; padding: 20px; max-width: 1200px; margin: 0 auto; }}
-                h1, h2, h3 {{ color: #333; }}
-                .container {{ border: 1px solid #ddd; padding: 15px; margin-bottom: 20px; border-radius: 5px; }}
-                .etapa {{ border: 1px solid #ccc; padding: 10px; margin: 10px 0; border-radius: 5px; }}
-                .screenshot {{ max-width: 100%; border: 1px solid #ddd; margin: 10px 0; }}
-                pre {{ background-color: #f5f5f5; padding: 10px; border-radius: 3px; overflow-x: auto; }}
-                .info {{ color: #333; }}
-                .success {{ color: green; }}
-                .error {{ color: red; }}
-                .metadata {{ font-size: 0.9em; color: #666; }}
-                .plano {{ background-color: #f0f8ff; padding: 10px; border-left: 3px solid #4682b4; }}
-            </style>
+            <title>Relatório de Execução do Agente - {_esc(self.timestamp)}</title>
+            <style>{_RELATORIO_CSS}            </style>
         </head>
         <body>
             <h1>Relatório de Execução do Agente</h1>
             
             <div class="container">
                 <h2>Informações Gerais</h2>
-                <p><strong>ID da Execução:</strong> {self.timestamp}</p>
-                <p><strong>Status:</strong> <span class="{'success' if self.log_data['status'] == 'concluído' else 'error'}">{self.log_data['status']}</span></p>
-                <p><strong>Início:</strong> {self.log_data['timestamp_inicio'].replace('T', ' ').split('.')[0]}</p>
-                <p><strong>Fim:</strong> {self.log_data.get('timestamp_fim', '').replace('T', ' ').split('.')[0] if self.log_data.get('timestamp_fim') else 'N/A'}</p>
-                <p><strong>Duração:</strong> {f"{self.log_data.get('duracao_segundos', 0):.2f} segundos" if self.log_data.get('duracao_segundos') else 'N/A'}</p>
+                <p><strong>ID da Execução:</strong> {_esc(self.timestamp)}</p>
+                <p><strong>Status:</strong> <span class="{'success' if status == 'concluído' else 'error'}">{_esc(status)}</span></p>
+                <p><strong>Início:</strong> {_esc(_formatar_data(self.log_data['timestamp_inicio']))}</p>
+                <p><strong>Fim:</strong> {_esc(_formatar_data(self.log_data.get('timestamp_fim')))}</p>
+                <p><strong>Duração:</strong> {f"{duracao:.2f} segundos" if duracao else 'N/A'}</p>
             </div>
             
             <div class="container">
                 <h2>Prompts</h2>
                 <h3>Prompt Original do Usuário</h3>
-                <pre>{self.log_data['prompt_original']}</pre>
+                <pre>{_esc(self.log_data['prompt_original'])}</pre>
                 
                 <h3>Prompt Efetivo Executado</h3>
-                <pre>{self.log_data.get('prompt_efetivo', 'N/A')}</pre>
+                <pre>{_esc(self.log_data.get('prompt_efetivo', 'N/A'))}</pre>
             </div>
-        """
-        
-        # Adicionar plano de ações se disponível
-        if self.log_data.get('plano_acoes'):
-            html_content += """
+        """)
+            
+            # Adicionar plano de ações se disponível
+            if self.log_data.get('plano_acoes'):
+                f.write("""
             <div class="container">
                 <h2>Plano de Ações</h2>
                 <div class="plano">
                     <ol>
-            """
-            for acao in self.log_data['plano_acoes']:
-                html_content += f"<li>{acao}</li>\n"
-            
-            html_content += """
+            """)
+                f.write("".join(f"<li>{_esc(acao)}</li>\n" for acao in self.log_data['plano_acoes']))
+                f.write("""
                     </ol>
                 </div>
             </div>
-            """
-        
-        # Adicionar etapas
-        html_content += """
+            """)
+            
+            # Adicionar etapas
+            f.write("""
             <div class="container">
                 <h2>Etapas de Execução</h2>
-        """
-        
-        for etapa in self.log_data['etapas']:
-            etapa_num = etapa.get('numero', 'N/A')
-            screenshot_path = etapa.get('screenshot_path', '')
+        """)
+            for resumo in self.log_data['etapas']:
+                f.write(self._render_etapa_html(resumo))
             
-            html_content += f"""
-                <div class="etapa">
-                    <h3>Etapa {etapa_num}</h3>
-                    <p class="metadata">Timestamp: {etapa.get('timestamp', '').replace('T', ' ').split('.')[0]}</p>
-                    
-                    <h4>Ação:</h4>
-                    <pre>{etapa.get('action', 'N/A')}</pre>
-                    
-                    <h4>Prompt para LLM:</h4>
-                    <pre>{etapa.get('prompt_llm', 'N/A')}</pre>
-                    
-                    <h4>Resposta do LLM:</h4>
-                    <pre>{etapa.get('resposta_llm', 'N/A')}</pre>
-            """
-            
-            # Adicionar screenshot se disponível
-            if screenshot_path and os.path.exists(screenshot_path):
-                # Obter caminho relativo para o HTML
-                rel_path = os.path.relpath(screenshot_path, self.log_dir)
-                html_content += f"""
-                    <h4>Screenshot:</h4>
-                    <img src="{rel_path}" class="screenshot" alt="Screenshot da etapa {etapa_num}">
-                """
-            
-            # Adicionar erro se houver
-            if etapa.get('error'):
-                html_content += f"""
-                    <h4>Erro:</h4>
-                    <pre class="error">{etapa.get('error')}</pre>
-                """
-            
-            html_content += """
-                </div>
-            """
-        
-        html_content += """
+            resultado = json.dumps(self.log_data.get('resultado', {}), indent=2, ensure_ascii=False, default=str)
+            f.write(f"""
             </div>
             
             <div class="container">
                 <h2>Resultado Final</h2>
-                <pre>{}</pre>
+                <pre>{_esc(resultado)}</pre>
             </div>
-        """.format(json.dumps(self.log_data.get('resultado', {}), indent=2, ensure_ascii=False))
-        
-        # Finalizar HTML
-        html_content += """
         </body>
         </html>
-        """
-        
-        # Salvar arquivo HTML
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(html_content)
+        """)
         
         logger.info(f"Relatório HTML gerado em: {html_path}")
         return html_path
@@ -4,8 +4,17 @@
 import asyncio
 import logging
 import os
+import sys
 from dotenv import load_dotenv
 
+# uvloop reduz o custo por await nos callbacks; opcional e indisponível no Windows
+if sys.platform != 'win32':
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
 # Configurar logging básico
 logging.basicConfig(level=logging.INFO)
 
@@ -6,10 +6,21 @@ import logging
 import json
 import base64
 import os
+import sys
 import time
+from collections import Counter
 from datetime import datetime
+from pathlib import Path
 from dotenv import load_dotenv
 
+# uvloop reduz o custo por await nos callbacks; opcional e indisponível no Windows
+if sys.platform != 'win32':
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
 # Configurar logging básico
 logging.basicConfig(level=logging.INFO, 
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -22,6 +33,7 @@ try:
     # Importar a classe Agent do arquivo certo
     from src.agent.agent import Agent
     from agent_tracker import AgentTracker, track_agent_execution
+    from src.utils import json_utils
 except ImportError as e:
     logger.error(f"Erro ao importar dependências: {e}")
     logger.info("Certifique-se que você está executando este script do diretório raiz do projeto.")
@@ -76,19 +88,18 @@ async def main():
             print(str(result)[:200] + "..." if len(str(result)) > 200 else str(result))
         
         # Mostrar contagem de eventos
-        with open(tracker.log_file, 'r', encoding='utf-8') as f:
-            log_data = json.load(f)
-            print(f"\nEventos registrados: {len(log_data.get('eventos', []))}")
-            
-            # Mostrar tipos de eventos registrados
-            event_types = {}
-            for evento in log_data.get('eventos', []):
-                tipo = evento.get('tipo', 'unknown')
-                event_types[tipo] = event_types.get(tipo, 0) + 1
-            
-            print("\nTipos de eventos registrados:")
-            for tipo, count in event_types.items():
-                print(f"  - {tipo}: {count}")
+        # Lido como bytes: o parser JSON valida o UTF-8 sem uma decodificação prévia
+        log_data = json_utils.loads(Path(tracker.log_file).read_bytes())
+        # O tracker grava a lista de eventos na raiz; aceita também {"eventos": [...]}
+        eventos = log_data if isinstance(log_data, list) else log_data.get('eventos', [])
+        print(f"\nEventos registrados: {len(eventos)}")
+        
+        # Mostrar tipos de eventos registrados
+        event_types = Counter(evento.get('tipo', 'unknown') for evento in eventos)
+        
+        print("\nTipos de eventos registrados:")
+        for tipo, count in event_types.items():
+            print(f"  - {tipo}: {count}")
         
     except Exception as e:
         print(f"\nErro durante execução: {str(e)}")
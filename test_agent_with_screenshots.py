@@ -4,10 +4,19 @@
 import asyncio
 import logging
 import os
+import sys
 import base64
 from datetime import datetime
 from dotenv import load_dotenv
 
+# uvloop reduz o custo por await nos callbacks; opcional e indisponível no Windows
+if sys.platform != 'win32':
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
 # Configurar logging básico
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("test_agent_screenshots")
@@ -20,19 +29,29 @@ from src.agent.agent import Agent
 
 # Diretório para salvar os screenshots
 SCREENSHOTS_DIR = "agent_screenshots"
-os.makedirs(SCREENSHOTS_DIR, exist_ok=True)
+
+# Diretório da sessão atual, definido e criado uma única vez por execução
+SESSION_DIR = os.path.join(SCREENSHOTS_DIR, f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+os.makedirs(SESSION_DIR, exist_ok=True)
+
+def _salvar_screenshot(path, screenshot_b64):
+    """Decodifica e grava o screenshot (executado fora do event loop)"""
+    with open(path, "wb") as f:
+        f.write(base64.b64decode(screenshot_b64))
+
+def _salvar_texto(path, texto):
+    """Grava um arquivo de texto UTF-8 (executado fora do event loop)"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(texto)
 
 async def callback_com_screenshots(event_data):
     """
     Callback simples que salva screenshots quando disponíveis nos eventos
     """
     event_type = event_data.get("event_type", "unknown")
-    logger.info(f"Evento recebido: {event_type}")
+    logger.info("Evento recebido: %s", event_type)
     
-    # Criar diretório para sessão atual se ainda não existe
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    session_dir = os.path.join(SCREENSHOTS_DIR, f"session_{timestamp}")
-    os.makedirs(session_dir, exist_ok=True)
+    session_dir = SESSION_DIR
     
     # Salvar screenshot se disponível
     if "screenshot" in event_data:
@@ -41,11 +60,10 @@ async def callback_com_screenshots(event_data):
             f"screenshot_{event_type}_{int(datetime.now().timestamp())}.png"
         )
         try:
-            with open(screenshot_path, "wb") as f:
-                f.write(base64.b64decode(event_data["screenshot"]))
-            logger.info(f"Screenshot salvo em: {screenshot_path}")
+            await asyncio.to_thread(_salvar_screenshot, screenshot_path, event_data["screenshot"])
+            logger.info("Screenshot salvo em: %s", screenshot_path)
         except Exception as e:
-            logger.error(f"Erro ao salvar screenshot: {str(e)}")
+            logger.error("Erro ao salvar screenshot: %s", e)
     
     # Salvar URL atual se disponível
     if "url" in event_data:
@@ -54,21 +72,19 @@ async def callback_com_screenshots(event_data):
             f"url_{event_type}_{int(datetime.now().timestamp())}.txt"
         )
         try:
-            with open(url_path, "w", encoding="utf-8") as f:
-                f.write(event_data["url"])
-            logger.info(f"URL salvo em: {url_path}")
+            await asyncio.to_thread(_salvar_texto, url_path, event_data["url"])
+            logger.info("URL salvo em: %s", url_path)
         except Exception as e:
-            logger.error(f"Erro ao salvar URL: {str(e)}")
+            logger.error("Erro ao salvar URL: %s", e)
     
     # Logging de resultado se disponível
     if event_type == "task.result" and "result" in event_data:
         result_path = os.path.join(session_dir, "result.txt")
         try:
-            with open(result_path, "w", encoding="utf-8") as f:
-                f.write(str(event_data["result"]))
-            logger.info(f"Resultado salvo em: {result_path}")
+            await asyncio.to_thread(_salvar_texto, result_path, str(event_data["result"]))
+            logger.info("Resultado salvo em: %s", result_path)
         except Exception as e:
-            logger.error(f"Erro ao salvar resultado: {str(e)}")
+            logger.error("Erro ao salvar resultado: %s", e)
     
     return session_dir
 
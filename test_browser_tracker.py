@@ -3,10 +3,12 @@
 
 import asyncio
 import logging
-import json
 import os
 import sys
+from collections import Counter
 from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 # Configurar logging
@@ -20,6 +22,33 @@ load_dotenv()
 # Importar as classes necessárias
 from src.agent.agent import Agent
 from agent_tracker import AgentTracker, track_agent_execution
+from src.utils import json_utils
+
+# Leitura incremental do log (opcional): evita carregar todos os eventos na memória
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Padrão para eventos sem dados (somente leitura, compartilhado entre iterações)
+DADOS_VAZIOS = MappingProxyType({})
+
+def iterar_eventos(log_file):
+    """
+    Itera sobre os eventos do log, de forma incremental quando o ijson está disponível
+    
+    O AgentTracker grava a lista de eventos na raiz do arquivo; o formato
+    {"eventos": [...]} também é aceito.
+    """
+    with open(log_file, 'rb') as f:
+        lista_na_raiz = f.read(64).lstrip().startswith(b'[')
+        f.seek(0)
+        if IJSON_AVAILABLE:
+            yield from ijson.items(f, 'item' if lista_na_raiz else 'eventos.item')
+        else:
+            log_data = json_utils.loads(f.read())
+            yield from log_data if lista_na_raiz else log_data.get('eventos', [])
 
 async def test_browser_use_tracking():
     """Teste do rastreamento em tempo real do browser-use"""
@@ -56,104 +85,104 @@ async def test_browser_use_tracking():
     # Mostrar resultados
     print(f"\nExecução concluída em {(end_time - start_time).total_seconds():.2f} segundos")
     print(f"Log JSON salvo em: {tracker.log_file}")
-    print(f"Arquivo de pensamentos: {os.path.join(tracker.log_dir, 'thinking_logs.json')}")
+    thinking_logs_file = Path(tracker.log_dir) / "thinking_logs.json"
+    print(f"Arquivo de pensamentos: {thinking_logs_file}")
     
     # Mostrar estatísticas do rastreamento
-    with open(tracker.log_file, 'r', encoding='utf-8') as f:
-        log_data = json.load(f)
-        eventos = log_data.get('eventos', [])
-        print(f"\nEventos registrados: {len(eventos)}")
+    # Uma única passagem pelos eventos acumula todas as estatísticas
+    total_eventos = 0
+    event_types = Counter()
+    browser_use_steps = 0
+    pensamentos_count = 0
+    avaliacoes_count = 0
+    memoria_count = 0
+    objetivo_count = 0
+    exemplo = None
+    # Apenas as 5 primeiras ações são exibidas; as demais só entram na contagem
+    actions = []
+    total_actions = 0
+    
+    for e in iterar_eventos(tracker.log_file):
+        total_eventos += 1
+        get = e.get
+        tipo = get('tipo', 'unknown')
+        event_types[tipo] += 1
+        if tipo != 'browser_use.agent.step':
+            continue
         
-        # Contagem por tipo de evento
-        event_types = {}
-        for evento in eventos:
-            tipo = evento.get('tipo', 'unknown')
-            event_types[tipo] = event_types.get(tipo, 0) + 1
+        browser_use_steps += 1
+        # Campos de pensamento podem estar no nível superior ou dentro de dados
+        dados = get('dados') or DADOS_VAZIOS
+        if 'thought' in e or 'thought' in dados:
+            pensamentos_count += 1
+        if 'evaluation' in e or 'evaluation' in dados:
+            avaliacoes_count += 1
+        if 'memory' in e or 'memory' in dados:
+            memoria_count += 1
+        if 'next_goal' in e or 'next_goal' in dados:
+            objetivo_count += 1
         
-        print("\nTipos de eventos registrados:")
-        for tipo, count in event_types.items():
-            print(f"  - {tipo}: {count}")
+        # Guardar o primeiro passo com algum pensamento como exemplo
+        if exemplo is None:
+            campos = {k: get(k) or dados.get(k) for k in ('thought', 'evaluation', 'memory', 'next_goal')}
+            if any(campos.values()):
+                exemplo = (dados.get('step', '?'), campos)
         
-        # Verificar se capturamos steps do browser-use
-        browser_use_steps = sum(1 for e in eventos if e.get('tipo') == 'browser_use.agent.step')
-        if browser_use_steps > 0:
-            print(f"\nCapturados {browser_use_steps} passos em tempo real do browser-use!")
-            
-            # Verificar se conseguimos extrair os pensamentos do LLM
-            print("\nAnalisando logs de pensamento do agente LLM:")
-            
-            pensamentos_count = 0
-            avaliacoes_count = 0
-            memoria_count = 0
-            objetivo_count = 0
-            
-            for e in eventos:
-                if e.get('tipo') == 'browser_use.agent.step':
-                    # Verificar campos de pensamento (no nível superior ou dentro de dados)
-                    if 'thought' in e or ('dados' in e and 'thought' in e['dados']):
-                        pensamentos_count += 1
-                    
-                    if 'evaluation' in e or ('dados' in e and 'evaluation' in e['dados']):
-                        avaliacoes_count += 1
-                    
-                    if 'memory' in e or ('dados' in e and 'memory' in e['dados']):
-                        memoria_count += 1
-                    
-                    if 'next_goal' in e or ('dados' in e and 'next_goal' in e['dados']):
-                        objetivo_count += 1
-            
-            print(f"  ✓ Pensamentos capturados: {pensamentos_count} de {browser_use_steps}")
-            print(f"  ✓ Avaliações capturadas: {avaliacoes_count} de {browser_use_steps}")
-            print(f"  ✓ Memórias capturadas: {memoria_count} de {browser_use_steps}")
-            print(f"  ✓ Objetivos capturados: {objetivo_count} de {browser_use_steps}")
-            
-            # Mostrar exemplo do primeiro pensamento capturado
-            for e in eventos:
-                if e.get('tipo') == 'browser_use.agent.step':
-                    thought = e.get('thought') or e.get('dados', {}).get('thought')
-                    evaluation = e.get('evaluation') or e.get('dados', {}).get('evaluation')
-                    memory = e.get('memory') or e.get('dados', {}).get('memory')
-                    next_goal = e.get('next_goal') or e.get('dados', {}).get('next_goal')
-                    
-                    if thought or evaluation or memory or next_goal:
-                        print("\nExemplo de pensamento capturado (passo #{}):".format(
-                            e.get('dados', {}).get('step', '?')))
-                        if evaluation:
-                            print(f"👍 Avaliação: {evaluation}")
-                        if memory:
-                            print(f"🧠 Memória: {memory}")
-                        if next_goal:
-                            print(f"🎯 Próximo objetivo: {next_goal}")
-                        break
-            
-            # Mostrar algumas ações executadas
-            print("\nAlgumas ações executadas pelo agente:")
-            actions = []
-            for e in eventos:
-                if e.get('tipo') == 'browser_use.agent.step' and 'dados' in e and 'action' in e['dados']:
-                    action = e['dados']['action']
-                    if action and isinstance(action, dict):
-                        action_type = list(action.keys())[0] if action.keys() else "unknown"
-                        actions.append(action_type)
-            
-            # Mostrar até 5 ações
-            for i, action in enumerate(actions[:5]):
-                print(f"  {i+1}. {action}")
-            
-            if len(actions) > 5:
-                print(f"  ... e mais {len(actions) - 5} ações")
-        else:
-            print("\nNenhum passo do browser-use foi capturado. Verifique se o callback está funcionando corretamente.")
+        action = dados.get('action')
+        if action and isinstance(action, dict):
+            total_actions += 1
+            if total_actions <= 5:
+                actions.append(next(iter(action)))
+    
+    print(f"\nEventos registrados: {total_eventos}")
+    
+    print("\nTipos de eventos registrados:")
+    for tipo, count in event_types.items():
+        print(f"  - {tipo}: {count}")
+    
+    # Verificar se capturamos steps do browser-use
+    if browser_use_steps > 0:
+        print(f"\nCapturados {browser_use_steps} passos em tempo real do browser-use!")
+        
+        # Verificar se conseguimos extrair os pensamentos do LLM
+        print("\nAnalisando logs de pensamento do agente LLM:")
+        print(f"  ✓ Pensamentos capturados: {pensamentos_count} de {browser_use_steps}")
+        print(f"  ✓ Avaliações capturadas: {avaliacoes_count} de {browser_use_steps}")
+        print(f"  ✓ Memórias capturadas: {memoria_count} de {browser_use_steps}")
+        print(f"  ✓ Objetivos capturados: {objetivo_count} de {browser_use_steps}")
+        
+        # Mostrar exemplo do primeiro pensamento capturado
+        if exemplo:
+            passo, campos = exemplo
+            print("\nExemplo de pensamento capturado (passo #{}):".format(passo))
+            if campos['evaluation']:
+                print(f"👍 Avaliação: {campos['evaluation']}")
+            if campos['memory']:
+                print(f"🧠 Memória: {campos['memory']}")
+            if campos['next_goal']:
+                print(f"🎯 Próximo objetivo: {campos['next_goal']}")
+        
+        # Mostrar algumas ações executadas
+        print("\nAlgumas ações executadas pelo agente:")
+        
+        # Mostrar até 5 ações
+        for i, action in enumerate(actions):
+            print(f"  {i+1}. {action}")
+        
+        if total_actions > 5:
+            print(f"  ... e mais {total_actions - 5} ações")
+    else:
+        print("\nNenhum passo do browser-use foi capturado. Verifique se o callback está funcionando corretamente.")
     
     # Limpar o agente
     await agent.cleanup()
     
     # Verificar se foram gerados os arquivos adicionais
-    thinking_logs_file = os.path.join(tracker.log_dir, "thinking_logs.json")
-    if os.path.exists(thinking_logs_file):
-        with open(thinking_logs_file, 'r', encoding='utf-8') as f:
-            thinking_data = json.load(f)
-            print(f"\nArquivo thinking_logs.json gerado com {len(thinking_data)} registros de pensamento!")
+    try:
+        thinking_data = json_utils.loads(thinking_logs_file.read_bytes())
+        print(f"\nArquivo thinking_logs.json gerado com {len(thinking_data)} registros de pensamento!")
+    except FileNotFoundError:
+        pass
     
     # Executar script de verificação de logs para visualizar os pensamentos
     print("\nExecutando verificação detalhada dos logs de pensamento:")
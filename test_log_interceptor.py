@@ -2,13 +2,16 @@
 # -*- coding: utf-8 -*-
 
 import asyncio
+import atexit
 import logging
-import json
 import os
+import queue
 import sys
+import time
+from collections import Counter
 from datetime import datetime
 from dotenv import load_dotenv
-import time
+from logging.handlers import QueueHandler, QueueListener
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO,  # Reduzir para INFO para diminuir o ruído
@@ -28,12 +31,35 @@ logging.getLogger("charset_normalizer").setLevel(logging.WARNING)
 # Carregar variáveis de ambiente
 load_dotenv()
 
+# Escrita dos logs em uma thread própria: os handlers reais (configurados pelo
+# basicConfig acima) passam para um QueueListener e o root logger só enfileira
+log_queue = queue.Queue(-1)
+_root_logger = logging.getLogger()
+log_listener = QueueListener(log_queue, *_root_logger.handlers, respect_handler_level=True)
+_root_logger.handlers = [QueueHandler(log_queue)]
+log_listener.start()
+atexit.register(log_listener.stop)
+
 # Importar as classes necessárias
 from src.agent.agent import Agent
 from agent_tracker import AgentTracker, track_agent_execution, BrowserUseLogInterceptor
+from src.utils import json_utils
+
+def dump_json(path, obj):
+    """Grava um objeto como JSON indentado em uma única escrita (orjson quando disponível)"""
+    with open(path, 'wb') as f:
+        f.write(json_utils.dumps(obj, indent=True, default=str))
+
+# Preços por 1K tokens (prompt, completion), verificados em ordem pelo nome do modelo
+PRICING = (
+    ("gpt-4", 0.03, 0.06),        # GPT-4
+    ("gpt-3.5", 0.0015, 0.002),   # GPT-3.5
+    ("claude", 0.008, 0.024),     # Claude
+)
+DEFAULT_PRICING = (0.01, 0.02)    # Modelo genérico
 
 # Função para simular logs de uso de LLM
-def simular_logs_llm(model=None, prompt_tokens=None):
+async def simular_logs_llm(model=None, prompt_tokens=None):
     """
     Gera logs simulados de uso de LLM para testar a captura.
     
@@ -47,32 +73,21 @@ def simular_logs_llm(model=None, prompt_tokens=None):
     
     # Simulando request para LLM com valores do config atual
     browser_logger.info(f"LLM Request: model={model}, prompt_tokens={prompt_tokens}")
-    time.sleep(0.2)
+    await asyncio.sleep(0.2)
     
     # Calcular tokens de resposta como aproximadamente metade dos tokens de prompt
     completion_tokens = int(prompt_tokens / 2)
     
     # Simulando resposta do LLM com valores realistas
     browser_logger.info(f"LLM Response: completion_tokens={completion_tokens}, time=1.75s")
-    time.sleep(0.1)
+    await asyncio.sleep(0.1)
     
-    # Calcular custo estimado baseado em valores da OpenAI
-    # GPT-4: $0.03 por 1K tokens de prompt, $0.06 por 1K tokens de completion
-    if "gpt-4" in model:
-        prompt_cost = (prompt_tokens / 1000) * 0.03
-        completion_cost = (completion_tokens / 1000) * 0.06
-    # GPT-3.5: $0.0015 por 1K tokens de prompt, $0.002 por 1K tokens de completion
-    elif "gpt-3.5" in model:
-        prompt_cost = (prompt_tokens / 1000) * 0.0015
-        completion_cost = (completion_tokens / 1000) * 0.002
-    # Claude: $0.008 por 1K tokens de prompt, $0.024 por 1K tokens de completion
-    elif "claude" in model:
-        prompt_cost = (prompt_tokens / 1000) * 0.008
-        completion_cost = (completion_tokens / 1000) * 0.024
-    else:
-        # Modelo genérico
-        prompt_cost = (prompt_tokens / 1000) * 0.01
-        completion_cost = (completion_tokens / 1000) * 0.02
+    # Calcular custo estimado a partir da tabela de preços por modelo
+    prompt_rate, completion_rate = next(
+        ((p, c) for prefixo, p, c in PRICING if prefixo in model), DEFAULT_PRICING
+    )
+    prompt_cost = (prompt_tokens / 1000) * prompt_rate
+    completion_cost = (completion_tokens / 1000) * completion_rate
     
     total_cost = prompt_cost + completion_cost
     
@@ -103,26 +118,48 @@ async def test_log_interceptor():
     timeline_file = os.path.join(test_log_dir, "timeline.json")
     pensamentos = []
     
+    # Pensamentos são acrescentados um por linha (JSON Lines), em lotes
+    # descarregados no arquivo a cada 32 eventos ou 2 segundos (ver gravar_lote);
+    # o thinking_logs.json consolidado é gerado uma única vez no final
+    thinking_jsonl_file = thinking_logs_file.replace('.json', '.jsonl')
+    thinking_fp = open(thinking_jsonl_file, 'ab', buffering=65536)
+    
+    # Pensamentos são gravados em lotes: a cada 32 eventos ou 2 segundos
+    lote_pensamentos = []
+    ultimo_flush = time.monotonic()
+    
+    def gravar_lote():
+        """Serializa o lote pendente de pensamentos e o descarrega no JSONL"""
+        nonlocal ultimo_flush
+        if lote_pensamentos:
+            thinking_fp.write(b''.join(json_utils.dumps(p, default=str) + b'\n' for p in lote_pensamentos))
+            thinking_fp.flush()
+            lote_pensamentos.clear()
+        ultimo_flush = time.monotonic()
+    
     # Função para processar pensamentos capturados
     def process_pensamento(pensamento):
         """Callback para processar pensamentos capturados pelo interceptador"""
         pensamentos.append(pensamento)
         
         # Logar apenas fragmentos úteis para não poluir o console
-        texto = pensamento.get('texto', '')[:50] if pensamento.get('texto') else 'Sem texto'
-        categoria = ""
-        
-        # Verificar se há categorias
-        if pensamento.get('pensamentos_por_categoria'):
-            categorias = list(pensamento.get('pensamentos_por_categoria').keys())
-            if categorias:
-                categoria = f" [Categorias: {', '.join(categorias)}]"
-        
-        logger.info(f"Pensamento capturado (Passo {pensamento.get('passo')}): {texto}...{categoria}")
+        # (o resumo só é montado se o nível INFO estiver habilitado)
+        if logger.isEnabledFor(logging.INFO):
+            texto = pensamento.get('texto', '')[:50] if pensamento.get('texto') else 'Sem texto'
+            categoria = ""
+            
+            # Verificar se há categorias
+            if pensamento.get('pensamentos_por_categoria'):
+                categorias = list(pensamento.get('pensamentos_por_categoria').keys())
+                if categorias:
+                    categoria = f" [Categorias: {', '.join(categorias)}]"
+            
+            logger.info("Pensamento capturado (Passo %s): %s...%s", pensamento.get('passo'), texto, categoria)
         
-        # Salvar pensamentos em tempo real no arquivo JSON
-        with open(thinking_logs_file, 'w', encoding='utf-8') as f:
-            json.dump(pensamentos, f, ensure_ascii=False, indent=2)
+        # Registrar o pensamento no JSONL, em lotes
+        lote_pensamentos.append(pensamento)
+        if len(lote_pensamentos) >= 32 or time.monotonic() - ultimo_flush > 2:
+            gravar_lote()
     
     # Criar rastreador
     tracker = AgentTracker(
@@ -137,10 +174,11 @@ async def test_log_interceptor():
     agent = Agent(prompt=prompt)
     
     # Criar contador para eventos capturados
-    pensamentos_capturados = []
+    total_pensamentos_capturados = 0
     
     # Criar função de callback para contar eventos
     async def contador_callback(event_data):
+        nonlocal total_pensamentos_capturados
         # Primeiro, repassar para o tracker original
         await tracker.callback(event_data)
         
@@ -153,32 +191,32 @@ async def test_log_interceptor():
             event_data.get("unstructured_thought") or
             (event_data.get("all_thoughts") and len(event_data.get("all_thoughts")) > 0)
         ):
-            # Capturar para verificação
-            pensamentos_capturados.append(event_data)
+            # Contar para verificação (os eventos em si já ficam no tracker)
+            total_pensamentos_capturados += 1
             
             # Log de diagnóstico
             step = event_data.get("step", "?")
-            logger.info(f"Evento de pensamento capturado no passo {step}")
+            logger.info("Evento de pensamento capturado no passo %s", step)
             
             # Logar estatísticas sobre os pensamentos (apenas em nível INFO)
             thoughts_by_category = event_data.get("thoughts_by_category", {})
-            if thoughts_by_category:
+            if thoughts_by_category and logger.isEnabledFor(logging.INFO):
                 categories = [f"{cat}({len(thoughts)})" for cat, thoughts in thoughts_by_category.items()]
-                logger.info(f"  Categorias: {', '.join(categories)}")
+                logger.info("  Categorias: %s", ', '.join(categories))
             
             # A cada 2 passos, simular alguns logs de LLM para testar a captura
             # Usar modelos reais e tokens realistas
             if step % 2 == 0:
                 # Alternar entre diferentes modelos para simular variação
                 if step % 6 == 0:
-                    logger.info(f"Simulando logs de LLM (gpt-4) no passo {step}")
-                    simular_logs_llm("gpt-4", 1200)
+                    logger.info("Simulando logs de LLM (gpt-4) no passo %s", step)
+                    await simular_logs_llm("gpt-4", 1200)
                 elif step % 6 == 2:
-                    logger.info(f"Simulando logs de LLM (gpt-3.5-turbo) no passo {step}")
-                    simular_logs_llm("gpt-3.5-turbo", 800)
+                    logger.info("Simulando logs de LLM (gpt-3.5-turbo) no passo %s", step)
+                    await simular_logs_llm("gpt-3.5-turbo", 800)
                 else:
-                    logger.info(f"Simulando logs de LLM (claude-3-opus) no passo {step}")
-                    simular_logs_llm("claude-3-opus", 1500)
+                    logger.info("Simulando logs de LLM (claude-3-opus) no passo %s", step)
+                    await simular_logs_llm("claude-3-opus", 1500)
     
     # Criar e instalar o interceptador de logs
     interceptor = BrowserUseLogInterceptor(
@@ -231,7 +269,7 @@ async def test_log_interceptor():
         tokens_prompt = 2500
     
     # Gerar logs com valores reais do modelo
-    simular_logs_llm(modelo_agente, tokens_prompt)
+    await simular_logs_llm(modelo_agente, tokens_prompt)
     
     # Executar o agente
     print("\nExecutando agente com interceptador de logs...")
@@ -247,7 +285,7 @@ async def test_log_interceptor():
         # Simular logs finais de LLM
         logger.info("Simulando logs de LLM finais")
         # Usar o mesmo modelo que foi detectado inicialmente
-        simular_logs_llm(modelo_agente, 2400)
+        await simular_logs_llm(modelo_agente, 2400)
         
         # Aguardar mais um pouco para garantir que todos os eventos assíncronos foram processados
         await asyncio.sleep(1)
@@ -259,16 +297,16 @@ async def test_log_interceptor():
         thoughts_summary = interceptor.get_thoughts_summary()
         
         # Salvar resumo dos pensamentos
-        with open(summary_logs_file, 'w', encoding='utf-8') as f:
-            json.dump(thoughts_summary, f, ensure_ascii=False, indent=2)
+        dump_json(summary_logs_file, thoughts_summary)
         
         # Salvar timeline
         interceptor.save_timeline(timeline_file)
         
-        # Salvar mensagens desconhecidas para análise
+        # Salvar mensagens desconhecidas para análise (o interceptador já as grava
+        # em unknown_messages.json no mesmo diretório; só grava se o caminho diferir)
         unknown_messages = interceptor.get_unknown_messages()
-        with open(unknown_logs_file, 'w', encoding='utf-8') as f:
-            json.dump(unknown_messages, f, ensure_ascii=False, indent=2)
+        if getattr(interceptor, 'unknown_messages_file', None) != unknown_logs_file:
+            dump_json(unknown_logs_file, unknown_messages)
         
         # Mostrar estatísticas da execução de forma concisa
         print(f"\nResumo da captura:")
@@ -289,10 +327,16 @@ async def test_log_interceptor():
             print(f"  • Uso total: {len(llm_usage_steps)} passos")
             
             if llm_usage_steps:
-                # Calcular estatísticas de uso
-                total_prompt_tokens = sum(step.get("llm_usage", {}).get("prompt_tokens", 0) for step in llm_usage_steps)
-                total_completion_tokens = sum(step.get("llm_usage", {}).get("completion_tokens", 0) for step in llm_usage_steps)
-                total_cost = sum(step.get("llm_usage", {}).get("estimated_cost", 0) for step in llm_usage_steps)
+                # Calcular estatísticas de uso (uma única passagem pelos passos)
+                total_prompt_tokens = total_completion_tokens = 0
+                total_cost = 0.0
+                modelos = Counter()
+                for step in llm_usage_steps:
+                    usage = step["llm_usage"]
+                    total_prompt_tokens += usage.get("prompt_tokens", 0)
+                    total_completion_tokens += usage.get("completion_tokens", 0)
+                    total_cost += usage.get("estimated_cost", 0)
+                    modelos[usage.get("model", "desconhecido")] += 1
                 
                 print(f"  • Total tokens: {total_prompt_tokens + total_completion_tokens}")
                 print(f"  • Tokens de prompt: {total_prompt_tokens}")
@@ -301,11 +345,6 @@ async def test_log_interceptor():
                     print(f"  • Custo estimado: ${total_cost:.6f}")
                 
                 # Mostrar modelos utilizados
-                modelos = {}
-                for step in llm_usage_steps:
-                    modelo = step.get("llm_usage", {}).get("model", "desconhecido")
-                    modelos[modelo] = modelos.get(modelo, 0) + 1
-                    
                 if modelos:
                     print(f"  • Modelos utilizados: {', '.join([f'{k}({v})' for k, v in modelos.items()])}")
                     
@@ -390,6 +429,11 @@ async def test_log_interceptor():
         # Desinstalar o interceptador para não afetar outras execuções
         interceptor.desinstalar()
         print("\nInterceptador de logs desinstalado.")
+        
+        # Gravar o lote restante, fechar o JSONL e consolidar os pensamentos em um único JSON
+        gravar_lote()
+        thinking_fp.close()
+        dump_json(thinking_logs_file, pensamentos)
 
 if __name__ == "__main__":
     # Executar o teste
@@ -20,33 +20,34 @@ async def test_openrouter():
     print(f"Modelo: {model}")
     print(f"API Key: {api_key[:4]}...{api_key[-4:]}")
     
-    # Configurar cliente
+    # Configurar cliente (assíncrono, compartilhado pelas duas chamadas)
     import openai
-    client = openai.OpenAI(api_key=api_key, base_url=api_base)
+    client = openai.AsyncOpenAI(api_key=api_key, base_url=api_base)
     
     # Testar formato browser-use
     prompt = """
     Você é um agente de automação web. Descreva como você navegaria para o Google e pesquisaria por "preço do bitcoin hoje".
     Use apenas comandos compatíveis com automação de navegador.
     """
+    messages = [{"role": "user", "content": prompt}]
     
-    # Testar com modelo GPT
-    response = client.chat.completions.create(
-        model="openai/gpt-4o",  # Testar com modelo OpenAI
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7
+    # Testar com modelo GPT e com o modelo atual em paralelo
+    response, response2 = await asyncio.gather(
+        client.chat.completions.create(
+            model="openai/gpt-4o",  # Testar com modelo OpenAI
+            messages=messages,
+            temperature=0.7
+        ),
+        client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.7
+        )
     )
     
     print("\nResposta do modelo OpenAI:")
     print(response.choices[0].message.content)
     
-    # Testar com modelo atual
-    response2 = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7
-    )
-    
     print(f"\nResposta do modelo {model}:")
     print(response2.choices[0].message.content)
 
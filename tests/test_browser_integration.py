@@ -6,16 +6,36 @@ from dotenv import load_dotenv
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
 
-# Configurar o event loop para Windows
+# Configurar o event loop para Windows: winloop se disponível; senão Proactor,
+# que o Playwright exige para iniciar o driver do navegador como subprocesso
 if sys.platform == 'win32':
-    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+    try:
+        import winloop
+        winloop.install()
+    except ImportError:
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+# browser_use e langchain_openai são importados apenas quando usados: a
+# verificação da chave de API não precisa esperar o carregamento deles
+_LAZY_IMPORTS = {
+    "BrowserAgent": ("browser_use", "Agent"),
+    "ChatOpenAI": ("langchain_openai", "ChatOpenAI"),
+}
 
-from browser_use.browser.browser import Browser, BrowserConfig
-from browser_use.browser.context import BrowserContextConfig, BrowserContextWindowSize
-from browser_use import Agent as BrowserAgent
-from langchain_openai import ChatOpenAI
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    module_name, attr = _LAZY_IMPORTS[name]
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
 
-async def run_full_test():
+async def run_full_test(browser=None):
+    """
+    Executa o teste; um Browser já iniciado pode ser passado para ser reutilizado
+    entre execuções (nesse caso, apenas o contexto criado aqui é fechado)
+    """
     print("Iniciando teste completo de integração...")
     
     # Obter configurações do OpenRouter
@@ -32,13 +52,18 @@ async def run_full_test():
         print(f"Modelo: {model_name}")
         print(f"Endpoint: {api_endpoint}")
     
+    from browser_use.browser.browser import Browser, BrowserConfig
+    from browser_use.browser.context import BrowserContextConfig, BrowserContextWindowSize
+    
     # Criar o browser
-    browser = Browser(
-        config=BrowserConfig(
-            headless=False,
-            disable_security=True,
+    owns_browser = browser is None
+    if owns_browser:
+        browser = Browser(
+            config=BrowserConfig(
+                headless=False,
+                disable_security=True,
+            )
         )
-    )
     
     # Criar o contexto
     browser_context = await browser.new_context(
@@ -56,8 +81,10 @@ async def run_full_test():
         # Navegar para uma página
         await page.goto("https://www.google.com")
         
-        # Capturar screenshot da página
-        screenshot = await page.screenshot()
+        # Capturar screenshot da página (JPEG: buffer bem menor que o PNG padrão,
+        # suficiente para verificar que a captura funciona)
+        screenshot = await page.screenshot(type="jpeg", quality=80)
+        print(f"Screenshot capturado ({len(screenshot)} bytes)")
         
         # Parte 1: Testar navegação básica
         await page.goto("https://www.google.com")
@@ -83,8 +110,10 @@ async def run_full_test():
         import traceback
         traceback.print_exc()
     finally:
-        await browser.close()
-        print("Browser fechado.")
+        await browser_context.close()
+        if owns_browser:
+            await browser.close()
+            print("Browser fechado.")
 
 if __name__ == "__main__":
     print(f"Plataforma: {sys.platform}")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Testes da escolha do diretório de dados do Chrome pelo BrowserManager.
+"""
+
+import os
+import sys
+import shutil
+import socket
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.helpers import BrowserManager
+
+
+class TestChromeProfileFallback(unittest.TestCase):
+    """Testes do uso do perfil persistente do cliente"""
+
+    def setUp(self):
+        self.client_dir = Path(tempfile.mkdtemp())
+        self.profile = self.client_dir / "chrome_profile"
+        self.storage = SimpleNamespace(get_chrome_profile_path=lambda: self.profile)
+        self.managers = []
+
+    def tearDown(self):
+        for manager, (path, is_temp) in self.managers:
+            if is_temp:
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                manager._release_profile(path)
+            manager.close()
+        shutil.rmtree(self.client_dir, ignore_errors=True)
+
+    def _resolve(self):
+        manager = BrowserManager()
+        resolved = manager._resolve_user_data_dir(storage=self.storage)
+        self.managers.append((manager, resolved))
+        return resolved
+
+    def test_concurrent_tasks_do_not_share_profile(self):
+        """Uma segunda tarefa do mesmo cliente recebe um diretório temporário"""
+        first_dir, first_temp = self._resolve()
+        second_dir, second_temp = self._resolve()
+
+        self.assertEqual(first_dir, self.profile)
+        self.assertFalse(first_temp)
+        self.assertNotEqual(second_dir, self.profile)
+        self.assertTrue(second_temp)
+
+    @unittest.skipUnless(hasattr(os, "symlink") and sys.platform != "win32", "SingletonLock é um symlink")
+    def test_locked_profile_falls_back_to_temp_dir(self):
+        """Perfil bloqueado por outro Chrome vivo não é reutilizado"""
+        self.profile.mkdir()
+        os.symlink(f"{socket.gethostname()}-{os.getpid()}", self.profile / "SingletonLock")
+
+        user_data_dir, is_temp = self._resolve()
+
+        self.assertTrue(is_temp)
+        self.assertNotEqual(user_data_dir, self.profile)
+
+    def test_profile_is_reused_after_release(self):
+        """O perfil liberado no cleanup volta a ser usado na próxima tarefa"""
+        manager = BrowserManager()
+        user_data_dir, _ = manager._resolve_user_data_dir(storage=self.storage)
+        manager._release_profile(user_data_dir)
+        manager.close()
+
+        user_data_dir, is_temp = self._resolve()
+
+        self.assertEqual(user_data_dir, self.profile)
+        self.assertFalse(is_temp)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,23 +3,31 @@ import asyncio
 import sys
 import os
 
-# Configurar o event loop para Windows
+# Configurar o event loop para Windows: winloop se disponível; senão Proactor,
+# que o Playwright exige para iniciar o driver do navegador como subprocesso
 if sys.platform == 'win32':
-    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-
-from browser_use.browser.browser import Browser, BrowserConfig
-from browser_use.browser.context import BrowserContextConfig, BrowserContextWindowSize
+    try:
+        import winloop
+        winloop.install()
+    except ImportError:
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-async def run_browser_example():
+async def run_browser_example(browser=None):
+    """Exemplo de uso do browser; aceita um Browser já aberto para não iniciar outro"""
+    from browser_use.browser.browser import Browser, BrowserConfig
+    from browser_use.browser.context import BrowserContextConfig, BrowserContextWindowSize
+    
     print("Iniciando exemplo do browser-use...")
     
     # Configurações baseadas no exemplo oficial: https://github.com/browser-use/browser-use/blob/main/examples/browser/stealth.py
-    browser = Browser(
-        config=BrowserConfig(
-            headless=False,  # Para ver o navegador
-            disable_security=True,
+    owns_browser = browser is None
+    if owns_browser:
+        browser = Browser(
+            config=BrowserConfig(
+                headless=False,  # Para ver o navegador
+                disable_security=True,
+            )
         )
-    )
     
     browser_context = await browser.new_context(
         config=BrowserContextConfig(
@@ -50,8 +58,10 @@ async def run_browser_example():
     except Exception as e:
         print(f"Erro ao acessar o Google: {e}")
     finally:
-        await browser.close()
-        print("Browser fechado.")
+        await browser_context.close()
+        if owns_browser:
+            await browser.close()
+            print("Browser fechado.")
 
 if __name__ == "__main__":
     print(f"Plataforma: {sys.platform}")
@@ -1,55 +1,107 @@
 import asyncio
+import aiohttp
 import websockets
-import requests
 import json
 
 class APIClient:
     def __init__(self, base_url="http://localhost:8000"):
         self.base_url = base_url
         self.ws_url = f"ws://localhost:8000/ws"
+        # Sessão HTTP e WebSocket reutilizados durante toda a vida do cliente
+        self._http = None
+        self._ws = None
 
-    def create_task(self, client_id: str, task_type: str, data: dict):
-        url = f"{self.base_url}/tasks"
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _session(self):
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                base_url=self.base_url,
+                connector=aiohttp.TCPConnector(limit_per_host=16)
+            )
+        return self._http
+
+    async def _websocket(self, client_id: str):
+        if self._ws is None:
+            self._ws = await websockets.connect(f"{self.ws_url}/{client_id}")
+        return self._ws
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    async def create_task(self, client_id: str, task_type: str, data: dict):
         payload = {
             "client_id": client_id,
             "task_type": task_type,
             "data": data
         }
-        response = requests.post(url, json=payload)
-        return response.json()
+        async with self._session().post("/tasks", json=payload) as response:
+            return await response.json()
+
+    async def get_task_status(self, task_id: str):
+        async with self._session().get(f"/tasks/{task_id}") as response:
+            return await response.json()
 
-    def get_task_status(self, task_id: str):
-        url = f"{self.base_url}/tasks/{task_id}"
-        response = requests.get(url)
-        return response.json()
+    async def create_tasks(self, client_id: str, task_type: str, data_list: list):
+        # Requisições concorrentes sobre as conexões mantidas pela sessão
+        return await asyncio.gather(
+            *(self.create_task(client_id, task_type, data) for data in data_list)
+        )
 
-    async def listen_task_updates(self, client_id: str):
-        async with websockets.connect(f"{self.ws_url}/{client_id}") as websocket:
-            while True:
+    async def get_tasks_status(self, task_ids: list):
+        return await asyncio.gather(*(self.get_task_status(task_id) for task_id in task_ids))
+
+    async def listen_task_updates(self, client_id: str, janela: float = 0.1):
+        websocket = await self._websocket(client_id)
+        loop = asyncio.get_running_loop()
+        conectado = True
+        while conectado:
+            try:
+                lote = [await websocket.recv()]
+            except websockets.exceptions.ConnectionClosed:
+                break
+
+            # Agrupar as mensagens que chegarem dentro da janela e imprimi-las de uma vez
+            limite = loop.time() + janela
+            while (restante := limite - loop.time()) > 0:
                 try:
-                    message = await websocket.recv()
-                    print(f"Recebido: {message}")
+                    lote.append(await asyncio.wait_for(websocket.recv(), restante))
+                except asyncio.TimeoutError:
+                    break
                 except websockets.exceptions.ConnectionClosed:
+                    conectado = False
                     break
+            print("\n".join(f"Recebido: {message}" for message in lote))
+        self._ws = None
 
 # Exemplo de uso
 async def main():
-    client = APIClient()
-    
-    # Criar uma tarefa
-    task = client.create_task(
-        client_id="teste",
-        task_type="browser",
-        data={"url": "https://www.google.com"}
-    )
-    print(f"Tarefa criada: {task}")
-    
-    # Verificar status
-    status = client.get_task_status(task["task_id"])
-    print(f"Status: {status}")
-    
-    # Ouvir atualizações
-    await client.listen_task_updates("teste")
+    async with APIClient() as client:
+        # Criar as tarefas (em paralelo)
+        tasks = await client.create_tasks(
+            client_id="teste",
+            task_type="browser",
+            data_list=[{"url": "https://www.google.com"}, {"url": "https://example.com"}]
+        )
+        for task in tasks:
+            print(f"Tarefa criada: {task}")
+
+        # Verificar status de todas de uma vez
+        statuses = await client.get_tasks_status([task["task_id"] for task in tasks])
+        for status in statuses:
+            print(f"Status: {status}")
+
+        # Ouvir atualizações
+        await client.listen_task_updates("teste")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
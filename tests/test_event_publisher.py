@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Testes para a serialização de eventos do EventPublisher.
+"""
+
+import os
+import sys
+import json
+import unittest
+
+# Adicionar diretório pai ao path para importar módulos de src/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.rabbitmq.event_publisher import EventPublisher, _event_header
+
+
+class TestEventSerialization(unittest.TestCase):
+    """Testes para o cabeçalho pré-serializado dos eventos."""
+
+    def setUp(self):
+        """Configuração para cada teste."""
+        self.publisher = EventPublisher()
+        _event_header.cache_clear()
+
+    def test_serialized_event_matches_full_dict(self):
+        """Testa se o corpo concatenado equivale ao evento completo."""
+        body = self.publisher._serialize_event(
+            "task.screenshot",
+            "task_1",
+            "client_1",
+            "2024-01-01T12:00:00.000000",
+            {"url": "https://example.com", "título": "Exemplo"},
+            {"screenshot": "aGVsbG8=", "current_url": "https://example.com"}
+        )
+        self.assertEqual(json.loads(body), {
+            "event_type": "task.screenshot",
+            "task_id": "task_1",
+            "client_id": "client_1",
+            "timestamp": "2024-01-01T12:00:00.000000",
+            "data": {"url": "https://example.com", "título": "Exemplo"},
+            "screenshot": "aGVsbG8=",
+            "current_url": "https://example.com"
+        })
+
+    def test_header_is_reused_between_events(self):
+        """Testa se o cabeçalho é serializado uma única vez por tarefa."""
+        for step in range(3):
+            body = self.publisher._serialize_event(
+                "task.thinking", "task_1", "client_1", "ts", {"step": step}, {}
+            )
+            self.assertEqual(json.loads(body)["data"], {"step": step})
+        self.assertEqual(_event_header.cache_info().currsize, 1)
+        self.assertEqual(_event_header.cache_info().hits, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
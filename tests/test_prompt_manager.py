@@ -69,6 +69,13 @@ class TestPromptManager(unittest.TestCase):
         
         # Verificar se está disponível na biblioteca
         self.assertIsNotNone(self.manager.library.get_template("greeting"))
+    
+    def test_invalid_template_registration(self):
+        """Testa que templates com estrutura inválida são rejeitados."""
+        template = "{% if name %}Olá {{name}}"
+        result = self.manager.register_custom_template("broken", template)
+        self.assertFalse(result)
+        self.assertIsNone(self.manager.library.get_template("broken"))
 
 
 class TestPromptRenderer(unittest.TestCase):
@@ -132,6 +139,36 @@ class TestPromptRenderer(unittest.TestCase):
         result = self.renderer.render(template, context)
         self.assertIn("Nome: JOÃO SILVA", result)
         self.assertIn("Email: joao@example.com", result)
+    
+    def test_compile_reuses_cached_template(self):
+        """Testa que o mesmo texto de template é compilado uma única vez."""
+        template = "Olá {{name}}! {% if vip %}Bem-vindo de volta.{% endif %}"
+        self.assertIs(self.renderer.compile(template), PromptRenderer().compile(template))
+        self.assertEqual(self.renderer.render(template, {"name": "Ana", "vip": True}),
+                         "Olá Ana! Bem-vindo de volta.")
+    
+    @unittest.skipUnless(hasattr(os, "getuid"), "verificação de permissões POSIX")
+    def test_compile_cached_ignores_shared_directory(self):
+        """Testa que código persistido em diretório gravável por terceiros não é executado."""
+        import hashlib
+        import tempfile
+        from src.prompt.prompt_renderer import CODEGEN_VERSION, compile_cached
+        
+        template = "{% if name %}Olá {{name}}!{% endif %}"
+        with tempfile.TemporaryDirectory() as cache_dir:
+            os.chmod(cache_dir, 0o777)
+            digest = hashlib.sha1(f"{CODEGEN_VERSION}:{template}".encode('utf-8')).hexdigest()
+            Path(cache_dir, f"{digest}.py").write_text(
+                "def _render(ctx, _filters):\n    return 'injetado'\n", encoding='utf-8'
+            )
+            compiled = compile_cached(template, "teste", cache_dir)
+        
+        self.assertEqual(self.renderer.render(compiled, {"name": "Ana"}), "Olá Ana!")
+    
+    def test_pre_rendered_system_prompt(self):
+        """Testa que prompts de sistema são devolvidos sem renderização."""
+        prompt = SYSTEM_PROMPTS["default"]
+        self.assertIs(self.renderer.render(prompt, {}), prompt)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Testes para o cache de tarefas em memória do TaskService.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Adicionar diretório pai ao path para importar módulos de src/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.services.task_cache import TaskCache
+
+
+class TestTaskCache(unittest.TestCase):
+    """Testes para a política de descarte do TaskCache."""
+
+    def test_size_limit_keeps_active_tasks(self):
+        """Testa que o limite de tamanho descarta apenas tarefas concluídas."""
+        cache = TaskCache(maxsize=2)
+        cache["a"] = {"status": "pending"}
+        cache["b"] = {"status": "completed"}
+        cache["c"] = {"status": "processing"}
+        cache["d"] = {"status": "pending"}
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertIn("d", cache)
+
+    def test_ttl_expires_only_finished_tasks(self):
+        """Testa que o TTL não expira tarefas que ainda aguardam execução."""
+        cache = TaskCache(ttl=10)
+        with mock.patch("src.api.services.task_cache.time.monotonic", return_value=0.0):
+            cache["pendente"] = {"status": "pending"}
+            cache["concluida"] = {"status": "completed"}
+
+        with mock.patch("src.api.services.task_cache.time.monotonic", return_value=60.0):
+            self.assertIn("pendente", cache)
+            self.assertNotIn("concluida", cache)
+
+            # Ao concluir, a tarefa volta a ser elegível para expiração
+            cache.get("pendente")["status"] = "completed"
+            self.assertNotIn("pendente", cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
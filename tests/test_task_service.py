@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Testes da publicação de tarefas em lote pelo TaskService.
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+# Adicionar diretório pai ao path para importar módulos de src/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.models.task import TaskRequest, TaskData
+from src.api.services.task_service import TaskService
+
+
+class StubQueueManager:
+    """QueueManager em memória que registra os lotes publicados."""
+
+    def __init__(self):
+        self.batches = []
+
+    async def publish_many(self, batch):
+        self.batches.append(list(batch))
+        return [None] * len(batch)
+
+    async def get_queue_info(self, queue_name, refresh=False):
+        return {"name": queue_name, "messages": 0, "consumers": 0}
+
+
+class TestTaskPublishing(unittest.IsolatedAsyncioTestCase):
+    """Testes do caminho create_task -> publish_many."""
+
+    def setUp(self):
+        """Configuração para cada teste."""
+        self.service = TaskService()
+        self.service.queue_manager = StubQueueManager()
+        # Sem workers: apenas a publicação é testada
+        self.service._ensure_workers = lambda: None
+        self.service._run_q = asyncio.Queue()
+
+    async def asyncTearDown(self):
+        if self.service._publish_loop_task:
+            self.service._publish_loop_task.cancel()
+
+    async def test_create_task_reaches_publish_many(self):
+        """Testa se a tarefa criada é publicada e tem as informações da fila."""
+        request = TaskRequest(
+            client_id="client_1",
+            task_type="prompt",
+            data=TaskData(prompt="Abrir example.com")
+        )
+
+        response = await asyncio.wait_for(self.service.create_task(request), timeout=1)
+
+        batches = self.service.queue_manager.batches
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0][0][0], response.task_id)
+        self.assertEqual(batches[0][0][1]["client_id"], "client_1")
+        self.assertEqual(response.queue_info.queue_name, response.task_id)
+
+    async def test_publish_future_resolves(self):
+        """Testa se _publish_task retorna após a confirmação do lote."""
+        await asyncio.wait_for(
+            self.service._publish_task("task_1", {"client_id": "client_1"}),
+            timeout=1
+        )
+        self.assertEqual(self.service.queue_manager.batches, [[("task_1", {"client_id": "client_1"})]])
+
+
+if __name__ == "__main__":
+    unittest.main()
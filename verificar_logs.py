@@ -2,30 +2,93 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
+import io
 import sys
-import glob
-import argparse
-from datetime import datetime
+import reprlib
+import threading
+import time
+from collections import Counter
 
-def verificar_diretorio(dir_path):
+# orjson quando disponível, com fallback para o json da biblioteca padrão
+from src.utils import json_utils
+
+# Leitura incremental dos logs (opcional): evita materializar arquivos grandes
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+    ERROS_JSON = (json_utils.JSONDecodeError, ijson.JSONError)
+except ImportError:
+    IJSON_AVAILABLE = False
+    ERROS_JSON = (json_utils.JSONDecodeError,)
+
+def iterar_itens(path, prefixo="item"):
+    """Itera os itens de uma lista JSON, de forma incremental quando o ijson está disponível"""
+    with open(path, "rb") as f:
+        if IJSON_AVAILABLE:
+            yield from ijson.items(f, prefixo, use_float=True)
+            return
+        dados = json_utils.loads(f.read())
+    for chave in prefixo.split(".")[:-1]:
+        dados = dados.get(chave, [])
+    yield from dados
+
+def ler_chaves(path, chaves):
+    """Lê apenas as chaves de primeiro nível indicadas de um objeto JSON"""
+    with open(path, "rb") as f:
+        if IJSON_AVAILABLE:
+            return {k: v for k, v in ijson.kvitems(f, "", use_float=True) if k in chaves}
+        dados = json_utils.loads(f.read())
+    return {k: dados[k] for k in chaves if k in dados}
+
+def listar_entradas(dir_path):
+    """Mapeia nome -> os.DirEntry com uma única leitura do diretório (None se não existir)"""
+    try:
+        with os.scandir(dir_path) as it:
+            return {e.name: e for e in it if not e.name.startswith(".")}
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+def listar_screenshots(dir_path):
+    """Caminhos dos arquivos .png de um diretório ([] se não existir)"""
+    try:
+        with os.scandir(dir_path) as it:
+            return [e.path for e in it if e.name.endswith(".png")]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+def verificar_diretorio(dir_path, entradas=None):
     """Verifica um diretório de logs e analisa sua integridade"""
     print(f"\nVerificando diretório: {dir_path}")
     
-    # Verificar se o diretório existe
-    if not os.path.exists(dir_path):
+    # Uma única listagem do diretório atende a todas as verificações abaixo,
+    # inclusive a de existência do próprio diretório
+    if entradas is None:
+        entradas = listar_entradas(dir_path)
+    if entradas is None:
         print(f"ERRO: Diretório {dir_path} não existe!")
         return False
     
+    # Diretório vazio: todas as verificações abaixo resultariam em avisos
+    if not entradas:
+        print("AVISO: Diretório vazio")
+        print("⚠️ O diretório de logs tem avisos, mas sem erros críticos.")
+        return True
+    
     # Contadores de erros e avisos
     erros = 0
     avisos = 0
     
+    # Screenshots de screenshots/ e das etapas, listados uma única vez: servem às
+    # contagens e à conferência dos caminhos registrados, sem um stat por etapa
+    etapas_dirs = [e.path for nome, e in entradas.items() if nome.startswith("etapa_") and e.is_dir()]
+    screenshots_gerais = listar_screenshots(entradas["screenshots"].path) if "screenshots" in entradas else None
+    screenshots_etapas = [p for etapa_dir in etapas_dirs for p in listar_screenshots(etapa_dir)]
+    screenshots_conhecidos = {os.path.abspath(p) for p in (screenshots_gerais or []) + screenshots_etapas}
+    
     # Verificar estrutura de diretórios básica
     subdirs_esperados = ["etapa_0", "prompts", "results", "screenshots", "states"]
     for subdir in subdirs_esperados:
-        path = os.path.join(dir_path, subdir)
-        if not os.path.exists(path):
+        if subdir not in entradas:
             print(f"AVISO: Subdiretório {subdir} não encontrado")
             avisos += 1
     
@@ -33,10 +96,9 @@ def verificar_diretorio(dir_path):
     log_file = os.path.join(dir_path, "execucao_log.json")
     agent_log_file = os.path.join(dir_path, "agent_log.json")
     
-    if os.path.exists(log_file):
+    if "execucao_log.json" in entradas:
         try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                log_data = json.load(f)
+            log_data = ler_chaves(log_file, ("status", "resultado_final", "etapas"))
                 
             # Verificar status e resultado
             status = log_data.get("status", "")
@@ -62,30 +124,29 @@ def verificar_diretorio(dir_path):
                     if "screenshot_path" not in etapa or not etapa["screenshot_path"]:
                         print(f"AVISO: Etapa {i+1} sem screenshot")
                         avisos += 1
-                    elif not os.path.exists(etapa["screenshot_path"]):
+                    elif (os.path.abspath(etapa["screenshot_path"]) not in screenshots_conhecidos
+                          and not os.path.exists(etapa["screenshot_path"])):
                         print(f"ERRO: Screenshot da etapa {i+1} não existe: {etapa['screenshot_path']}")
                         erros += 1
-        except json.JSONDecodeError:
+        except ERROS_JSON:
             print(f"ERRO: Arquivo {log_file} não é um JSON válido")
             erros += 1
         except Exception as e:
             print(f"ERRO ao analisar {log_file}: {str(e)}")
             erros += 1
-    elif os.path.exists(agent_log_file):
+    elif "agent_log.json" in entradas:
         try:
-            with open(agent_log_file, "r", encoding="utf-8") as f:
-                log_data = json.load(f)
+            total_eventos = sum(1 for _ in iterar_itens(agent_log_file, "eventos.item"))
             
             print(f"INFO: Arquivo de log do AgentTracker encontrado.")
             
             # Verificar eventos
-            eventos = log_data.get("eventos", [])
-            if not eventos:
+            if not total_eventos:
                 print("AVISO: Nenhum evento registrado")
                 avisos += 1
             else:
-                print(f"INFO: {len(eventos)} eventos registrados")
-        except json.JSONDecodeError:
+                print(f"INFO: {total_eventos} eventos registrados")
+        except ERROS_JSON:
             print(f"ERRO: Arquivo {agent_log_file} não é um JSON válido")
             erros += 1
         except Exception as e:
@@ -97,13 +158,12 @@ def verificar_diretorio(dir_path):
     
     # Verificar arquivo de pensamentos do AgentTracker
     thinking_file = os.path.join(dir_path, "thinking_logs.json")
-    if os.path.exists(thinking_file):
+    if "thinking_logs.json" in entradas:
         try:
-            with open(thinking_file, "r", encoding="utf-8") as f:
-                thinking_data = json.load(f)
+            total_pensamentos = sum(1 for _ in iterar_itens(thinking_file))
             
-            print(f"INFO: Arquivo de pensamentos encontrado com {len(thinking_data)} registros")
-        except json.JSONDecodeError:
+            print(f"INFO: Arquivo de pensamentos encontrado com {total_pensamentos} registros")
+        except ERROS_JSON:
             print(f"ERRO: Arquivo {thinking_file} não é um JSON válido")
             erros += 1
         except Exception as e:
@@ -114,12 +174,12 @@ def verificar_diretorio(dir_path):
         avisos += 1
     
     # Verificar relatório HTML
-    html_file = os.path.join(dir_path, "relatorio.html")
-    if not os.path.exists(html_file):
+    html_entry = entradas.get("relatorio.html")
+    if html_entry is None:
         print(f"AVISO: Relatório HTML não encontrado")
         avisos += 1
     else:
-        size = os.path.getsize(html_file)
+        size = html_entry.stat().st_size
         if size < 100:
             print(f"AVISO: Relatório HTML tem tamanho suspeito ({size} bytes)")
             avisos += 1
@@ -127,17 +187,14 @@ def verificar_diretorio(dir_path):
             print(f"INFO: Relatório HTML encontrado ({size} bytes)")
     
     # Verificar screenshots
-    screenshots_dir = os.path.join(dir_path, "screenshots")
-    if os.path.exists(screenshots_dir):
-        screenshots = glob.glob(os.path.join(screenshots_dir, "*.png"))
-        if not screenshots:
+    if screenshots_gerais is not None:
+        if not screenshots_gerais:
             print("AVISO: Nenhum screenshot encontrado em 'screenshots/'")
             avisos += 1
         else:
-            print(f"INFO: {len(screenshots)} screenshots encontrados em 'screenshots/'")
+            print(f"INFO: {len(screenshots_gerais)} screenshots encontrados em 'screenshots/'")
     
     # Verificar etapas
-    etapas_dirs = glob.glob(os.path.join(dir_path, "etapa_*"))
     if not etapas_dirs:
         print("AVISO: Nenhum diretório de etapa encontrado")
         avisos += 1
@@ -145,10 +202,7 @@ def verificar_diretorio(dir_path):
         print(f"INFO: {len(etapas_dirs)} diretórios de etapa encontrados")
         
         # Verificar se há screenshots nas etapas
-        screenshots_count = 0
-        for etapa_dir in etapas_dirs:
-            screenshots = glob.glob(os.path.join(etapa_dir, "*.png"))
-            screenshots_count += len(screenshots)
+        screenshots_count = len(screenshots_etapas)
         
         if screenshots_count == 0:
             print("AVISO: Nenhum screenshot encontrado nas etapas")
@@ -171,25 +225,36 @@ def verificar_diretorio(dir_path):
         print("❌ O diretório de logs apresenta problemas críticos!")
         return False
 
+# repr com limites de tamanho: a prévia de um resultado grande custa o mesmo
+# que a de um pequeno, sem serializá-lo por inteiro só para cortar 200 caracteres
+_repr_resumo = reprlib.Repr()
+_repr_resumo.maxlevel = 4
+_repr_resumo.maxdict = _repr_resumo.maxlist = 20
+_repr_resumo.maxstring = _repr_resumo.maxother = 200
+
+# Tipos de evento destacados na análise
+TASK_ERROR = "task.error"
+TASK_RESULT = "task.result"
+
 def analisar_eventos(events_file):
     """Analisa arquivo de eventos capturados para diagnóstico"""
-    if not os.path.exists(events_file):
-        print(f"ERRO: Arquivo de eventos {events_file} não encontrado")
-        return
-    
     try:
-        with open(events_file, "r", encoding="utf-8") as f:
-            events = json.load(f)
-        
-        print(f"\nANÁLISE DE EVENTOS ({len(events)} eventos):")
-        
-        # Agrupar por tipo de evento
-        event_types = {}
-        for event in events:
+        # Uma única passagem: conta os tipos e guarda apenas erros e resultados
+        total_eventos = 0
+        event_types = Counter()
+        errors = []
+        results = []
+        for event in iterar_itens(events_file):
+            total_eventos += 1
             event_type = event.get("event_type", "unknown")
-            if event_type not in event_types:
-                event_types[event_type] = 0
             event_types[event_type] += 1
+            
+            if event_type == TASK_ERROR or "error" in event.get("data", {}):
+                errors.append(event)
+            if event_type == TASK_RESULT:
+                results.append(event)
+        
+        print(f"\nANÁLISE DE EVENTOS ({total_eventos} eventos):")
         
         # Mostrar contagem por tipo
         print("Contagem por tipo de evento:")
@@ -197,7 +262,6 @@ def analisar_eventos(events_file):
             print(f"- {event_type}: {count}")
         
         # Verificar se houve erros
-        errors = [e for e in events if e.get("event_type") == "task.error" or "error" in e.get("data", {})]
         if errors:
             print(f"\nERROS DETECTADOS ({len(errors)}):")
             for i, error in enumerate(errors):
@@ -205,42 +269,42 @@ def analisar_eventos(events_file):
                 print(f"{i+1}. {error_msg}")
         
         # Verificar resultados
-        results = [e for e in events if e.get("event_type") == "task.result"]
         if results:
             print(f"\nRESULTADOS ({len(results)}):")
             for i, result in enumerate(results):
                 result_data = result.get("data", {}).get("result", "Resultado não especificado")
                 if isinstance(result_data, dict):
-                    print(f"{i+1}. {json.dumps(result_data, ensure_ascii=False)[:200]}...")
+                    print(f"{i+1}. {_repr_resumo.repr(result_data)[:200]}...")
                 else:
                     print(f"{i+1}. {str(result_data)[:200]}...")
         else:
             print("\nNenhum resultado encontrado nos eventos")
             
-    except json.JSONDecodeError:
+    except FileNotFoundError:
+        print(f"ERRO: Arquivo de eventos {events_file} não encontrado")
+    except ERROS_JSON:
         print(f"ERRO: Arquivo {events_file} não é um JSON válido")
     except Exception as e:
         print(f"ERRO ao analisar {events_file}: {str(e)}")
 
+# Campos de pensamento contabilizados no resumo (na ordem de exibição)
+TIPOS_PENSAMENTO = ("evaluation", "memory", "next_goal", "thought")
+
 def analisar_pensamentos(thinking_file, detalhado=False):
     """Analisa arquivo de pensamentos capturados pelo interceptador de logs"""
-    if not os.path.exists(thinking_file):
-        print(f"ERRO: Arquivo de pensamentos {thinking_file} não encontrado")
-        return
-    
     try:
-        with open(thinking_file, "r", encoding="utf-8") as f:
-            pensamentos = json.load(f)
-        
-        print(f"\nANÁLISE DE PENSAMENTOS ({len(pensamentos)} registros):")
+        # Contar tipos de pensamentos sem reter a lista (apenas os 5 primeiros, para o resumo)
+        total_pensamentos = 0
+        primeiros = []
+        tipos = Counter(dict.fromkeys(TIPOS_PENSAMENTO, 0))
         
-        # Contar tipos de pensamentos
-        tipos = {"evaluation": 0, "memory": 0, "next_goal": 0, "thought": 0}
+        for p in iterar_itens(thinking_file):
+            total_pensamentos += 1
+            if len(primeiros) < 5:
+                primeiros.append(p)
+            tipos.update(tipo for tipo in TIPOS_PENSAMENTO if p.get(tipo))
         
-        for p in pensamentos:
-            for tipo in tipos.keys():
-                if p.get(tipo):
-                    tipos[tipo] += 1
+        print(f"\nANÁLISE DE PENSAMENTOS ({total_pensamentos} registros):")
         
         # Mostrar estatísticas
         print("Contagem por tipo de pensamento:")
@@ -251,7 +315,8 @@ def analisar_pensamentos(thinking_file, detalhado=False):
         if detalhado:
             print("\nSEQUÊNCIA DE PENSAMENTOS:")
             
-            for i, p in enumerate(pensamentos):
+            # Segunda leitura incremental, em vez de manter todos os registros na memória
+            for i, p in enumerate(iterar_itens(thinking_file)):
                 print(f"\n--- Passo {p.get('step', '?')} ({p.get('timestamp', 'sem data')}) ---")
                 
                 # Mostrar todos os tipos de pensamento disponíveis
@@ -282,10 +347,7 @@ def analisar_pensamentos(thinking_file, detalhado=False):
         else:
             # Mostrar apenas um resumo dos primeiros passos
             print("\nRESUMO DOS PRIMEIROS PENSAMENTOS:")
-            for i, p in enumerate(pensamentos[:5]):
-                if i >= 5:
-                    break
-                
+            for i, p in enumerate(primeiros):
                 print(f"\n--- Passo {p.get('step', '?')} ---")
                 
                 if p.get("evaluation"):
@@ -294,46 +356,110 @@ def analisar_pensamentos(thinking_file, detalhado=False):
                 if p.get("next_goal"):
                     print(f"🎯 Próximo objetivo: {p.get('next_goal')[:100]}...")
             
-            if len(pensamentos) > 5:
-                print(f"\n... e mais {len(pensamentos) - 5} registros de pensamento.")
+            if total_pensamentos > 5:
+                print(f"\n... e mais {total_pensamentos - 5} registros de pensamento.")
                 
-    except json.JSONDecodeError:
+    except FileNotFoundError:
+        print(f"ERRO: Arquivo de pensamentos {thinking_file} não encontrado")
+    except ERROS_JSON:
         print(f"ERRO: Arquivo {thinking_file} não é um JSON válido")
     except Exception as e:
         print(f"ERRO ao analisar {thinking_file}: {str(e)}")
 
+# Formato das datas de modificação na listagem de diretórios
+FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+
 def listar_diretorios_log():
     """Lista diretórios de log disponíveis para análise"""
     # Procurar em agent_logs
-    agent_logs = []
-    if os.path.exists("agent_logs"):
-        agent_logs = glob.glob(os.path.join("agent_logs", "*"))
+    agent_logs = [(e.path, e) for e in (listar_entradas("agent_logs") or {}).values()]
     
     # Procurar em agent_tracker_logs
-    tracker_logs = []
-    if os.path.exists("agent_tracker_logs"):
-        tracker_logs = glob.glob(os.path.join("agent_tracker_logs", "session_*"))
+    tracker_logs = [(e.path, e) for nome, e in (listar_entradas("agent_tracker_logs") or {}).items() if nome.startswith("session_")]
     
     # Procurar diretórios de debug
-    debug_logs = glob.glob("debug_logs_*")
+    debug_logs = [(nome, e) for nome, e in (listar_entradas(".") or {}).items() if nome.startswith("debug_logs_")]
     
-    # Combinar resultados
-    all_logs = agent_logs + tracker_logs + debug_logs
+    # Combinar resultados (o mtime vem do DirEntry; no Windows, já com a própria listagem)
+    all_entries = agent_logs + tracker_logs + debug_logs
+    all_logs = [log_dir for log_dir, _ in all_entries]
     
     if not all_logs:
         print("Nenhum diretório de log encontrado!")
         return []
     
     print(f"\nDIRETÓRIOS DE LOG ENCONTRADOS ({len(all_logs)}):")
-    for i, log_dir in enumerate(all_logs):
-        mtime = os.path.getmtime(log_dir)
-        mtime_str = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
+    for i, (log_dir, entry) in enumerate(all_entries):
+        mtime = entry.stat().st_mtime
+        mtime_str = time.strftime(FORMATO_DATA, time.localtime(mtime))
         print(f"{i+1}. {log_dir} (modificado em {mtime_str})")
     
     return all_logs
 
+def analisar_diretorio(log_dir, detalhado=False):
+    """Verificação completa de um diretório: integridade, pensamentos e eventos"""
+    entradas = listar_entradas(log_dir)
+    verificar_diretorio(log_dir, entradas)
+    if entradas is None:
+        return
+    
+    # Procurar arquivo de pensamentos
+    if "thinking_logs.json" in entradas:
+        analisar_pensamentos(entradas["thinking_logs.json"].path, detalhado)
+    
+    # Procurar arquivos de eventos
+    for nome, entry in entradas.items():
+        if nome.startswith("events_") and nome.endswith(".json"):
+            analisar_eventos(entry.path)
+
+class SaidaPorThread:
+    """Encaminha o print() de cada thread para o seu buffer, quando houver um"""
+    
+    def __init__(self, destino):
+        self._destino = destino
+        self._local = threading.local()
+    
+    def write(self, texto):
+        buffer = getattr(self._local, "buffer", None)
+        return (self._destino if buffer is None else buffer).write(texto)
+    
+    def flush(self):
+        self._destino.flush()
+    
+    def __getattr__(self, nome):
+        return getattr(self._destino, nome)
+    
+    def capturar(self, func, *args):
+        """Executa func na thread atual e devolve tudo o que ela imprimiu"""
+        self._local.buffer = io.StringIO()
+        try:
+            func(*args)
+            return self._local.buffer.getvalue()
+        finally:
+            self._local.buffer = None
+
+def analisar_todos(log_dirs, detalhado=False):
+    """
+    Analisa vários diretórios em paralelo (a análise é dominada por E/S)
+    
+    A saída de cada diretório é acumulada em um buffer e impressa de uma vez,
+    na ordem da lista, para não intercalar as linhas entre diretórios.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    saida = SaidaPorThread(sys.stdout)
+    sys.stdout = saida
+    try:
+        with ThreadPoolExecutor(max_workers=min(8, (os.cpu_count() or 1) * 2)) as executor:
+            for texto in executor.map(lambda d: saida.capturar(analisar_diretorio, d, detalhado), log_dirs):
+                print(texto, end="")
+    finally:
+        sys.stdout = saida._destino
+
 def parse_args():
     """Analisa argumentos da linha de comando"""
+    import argparse
+    
     parser = argparse.ArgumentParser(description="Verificador de logs do AgentTracker")
     
     parser.add_argument("dir", nargs="?", help="Diretório de logs para analisar")
@@ -357,25 +483,10 @@ def main():
         # Se queremos apenas os logs de pensamento
         if args.thinking_only:
             thinking_file = os.path.join(log_dir, "thinking_logs.json")
-            if os.path.exists(thinking_file):
-                analisar_pensamentos(thinking_file, args.detalhado)
-            else:
-                print(f"ERRO: Arquivo de pensamentos não encontrado em {log_dir}")
-                return
+            analisar_pensamentos(thinking_file, args.detalhado)
         else:
             # Verificação completa
-            verificar_diretorio(log_dir)
-            
-            # Procurar arquivo de pensamentos
-            thinking_file = os.path.join(log_dir, "thinking_logs.json")
-            if os.path.exists(thinking_file):
-                analisar_pensamentos(thinking_file, args.detalhado)
-            
-            # Procurar arquivos de eventos
-            events_files = glob.glob(os.path.join(log_dir, "events_*.json"))
-            if events_files:
-                for events_file in events_files:
-                    analisar_eventos(events_file)
+            analisar_diretorio(log_dir, args.detalhado)
         
         return
     
@@ -395,33 +506,10 @@ def main():
         
         if choice == 0:
             # Verificar todos
-            for log_dir in log_dirs:
-                verificar_diretorio(log_dir)
-                
-                # Procurar arquivo de pensamentos
-                thinking_file = os.path.join(log_dir, "thinking_logs.json")
-                if os.path.exists(thinking_file):
-                    analisar_pensamentos(thinking_file, args.detalhado)
-                
-                # Procurar arquivos de eventos
-                events_files = glob.glob(os.path.join(log_dir, "events_*.json"))
-                if events_files:
-                    for events_file in events_files:
-                        analisar_eventos(events_file)
+            analisar_todos(log_dirs, args.detalhado)
         elif 1 <= choice <= len(log_dirs):
             log_dir = log_dirs[choice-1]
-            verificar_diretorio(log_dir)
-            
-            # Procurar arquivo de pensamentos
-            thinking_file = os.path.join(log_dir, "thinking_logs.json")
-            if os.path.exists(thinking_file):
-                analisar_pensamentos(thinking_file, args.detalhado)
-            
-            # Procurar arquivos de eventos
-            events_files = glob.glob(os.path.join(log_dir, "events_*.json"))
-            if events_files:
-                for events_file in events_files:
-                    analisar_eventos(events_file)
+            analisar_diretorio(log_dir, args.detalhado)
         else:
             print("Escolha inválida!")
     except ValueError: